@@ -0,0 +1,100 @@
+"""Задержка вызовов Bot API и повторное использование соединений.
+
+Сравниваются стандартная AiohttpSession aiogram и BotAPISession с
+настройками из config (пул, keepalive, кэш DNS, таймауты методов).
+Запросы deleteMessage уходят пачками по --concurrency на заглушку
+сервера из bench.stub_bot_api; между пачками сессия простаивает --idle
+секунд. Пауза дольше keepalive соединения (15 с у aiohttp по умолчанию,
+BOT_API_KEEPALIVE у BotAPISession) заставляет открывать соединения заново.
+
+    python -m bench.bot_api_session --requests 5000 --concurrency 50 --idle 20
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from bench.common import report, setup_env
+from bench.stub_bot_api import StubBotAPI
+
+setup_env()
+
+
+def percentile(samples: List[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[int(p * (len(samples) - 1))] * 1000
+
+
+async def measure(
+    name: str, stub: StubBotAPI, requests: int, concurrency: int, bursts: int, idle: float
+) -> None:
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from config import config
+    from utils.runtime import BotAPISession, parse_method_timeouts
+
+    api = TelegramAPIServer.from_base(stub.url)
+    if name == "BotAPISession":
+        session = BotAPISession(
+            parse_method_timeouts(config.BOT_API_METHOD_TIMEOUTS),
+            limit=config.BOT_API_POOL_SIZE,
+            timeout=config.BOT_API_TIMEOUT,
+            api=api,
+        )
+    else:
+        session = AiohttpSession(api=api)
+    bot = Bot(token=config.BOT_TOKEN, session=session)
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(message_id: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await bot.delete_message(config.ALLOWED_CHAT_ID, message_id)
+            latencies.append(time.perf_counter() - started)
+
+    stub.reset()
+    per_burst = requests // bursts
+    elapsed = 0.0
+    for burst in range(bursts):
+        if burst and idle:
+            await asyncio.sleep(idle)
+        started = time.perf_counter()
+        await asyncio.gather(*(call(burst * per_burst + i) for i in range(per_burst)))
+        elapsed += time.perf_counter() - started
+    await bot.session.close()
+
+    counters = stub.reset()
+    reuse = 1 - counters["connections"] / counters["requests"]
+    report(name, len(latencies), elapsed)
+    print(
+        f"{'':<40} p50 {percentile(latencies, 0.5):.2f} ms, "
+        f"p95 {percentile(latencies, 0.95):.2f} ms, "
+        f"{counters['connections']} connections, reuse {reuse:.1%}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    stub = StubBotAPI(args.delay_ms / 1000)
+    await stub.start()
+    try:
+        for name in ("AiohttpSession", "BotAPISession"):
+            await measure(name, stub, args.requests, args.concurrency, args.bursts, args.idle)
+    finally:
+        await stub.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--idle", type=float, default=0.0, help="пауза между пачками, секунд")
+    parser.add_argument("--delay-ms", type=float, default=5.0, help="задержка ответа заглушки")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
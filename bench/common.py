@@ -0,0 +1,79 @@
+import os
+import time
+from typing import Any, Dict
+
+# Бенчмарки не обращаются ни к Telegram, ни к БД: обязательные поля
+# Config получают значения-заглушки, если не заданы в окружении или .env
+BENCH_ENV = {
+    "BOT_TOKEN": "111111111:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi",
+    "DB_TYPE": "postgres",
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_NAME": "bench",
+    "DB_HOST": "localhost",
+    "ALLOWED_CHAT_ID": "-100123",
+    "LANGUAGE_SELECTION_TIMEOUT": "300",
+    "QUIZ_ANSWER_TIMEOUT": "30",
+    "MESSAGE_DELETE_DELAY_CORRECT": "10",
+    "MESSAGE_DELETE_DELAY_INCORRECT": "30",
+    "MESSAGE_DELETE_DELAY_TIMEOUT": "60",
+    "DEFAULT_MESSAGE_DELETE_DELAY": "5",
+    "MUTE_DURATION": "86400",
+    "CLEANUP_INTERVAL": "120",
+}
+
+
+def setup_env(**overrides: str) -> None:
+    """Заполняет окружение до первого импорта config."""
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.update(overrides)
+
+
+def chat_id() -> int:
+    return int(os.environ["ALLOWED_CHAT_ID"])
+
+
+def group_message(update_id: int, user_id: int, text: str = "привет всем") -> Dict[str, Any]:
+    """Сырой апдейт сообщения в группе, как его отдаёт getUpdates."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id(), "type": "supergroup", "title": "bench"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "u"},
+            "text": text,
+        },
+    }
+
+
+def callback_query(update_id: int, user_id: int, data: str = "noop") -> Dict[str, Any]:
+    """Сырой апдейт нажатия кнопки, не совпадающего ни с одним обработчиком."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": "bench",
+            "data": data,
+            "from": {"id": user_id, "is_bot": False, "first_name": "u"},
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": chat_id(), "type": "supergroup", "title": "bench"},
+                "text": "x",
+            },
+        },
+    }
+
+
+def quiet_staff_cache() -> None:
+    """Пустой список администраторов без срока: префильтр не ходит в Bot API."""
+    from utils.staff import staff_cache
+
+    staff_cache._staff[chat_id()] = set()
+    staff_cache._expires[chat_id()] = float("inf")
+
+
+def report(name: str, count: int, seconds: float) -> None:
+    print(f"{name:<40} {count / seconds:>12,.0f} ops/s  ({seconds * 1000:,.0f} ms)")
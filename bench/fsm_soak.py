@@ -0,0 +1,119 @@
+"""Память FSM-хранилища под долгим потоком вступлений.
+
+TTLMemoryStorage получает поток новичков на виртуальных часах: часть
+проходит проверку, часть проваливает её, часть уходит, не ответив.
+Каждые --sample вступлений печатаются число живых записей и RSS процесса.
+Проверяется, что число записей не превышает оценку rate * TTL, после
+истечения всех сроков хранилище пусто, а RSS во второй половине прогона
+не растёт. Обращений к Telegram и БД нет.
+
+    python -m bench.fsm_soak --joins 1000000 --rate 20
+"""
+import argparse
+import asyncio
+import random
+import resource
+import time
+from collections import deque
+
+from bench.common import report, setup_env
+
+setup_env()
+
+# Доли исходов и время от вступления до ответа на квиз, секунд
+PASSED_SHARE = 0.8
+FAILED_SHARE = 0.1
+ANSWER_DELAY = 30
+# Допустимый рост RSS во второй половине прогона
+RSS_GROWTH_LIMIT = 0.05
+
+
+class Clock:
+    """Виртуальное время вместо time.monotonic()."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def rss_kb() -> int:
+    """Текущий RSS процесса; без /proc — пиковый из getrusage."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def soak(joins: int, rate: float, sample: int) -> None:
+    from aiogram.fsm.storage.base import StorageKey
+
+    from config import config
+    from handlers.states import UserState
+    from utils.fsm_storage import TTLMemoryStorage
+
+    clock = Clock()
+    storage = TTLMemoryStorage(
+        config.FSM_TTL, config.FSM_FINISHED_TTL, (UserState.completed,), clock=clock
+    )
+    outcomes = deque()
+    rng = random.Random(1)
+    # Брошенные сессии живут FSM_TTL, прошедшие — ответ плюс FSM_FINISHED_TTL
+    bound = rate * (config.FSM_TTL + ANSWER_DELAY + config.FSM_FINISHED_TTL + 2)
+    peak = 0
+    rss_half = 0
+
+    started = time.perf_counter()
+    for user_id in range(joins):
+        clock.now = user_id / rate
+        key = StorageKey(bot_id=1, chat_id=config.ALLOWED_CHAT_ID, user_id=user_id)
+        await storage.set_state(key, UserState.waiting_for_language)
+        await storage.update_data(key, {"first_message_id": user_id, "language": "ru"})
+        roll = rng.random()
+        if roll < PASSED_SHARE + FAILED_SHARE:
+            outcomes.append((clock.now + ANSWER_DELAY, key, roll < PASSED_SHARE))
+
+        while outcomes and outcomes[0][0] <= clock.now:
+            _, key, passed = outcomes.popleft()
+            if passed:
+                await storage.set_state(key, UserState.completed)
+            else:
+                await storage.set_state(key, None)
+                await storage.set_data(key, {})
+        storage.advance()
+        peak = max(peak, len(storage))
+
+        if (user_id + 1) % sample == 0:
+            print(f"{user_id + 1:>10,} joins  {len(storage):>8,} live  {rss_kb():>10,} KB RSS")
+        if user_id + 1 == joins // 2:
+            rss_half = rss_kb()
+    elapsed = time.perf_counter() - started
+    rss_end = rss_kb()
+
+    clock.now += config.FSM_TTL + 2
+    storage.advance()
+    report("joins", joins, elapsed)
+    print(f"peak live entries: {peak:,} (bound {bound:,.0f}), after drain: {len(storage)}")
+    print(f"RSS at half: {rss_half:,} KB, at end: {rss_end:,} KB")
+
+    assert peak <= bound, f"live entries {peak} exceed {bound:.0f}"
+    assert len(storage) == 0, f"{len(storage)} entries left after every TTL expired"
+    assert rss_end <= rss_half * (1 + RSS_GROWTH_LIMIT), "RSS keeps growing"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--joins", type=int, default=1_000_000)
+    parser.add_argument("--rate", type=float, default=20.0, help="вступлений в секунду")
+    parser.add_argument("--sample", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(soak(args.joins, args.rate, args.sample))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Сообщения в секунду в чате, где 99% трафика — от прошедших проверку.
+
+Прошедшие участники лежат в кэше вердиктов, остальные ждут выбора языка
+(их сообщения ставятся в пакетное удаление). Сравниваются диспетчер
+с GroupPrefilterMiddleware и без него — во втором случае каждое сообщение
+доходит до FSM и обработчика. Обращений к Telegram и БД нет.
+
+    python -m bench.prefilter --messages 50000
+"""
+import argparse
+import asyncio
+import time
+
+from bench.common import group_message, quiet_staff_cache, report, setup_env
+
+setup_env()
+
+VERIFIED_SHARE = 0.99
+USERS = 10000
+
+
+async def run(messages: int, prefilter: bool) -> float:
+    from aiogram import Bot, types
+
+    from bot import GroupPrefilterMiddleware, build_dispatcher
+    from config import config
+    from handlers.states import UserState
+    from utils.verdict_cache import verdict_cache
+
+    bot = Bot(token=config.BOT_TOKEN)
+    dp = build_dispatcher(bot, None)
+    if not prefilter:
+        middlewares = dp.update.outer_middleware._middlewares
+        middlewares[:] = [m for m in middlewares if not isinstance(m, GroupPrefilterMiddleware)]
+    quiet_staff_cache()
+
+    verified = int(USERS * VERIFIED_SHARE)
+    for user_id in range(USERS):
+        if user_id < verified:
+            verdict_cache.add(config.ALLOWED_CHAT_ID, user_id)
+        else:
+            state = dp.fsm.get_context(bot=bot, chat_id=config.ALLOWED_CHAT_ID, user_id=user_id)
+            await state.set_state(UserState.waiting_for_language)
+
+    # Отдельный диапазон update_id на прогон: дубли отсекаются до префильтра
+    first_id = 0 if prefilter else messages
+    updates = [
+        types.Update.model_validate(group_message(first_id + i, i % USERS), context={"bot": bot})
+        for i in range(messages)
+    ]
+    started = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    elapsed = time.perf_counter() - started
+    await bot.session.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50000)
+    args = parser.parse_args()
+    for prefilter in (True, False):
+        name = "with prefilter" if prefilter else "without prefilter"
+        report(name, args.messages, asyncio.run(run(args.messages, prefilter)))
+
+
+if __name__ == "__main__":
+    main()
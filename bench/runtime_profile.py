@@ -0,0 +1,88 @@
+"""Сравнение профилей RUNTIME_PROFILE: разбор апдейтов и обработка в диспетчере.
+
+Каждый профиль запускается в отдельном процессе (config читается при
+импорте). Замеряются:
+- json: разбор ответа getUpdates функцией json_loads() профиля;
+- models: построение моделей Update из разобранного ответа;
+- dispatch: feed_update тех же апдейтов в event loop профиля
+  (uvloop при fast) без обращений к Telegram и БД.
+
+    python -m bench.runtime_profile --updates 20000
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from bench.common import (
+    callback_query,
+    group_message,
+    quiet_staff_cache,
+    report,
+    setup_env,
+)
+
+
+def _payload(updates: int) -> bytes:
+    result = [
+        group_message(i, 1000 + i % 5000) if i % 2 else callback_query(i, 1000 + i % 5000)
+        for i in range(updates)
+    ]
+    return json.dumps({"ok": True, "result": result}, ensure_ascii=False).encode()
+
+
+def child(profile: str, updates: int) -> None:
+    setup_env(RUNTIME_PROFILE=profile)
+    from aiogram import Bot, types
+
+    from bot import build_dispatcher
+    from config import config
+    from utils.runtime import json_loads, run
+    from utils.verdict_cache import verdict_cache
+
+    payload = _payload(updates)
+    loads = json_loads()
+    bot = Bot(token=config.BOT_TOKEN)
+
+    started = time.perf_counter()
+    raws = loads(payload)["result"]
+    report(f"[{profile}] json", updates, time.perf_counter() - started)
+    started = time.perf_counter()
+    parsed = [types.Update.model_validate(raw, context={"bot": bot}) for raw in raws]
+    report(f"[{profile}] models", updates, time.perf_counter() - started)
+
+    # Авторы сообщений уже прошли проверку: сообщения отсекает префильтр
+    for user_id in range(1000, 6000):
+        verdict_cache.add(config.ALLOWED_CHAT_ID, user_id)
+    quiet_staff_cache()
+
+    async def dispatch() -> None:
+        dp = build_dispatcher(bot, None)
+        started = time.perf_counter()
+        for update in parsed:
+            await dp.feed_update(bot, update)
+        report(f"[{profile}] dispatch", updates, time.perf_counter() - started)
+        await bot.session.close()
+
+    run(dispatch())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--child", choices=("default", "fast"))
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.updates)
+        return
+    for profile in ("default", "fast"):
+        subprocess.run(
+            [sys.executable, "-m", "bench.runtime_profile", "--child", profile,
+             "--updates", str(args.updates)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Пропускная способность шардированной обработки в зависимости от числа воркеров.
+
+Ingress раскладывает сырые апдейты по очередям процессов тем же shard_key
+и shard_for, что и run_sharded; каждый воркер строит свой Dispatcher через
+build_dispatcher, разбирает апдейт в pydantic-модель и прогоняет его через
+middleware. Нажатия кнопок не совпадают ни с одним обработчиком, поэтому
+обращений к Telegram и БД нет — измеряется CPU-часть обработки.
+
+Ingress отправляет шарду одну пачку на ответ getUpdates (до 100 апдейтов);
+--batch 1 показывает цену пересылки по одному апдейту. Воркеров больше,
+чем CPU, только добавляют межпроцессный обмен: на одном ядре пропускная
+способность с ростом --workers падает.
+
+    python -m bench.sharding --updates 40000 --workers 1,2,4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+from bench.common import callback_query, setup_env
+
+setup_env()
+
+
+async def _consume(queue: multiprocessing.Queue, ready: multiprocessing.Queue) -> int:
+    from aiogram import Bot, types
+
+    from bot import build_dispatcher
+    from config import config
+
+    bot = Bot(token=config.BOT_TOKEN)
+    dp = build_dispatcher(bot, None)
+    ready.put(True)
+    processed = 0
+    while (batch := await asyncio.to_thread(queue.get)) is not None:
+        for raw in batch:
+            update = types.Update.model_validate(raw, context={"bot": bot})
+            await dp.feed_update(bot, update)
+            processed += 1
+    await bot.session.close()
+    return processed
+
+
+def _worker(queue: multiprocessing.Queue, ready: multiprocessing.Queue, done: multiprocessing.Queue) -> None:
+    done.put(asyncio.run(_consume(queue, ready)))
+
+
+def run(workers: int, updates: int, batch: int) -> float:
+    from utils.sharding import shard_for, shard_key
+
+    ctx = multiprocessing.get_context("spawn")
+    queues = [ctx.Queue() for _ in range(workers)]
+    ready, done = ctx.Queue(), ctx.Queue()
+    processes = [
+        ctx.Process(target=_worker, args=(queue, ready, done), daemon=True)
+        for queue in queues
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+
+    raws = [callback_query(update_id, 1000 + update_id % 5000) for update_id in range(updates)]
+    started = time.perf_counter()
+    pending = [[] for _ in range(workers)]
+    for raw in raws:
+        shard = shard_for(shard_key(raw), workers)
+        pending[shard].append(raw)
+        if len(pending[shard]) >= batch:
+            queues[shard].put(pending[shard])
+            pending[shard] = []
+    for shard, queue in enumerate(queues):
+        if pending[shard]:
+            queue.put(pending[shard])
+        queue.put(None)
+    processed = sum(done.get() for _ in processes)
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+    assert processed == updates
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=40000)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--batch", type=int, default=100, help="апдейтов в одном сообщении очереди")
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"CPU: {multiprocessing.cpu_count()}")
+    print(f"{'workers':>7} {'updates/s':>12} {'speedup':>8}")
+    for workers in (int(value) for value in args.workers.split(",")):
+        rate = args.updates / run(workers, args.updates, args.batch)
+        baseline = baseline or rate
+        print(f"{workers:>7} {rate:>12,.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
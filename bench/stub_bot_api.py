@@ -0,0 +1,84 @@
+"""Заглушка сервера Bot API для бенчмарков.
+
+Отвечает {"ok": true} на любой метод с заданной задержкой и считает
+запросы и TCP-соединения, по которым они пришли. Отдельно запускается
+как сервер, на который можно направить бота через BOT_API_URL:
+
+    python -m bench.stub_bot_api --port 8081 --delay-ms 20
+"""
+import argparse
+import asyncio
+from typing import Any, Dict, Optional, Set
+
+from aiohttp import web
+
+# Ответ getMe: aiogram разбирает его в модель User
+ME = {"id": 111111111, "is_bot": True, "first_name": "stub", "username": "stub_bot"}
+
+
+class StubBotAPI:
+    """Сервер-заглушка со счётчиками запросов и соединений."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.requests = 0
+        self.connections: Set[Any] = set()
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        # Соединение определяется портом клиента: новый порт — новый TCP-хендшейк
+        self.connections.add(request.transport.get_extra_info("peername"))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        result = ME if request.match_info["method"].lower() == "getme" else True
+        return web.json_response({"ok": True, "result": result})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+    def reset(self) -> Dict[str, int]:
+        """Счётчики с прошлого сброса."""
+        counters = {"requests": self.requests, "connections": len(self.connections)}
+        self.requests = 0
+        self.connections = set()
+        return counters
+
+
+async def serve(host: str, port: int, delay: float) -> None:
+    stub = StubBotAPI(delay)
+    url = await stub.start(host, port)
+    print(f"Bot API stub on {url}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            counters = stub.reset()
+            if counters["requests"]:
+                print(f"{counters['requests']} requests over {counters['connections']} connections")
+    finally:
+        await stub.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.delay_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,69 @@
 import asyncio
 import logging
+import os
+import time
 from functools import partial
+from typing import List
 
 from aiogram import Bot, Dispatcher, types
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram import BaseMiddleware
+from aiohttp import web
 
 from config import config
-from database import create_pool, init_db, cleanup_expired_bans, get_active_poll
+from database import (
+    create_pool,
+    init_db,
+    cleanup_stale_polls,
+    close_pool,
+    mark_user_passed,
+    warm_verdict_cache,
+    refresh_passed_filter,
+    load_question_stats,
+    add_question_stats,
+    add_verification_stats,
+    cleanup_verification_stats,
+    cleanup_idempotency_keys,
+    PoolType,
+)
 from handlers import setup_handlers
+from handlers.states import UserState
+from utils.active_polls import active_polls
+from utils.bloom import passed_filter
+from utils.circuit_breaker import DatabaseUnavailable, breaker_view, db_breaker
+from utils.event_log import event_log, events_view
+from utils.fsm_storage import TTLMemoryStorage, fsm_view
+from utils.http_server import Route, start_http_server
+from utils.idempotency import recent_updates
+from utils.leader import LeaderElector, default_node_id, leader_view
 from utils.logger import setup_logging
+from utils.loop_monitor import install_profile_signal, loop_monitor, loop_view
+from utils.message_utils import deletion_batcher
+from utils.moderation import sweep_expired_bans
+from utils.question_engine import question_engine
+from utils.rate_limit import spam_limiter
+from utils.verdict_cache import verdict_cache
+from utils.runtime import create_bot, json_dumps, run
+from utils.staff import staff_cache
+from utils.scheduler import scheduler_view, update_scheduler
+from utils.sharding import run_sharded
+from utils.startup import StartupTimer
+from utils.stats import (
+    MINUTE,
+    MINUTE_RETENTION,
+    bucket_start,
+    stats_view,
+    verification_stats,
+)
+from utils.user_locks import user_locks
+
+# Указываем все типы обновлений явно
+ALLOWED_UPDATES = [
+    "message",
+    "chat_member",
+    "callback_query",
+    "poll",
+    "poll_answer",
+]
 
 
 class ErrorMiddleware(BaseMiddleware):
@@ -18,6 +72,13 @@ class ErrorMiddleware(BaseMiddleware):
     async def __call__(self, handler, event, data: dict) -> None:
         try:
             return await handler(event, data)
+        except DatabaseUnavailable as e:
+            # Апдейт, требующий БД, отбрасывается без трейсбека: чат не стоит
+            db_breaker.record_degraded("update_dropped")
+            logging.warning(
+                f"Update {event.update_id} dropped, database unavailable: {e}"
+            )
+            return None
         except Exception as e:
             logging.error(
                 f"Unhandled exception for update {event.update_id}: {e}", exc_info=True
@@ -25,6 +86,89 @@ class ErrorMiddleware(BaseMiddleware):
             raise
 
 
+class DedupMiddleware(BaseMiddleware):
+    """Отбрасывает повторно доставленные апдейты по update_id."""
+
+    async def __call__(self, handler, event: types.Update, data: dict) -> None:
+        if recent_updates.seen(event.update_id):
+            logging.warning(f"Duplicate update {event.update_id} dropped")
+            return
+        return await handler(event, data)
+
+
+class GroupPrefilterMiddleware(BaseMiddleware):
+    """Отсекает групповые сообщения до создания FSM-контекста.
+
+    Сообщения из чужих чатов, от ботов и от участников, уже прошедших
+    проверку (по кэшу вердиктов в памяти), и от администраторов (по списку
+    в памяти) не доходят до хранилища состояний и обработчиков. Команды
+    пропускаются всегда. Сообщения пользователей, ограниченных за флуд,
+    ставятся в пакетное удаление.
+    """
+
+    async def __call__(self, handler, event: types.Update, data: dict) -> None:
+        message = event.message
+        if message is not None and message.chat.type in ("group", "supergroup"):
+            user = message.from_user
+            if (
+                message.chat.id != config.ALLOWED_CHAT_ID
+                or user is None
+                or user.is_bot
+            ):
+                return
+            staff_cache.refresh_if_stale(data["bot"], message.chat.id)
+            # Сообщения уже ограниченного флудера удаляются без FSM
+            if spam_limiter.is_escalated(message.chat.id, user.id):
+                deletion_batcher.add(message.chat.id, message.message_id)
+                return
+            is_command = bool(message.text) and message.text.startswith("/")
+            if not is_command and (
+                verdict_cache.contains(message.chat.id, user.id)
+                or staff_cache.is_staff(message.chat.id, user.id)
+            ):
+                return
+        return await handler(event, data)
+
+
+class StaffMiddleware(BaseMiddleware):
+    """Обновляет список администраторов по событиям chat_member.
+
+    Администраторы не проходят проверку, а участники, которых добавил
+    администратор, сразу записываются в прошедшие.
+    """
+
+    def __init__(self, pool: PoolType) -> None:
+        self.pool = pool
+
+    async def __call__(self, handler, event: types.ChatMemberUpdated, data: dict) -> None:
+        chat_id = event.chat.id
+        if chat_id == config.ALLOWED_CHAT_ID:
+            staff_cache.apply(event)
+            user = event.new_chat_member.user
+            if staff_cache.is_staff(chat_id, user.id):
+                return
+            added_by = event.from_user
+            if (
+                added_by.id != user.id
+                and event.old_chat_member.status in ("left", "kicked")
+                and event.new_chat_member.status == "member"
+                and staff_cache.is_staff(chat_id, added_by.id)
+            ):
+                await mark_user_passed(self.pool, user.id, chat_id)
+                event_log.emit("trusted", user.id, chat_id, str(added_by.id))
+                logging.info(f"Пользователь {user.id} добавлен администратором {added_by.id}")
+                return
+        return await handler(event, data)
+
+
+class SchedulerMiddleware(BaseMiddleware):
+    """Приоритетная выдача слотов обработки: ответы на квиз раньше шума в чате."""
+
+    async def __call__(self, handler, event: types.Update, data: dict) -> None:
+        async with update_scheduler.slot(event.event_type):
+            return await handler(event, data)
+
+
 class PMMiddleware(BaseMiddleware):
     """Middleware для проверки, что действие с опросами происходит в ЛС."""
 
@@ -32,7 +176,7 @@ class PMMiddleware(BaseMiddleware):
         if isinstance(event, types.Message):
             return await handler(event, data)
         elif isinstance(event, types.PollAnswer):
-            poll_data = await get_active_poll(data["pool"], event.poll_id)
+            poll_data = await active_polls.get(data["pool"], event.poll_id)
             if poll_data and poll_data["chat_id"] == event.user.id:
                 return await handler(event, data)
             else:
@@ -42,46 +186,215 @@ class PMMiddleware(BaseMiddleware):
             return await handler(event, data)
 
 
-async def main() -> None:
-    """Запуск бота."""
-    setup_logging()
-    logging.info("Starting bot...")
-
-    bot = Bot(token=config.BOT_TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
-
-    pool = await create_pool()
-    await init_db(pool)
+def build_dispatcher(bot: Bot, pool: PoolType) -> Dispatcher:
+    """Создание диспетчера с middleware и обработчиками."""
+    # Завершённые сессии живут недолго: дальше участника отсекает кэш вердиктов
+    storage = TTLMemoryStorage(
+        config.FSM_TTL, config.FSM_FINISHED_TTL, (UserState.completed,)
+    )
+    # Апдейты одного пользователя обрабатываются по очереди, разных — параллельно
+    dp = Dispatcher(storage=storage, events_isolation=user_locks)
 
-    # Регистрируем middleware
+    # Регистрируем middleware; дубли и префильтр отсекаются до FSM.
+    # Блокировка пользователя берётся раньше слота планировщика: апдейты
+    # флудера ждут друг друга на своей блокировке, занимая не больше
+    # одного слота, и не вытесняют из полосы остальных
+    dp.update.outer_middleware.unregister(dp.fsm)
+    dp.update.outer_middleware(DedupMiddleware())
+    dp.update.outer_middleware(GroupPrefilterMiddleware())
+    dp.update.outer_middleware(dp.fsm)
+    dp.update.outer_middleware(SchedulerMiddleware())
     dp.update.outer_middleware(ErrorMiddleware())
     dp.message.outer_middleware(PMMiddleware())
+    dp.chat_member.outer_middleware(StaffMiddleware(pool))
 
     # Настраиваем обработчики
     setup_handlers(dp, bot=bot, pool=pool)
+    return dp
+
+
+async def prepare_database() -> PoolType:
+    """Создание пула подключений и проверка схемы БД."""
+    pool = await create_pool()
+    await init_db(pool)
+    return pool
+
 
-    # Задача для очистки истекших банов
-    async def cleanup_task():
+async def cleanup_task(bot: Bot, pool: PoolType, elector: LeaderElector) -> None:
+    """Задача для исключения пользователей с истёкшим мутом и очистки зависших опросов.
+
+    Работает только на узле-лидере, чтобы реплики не дублировали друг друга.
+    """
+    while True:
+        if not elector.is_leader:
+            await asyncio.sleep(config.LEADER_RENEW_INTERVAL)
+            continue
+        try:
+            await sweep_expired_bans(bot, pool)
+            await cleanup_stale_polls(
+                pool, config.QUIZ_ANSWER_TIMEOUT + config.CLEANUP_INTERVAL
+            )
+            await cleanup_verification_stats(
+                pool, MINUTE, bucket_start(time.time() - MINUTE_RETENTION, MINUTE)
+            )
+            if config.IDEMPOTENCY_BACKEND == "db":
+                await cleanup_idempotency_keys(pool)
+        except DatabaseUnavailable as e:
+            logging.warning(f"Cleanup skipped, database unavailable: {e}")
+        await asyncio.sleep(config.CLEANUP_INTERVAL)
+
+
+async def passed_filter_task(pool: PoolType) -> None:
+    """Загрузка фильтра Блума (снапшот или таблица), затем обмен снапшотом и перестройка."""
+    while True:
+        try:
+            await refresh_passed_filter(pool, config.ALLOWED_CHAT_ID)
+        except Exception as e:
+            # Задача не должна завершаться: пока фильтр не готов, решает БД
+            logging.error(f"Passed-users filter refresh failed: {e}")
+        await asyncio.sleep(config.BLOOM_SYNC_INTERVAL)
+
+
+async def question_stats_task(pool: PoolType) -> None:
+    """Загрузка статистики вопросов, затем периодический сброс счётчиков и пересчёт весов."""
+    loaded = False
+    while True:
+        if not loaded:
+            try:
+                question_engine.load(await load_question_stats(pool))
+                loaded = True
+            except Exception as e:
+                logging.error(f"Не удалось загрузить статистику вопросов, повтор позже: {e}")
+        await asyncio.sleep(config.QUIZ_STATS_FLUSH_INTERVAL)
+        # До загрузки итогов приращения не сбрасываются: иначе загрузка
+        # учла бы их второй раз
+        if not loaded:
+            continue
+        rows = question_engine.take_pending()
+        if rows:
+            try:
+                await add_question_stats(pool, rows)
+            except Exception as e:
+                logging.error(f"Не удалось сохранить статистику вопросов: {e}")
+                question_engine.restore_pending(rows)
+        question_engine.rebuild()
+
+
+async def verification_stats_task(pool: PoolType) -> None:
+    """Периодический сброс счётчиков исходов проверки в verification_stats."""
+    while True:
+        await asyncio.sleep(config.STATS_FLUSH_INTERVAL)
+        rows = verification_stats.take_pending()
+        if rows:
+            try:
+                await add_verification_stats(pool, rows)
+            except Exception as e:
+                logging.error(f"Не удалось сохранить статистику проверок: {e}")
+                verification_stats.restore_pending(rows)
+
+
+async def event_log_task(pool: PoolType) -> None:
+    """Пакетная запись журнала событий каждые EVENT_FLUSH_INTERVAL_MS."""
+    try:
         while True:
-            await cleanup_expired_bans(pool)
-            await asyncio.sleep(config.CLEANUP_INTERVAL)
-
-    asyncio.create_task(cleanup_task())
-
-    # Указываем все типы обновлений явно
-    allowed_updates = [
-        "message",
-        "chat_member",
-        "callback_query",
-        "poll",
-        "poll_answer",
+            await asyncio.sleep(config.EVENT_FLUSH_INTERVAL_MS / 1000)
+            await event_log.flush(pool)
+    finally:
+        # Дописываем хвост буфера при остановке
+        await event_log.flush(pool)
+
+
+def whitelist_reload_view(pool: PoolType):
+    """HTTP-обработчик POST /whitelist/reload: подхват импорта whitelist.py без перезапуска.
+
+    Подмешивает обновлённый снапшот фильтра Блума (если снапшота нет,
+    перестраивает фильтр из таблицы) и прогревает кэш вердиктов из
+    passed_users (chat_id — параметр запроса).
+    """
+
+    async def handler(request: web.Request) -> web.Response:
+        try:
+            chat_id = int(request.query.get("chat_id", config.ALLOWED_CHAT_ID))
+        except ValueError:
+            raise web.HTTPBadRequest(text="chat_id must be an integer")
+        merged = passed_filter.merge_snapshot()
+        if not merged and not os.path.exists(passed_filter.snapshot_path):
+            await refresh_passed_filter(pool, chat_id, force=True)
+        await warm_verdict_cache(pool, chat_id)
+        return web.json_response(
+            {"filter_merged": merged, "verdict_cache": len(verdict_cache)},
+            dumps=json_dumps(),
+        )
+
+    return handler
+
+
+def http_routes(
+    pool: PoolType, elector: LeaderElector, storage: TTLMemoryStorage
+) -> List[Route]:
+    """Маршруты служебного HTTP API."""
+    return [
+        ("GET", "/stats", stats_view(pool)),
+        ("GET", "/events", events_view(pool)),
+        ("GET", "/db", breaker_view),
+        ("GET", "/leader", leader_view(elector)),
+        ("GET", "/fsm", fsm_view(storage)),
+        ("GET", "/scheduler", scheduler_view),
+        ("GET", "/loop", loop_view),
+        ("POST", "/whitelist/reload", whitelist_reload_view(pool)),
     ]
+
+
+async def main() -> None:
+    """Запуск бота."""
+    timer = StartupTimer()
+    setup_logging()
+    logging.info("Starting bot...")
+
+    if config.SHARD_WORKERS > 1:
+        await run_sharded(config.SHARD_WORKERS, ALLOWED_UPDATES)
+        return
+
+    bot = create_bot()
+
+    # Прогрев пула БД и получение данных бота выполняются параллельно
+    pool, _ = await asyncio.gather(
+        timer.measure("database", prepare_database()),
+        timer.measure("bot_identity", bot.me()),
+    )
+
+    dp = build_dispatcher(bot, pool)
+    elector = LeaderElector(pool, default_node_id())
+    leader_task = asyncio.create_task(elector.run())
+    asyncio.create_task(cleanup_task(bot, pool, elector))
+    asyncio.create_task(passed_filter_task(pool))
+    asyncio.create_task(question_stats_task(pool))
+    asyncio.create_task(verification_stats_task(pool))
+    events_task = asyncio.create_task(event_log_task(pool))
+    deletions_task = asyncio.create_task(deletion_batcher.run(bot))
+    asyncio.create_task(dp.storage.run())
+    asyncio.create_task(loop_monitor.run())
+    install_profile_signal()
+    http_runner = await start_http_server(http_routes(pool, elector, dp.storage))
+    # Кэш вердиктов прогревается в фоне: промахи до этого уходят в БД
+    asyncio.create_task(warm_verdict_cache(pool, config.ALLOWED_CHAT_ID))
+    staff_cache.refresh(bot, config.ALLOWED_CHAT_ID)
+    timer.report()
+
     try:
-        await dp.start_polling(bot, allowed_updates=allowed_updates)
+        await dp.start_polling(bot, allowed_updates=ALLOWED_UPDATES)
     finally:
+        if http_runner is not None:
+            await http_runner.cleanup()
+        events_task.cancel()
+        leader_task.cancel()
+        deletions_task.cancel()
+        await asyncio.gather(
+            events_task, leader_task, deletions_task, return_exceptions=True
+        )
         await bot.session.close()
-        await pool.close()
+        await close_pool(pool)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -1,5 +1,5 @@
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Literal
 import json
 
 from dotenv import load_dotenv
@@ -28,17 +28,80 @@ class Config(BaseModel):
     MESSAGE_DELETE_DELAY_TIMEOUT: int  # Задержка удаления при таймауте квиза
     DEFAULT_MESSAGE_DELETE_DELAY: int  # Задержка удаления по умолчанию
     MUTE_DURATION: int  # Длительность мута
-    UNBAN_DELAY: int  # Пауза перед анбаном
-    DB_DELETE_DELAY: int  # Пауза перед удалением из БД
     CLEANUP_INTERVAL: int  # Интервал проверки истекших банов
+    CLEANUP_BATCH_SIZE: int = 1000  # Истёкших банов за один проход пачки
+    QUIZ_MODE: str = "pm"  # "pm" — опрос в ЛС, "inline" — кнопки прямо в группе
+    CALLBACK_SECRET: str = ""  # Ключ подписи callback_data (пусто — из BOT_TOKEN)
+    RUNTIME_PROFILE: Literal["default", "fast"] = "default"  # "fast" — uvloop и orjson, если установлены
+    VERDICT_CACHE_SIZE: int = 100000  # Максимум прошедших пользователей в памяти
+    BLOOM_CAPACITY: int = 1000000  # Ожидаемое число прошедших пользователей
+    BLOOM_ERROR_RATE: float = 0.01  # Доля ложноположительных ответов фильтра
+    BLOOM_SNAPSHOT_PATH: str = "data/passed_users.bloom"  # Снапшот фильтра
+    BLOOM_REBUILD_INTERVAL: int = 3600  # Перестройка фильтра из таблицы
+    BLOOM_SYNC_INTERVAL: int = 5  # Обмен ключами фильтра с другими процессами через снапшот
+    QUIZ_ACTIVE_POOL_SIZE: int = 0  # Размер активного пула вопросов (0 — все)
+    QUIZ_STATS_FLUSH_INTERVAL: int = 60  # Сброс статистики вопросов в БД
+    STATS_FLUSH_INTERVAL: int = 30  # Сброс счётчиков исходов проверки в БД
+    EVENT_BUFFER_SIZE: int = 10000  # Максимум событий журнала в памяти до записи
+    EVENT_FLUSH_INTERVAL_MS: int = 500  # Интервал пакетной записи журнала событий
+    DB_TIMEOUT: float = 2.0  # Таймаут одного обращения к БД, секунд
+    DB_BREAKER_THRESHOLD: int = 5  # Сбоев подряд до перехода в деградированный режим
+    DB_BREAKER_RESET: int = 10  # Пауза перед пробным запросом к БД, секунд
+    DB_WRITE_QUEUE_SIZE: int = 10000  # Отложенных записей в памяти, пока БД недоступна
+    SPAM_WINDOW: int = 10  # Окно подсчёта сообщений непроверенного пользователя, секунд
+    SPAM_THRESHOLD: int = 5  # Сообщений за окно, после которых пользователь получает мут
+    RATE_LIMIT_MAX_USERS: int = 100000  # Максимум отслеживаемых пользователей в памяти
+    DELETE_BATCH_INTERVAL_MS: int = 300  # Интервал пакетного удаления сообщений
+    FSM_TTL: int = 3600  # Срок жизни FSM-сессии с момента последнего изменения, секунд
+    FSM_FINISHED_TTL: int = 600  # Срок жизни сессии после успешной проверки, секунд
+    STAFF_CACHE_TTL: int = 600  # Перезагрузка списка администраторов чата, секунд
+    UPDATE_DEDUP_SIZE: int = 10000  # Сколько последних update_id помнить для отсева дублей
+    IDEMPOTENCY_BACKEND: Literal["memory", "db"] = "memory"  # "db" — общие ключи операций для реплик
+    IDEMPOTENCY_MAX_KEYS: int = 100000  # Максимум ключей операций в памяти
+    SCHEDULER_CONCURRENCY: int = 200  # Апдейтов в обработке одновременно (все полосы)
+    LANE_ANSWERS_CONCURRENCY: int = 150  # Лимит полосы ответов на квиз и кнопок
+    LANE_JOINS_CONCURRENCY: int = 30  # Лимит полосы вступлений в чат
+    LANE_MESSAGES_CONCURRENCY: int = 30  # Лимит полосы сообщений в группе
+    SCHEDULER_AGING_MS: int = 2000  # Ожидание, поднимающее апдейт на один приоритет
+    LOOP_LAG_INTERVAL_MS: int = 100  # Период замера задержки event loop
+    LOOP_BLOCK_THRESHOLD_MS: int = 500  # Блокировка цикла, после которой в лог пишется стек
+    PROFILE_DIR: str = "data/profiles"  # Каталог для файлов профилировщика
+    PROFILE_SECONDS: int = 30  # Длительность профилирования по SIGUSR1 или /profile
+    PROFILE_HZ: int = 100  # Частота снятия стека профилировщиком
+    BOT_API_URL: str = ""  # Адрес своего telegram-bot-api (пусто — api.telegram.org)
+    BOT_API_LOCAL: bool = False  # Сервер Bot API запущен с --local
+    BOT_API_POOL_SIZE: int = 100  # Максимум одновременных соединений с Bot API
+    BOT_API_KEEPALIVE: float = 30.0  # Сколько держать простаивающее соединение, секунд
+    BOT_API_DNS_CACHE_TTL: int = 3600  # Кэш DNS для адреса Bot API, секунд
+    BOT_API_TIMEOUT: float = 15.0  # Таймаут запроса к Bot API по умолчанию, секунд
+    BOT_API_METHOD_TIMEOUTS: str = "answerCallbackQuery=5,deleteMessage=5,deleteMessages=5"  # Таймауты отдельных методов
+    RAID_WINDOW: int = 300  # Окно поиска похожих первых сообщений, секунд
+    RAID_CLUSTER_SIZE: int = 3  # Похожих сообщений разных пользователей для признания рейда
+    RAID_SIMHASH_DISTANCE: int = 3  # Допустимое расстояние Хэмминга SimHash (меньше 4)
+    RAID_MIN_TEXT_LENGTH: int = 16  # Минимум букв в тексте для сравнения отпечатков
+    ACTIVE_POLL_CACHE_SIZE: int = 100000  # Максимум активных опросов в памяти
+    USER_LOCK_STRIPES: int = 1024  # Полос блокировок для последовательной обработки пользователя
+    NODE_ID: str = ""  # Имя узла для выбора лидера (пусто — хост:PID)
+    LEADER_RENEW_INTERVAL: int = 5  # Продление и перехват лидерства, секунд
+    HTTP_HOST: str = "127.0.0.1"  # Адрес служебного HTTP API
+    HTTP_PORT: int = 0  # Порт служебного HTTP API (0 — выключен)
+    HTTP_TOKEN: str = ""  # Токен Bearer для HTTP API (пусто — без проверки)
+    SHARD_WORKERS: int = 1  # Количество процессов-воркеров (1 — без шардирования)
+    SHARD_BACKLOG: int = 2000  # Апдейтов, принятых шардом и ещё не обработанных
 
     class Config:
         extra = "forbid"  # Запрещаем лишние поля
 
 
-# Загружаем и валидируем конфигурацию
+# Загружаем и валидируем конфигурацию (незаданные переменные берут значение по умолчанию)
 try:
-    config = Config(**{key: os.getenv(key) for key in Config.__annotations__})
+    config = Config(
+        **{
+            key: value
+            for key in Config.__annotations__
+            if (value := os.getenv(key)) is not None
+        }
+    )
 except ValidationError as e:
     raise ValueError(f"Ошибка в конфигурации: {e}")
 
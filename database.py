@@ -1,19 +1,62 @@
+import functools
 import logging
 from datetime import datetime
-from typing import Union, Optional
-
-import asyncpg
-import aiomysql
-import pymysql
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from config import config
+from migrations import run_migrations
+from utils.bloom import passed_filter
+from utils.circuit_breaker import DatabaseUnavailable, db_breaker
+from utils.verdict_cache import verdict_cache
+
+# Драйверы импортируются лениво: нужен только тот, что указан в DB_TYPE
+if TYPE_CHECKING:
+    import asyncpg
+    import aiomysql
+
+    PoolType = Union[asyncpg.Pool, aiomysql.Pool]
+else:
+    PoolType = Any
+
+
+def guarded(write: bool = False) -> Callable:
+    """Обращение к БД через автомат защиты db_breaker с таймаутом DB_TIMEOUT.
+
+    При недоступности БД чтение поднимает DatabaseUnavailable, а запись
+    (write=True) откладывается в очередь и будет выполнена после
+    восстановления.
+    """
+
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await db_breaker.call(func, *args, **kwargs)
+            except DatabaseUnavailable:
+                if not write:
+                    raise
+                db_breaker.queue_write(func, args, kwargs)
+                logging.warning(f"DB unavailable, {func.__name__} queued")
 
-PoolType = Union[asyncpg.Pool, aiomysql.Pool]
+        return wrapper
+
+    return decorate
 
 
 async def create_pool() -> PoolType:
     """Создание пула подключений в зависимости от DB_TYPE."""
     if config.DB_TYPE == "postgres":
+        import asyncpg
+
         pool = await asyncpg.create_pool(
             user=config.DB_USER,
             password=config.DB_PASSWORD,
@@ -21,9 +64,11 @@ async def create_pool() -> PoolType:
             host=config.DB_HOST,
             port=config.DB_PORT,
         )
-        print("Подключение к PostgreSQL создано")
+        logging.info("Подключение к PostgreSQL создано")
         return pool
     elif config.DB_TYPE == "mysql":
+        import aiomysql
+
         if config.DB_SOCKET:
             pool = await aiomysql.create_pool(
                 unix_socket=config.DB_SOCKET,
@@ -32,7 +77,7 @@ async def create_pool() -> PoolType:
                 db=config.DB_NAME,
                 autocommit=True,
             )
-            print("Подключение к MySQL через Unix-сокет создано")
+            logging.info("Подключение к MySQL через Unix-сокет создано")
         else:
             pool = await aiomysql.create_pool(
                 host=config.DB_HOST,
@@ -42,145 +87,251 @@ async def create_pool() -> PoolType:
                 db=config.DB_NAME,
                 autocommit=True,
             )
-            print("Подключение к MySQL через TCP создано")
+            logging.info("Подключение к MySQL через TCP создано")
         return pool
     else:
         raise ValueError("Неподдерживаемый DB_TYPE")
 
 
-async def init_db(pool: PoolType) -> None:
-    """Инициализация таблиц и индексов в базе данных."""
+async def close_pool(pool: PoolType) -> None:
+    """Закрытие пула подключений."""
     if config.DB_TYPE == "postgres":
-        async with pool.acquire() as conn:
-            await conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS passed_users (
-                    user_id BIGINT PRIMARY KEY,
-                    passed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                CREATE TABLE IF NOT EXISTS banned_users (
-                    user_id BIGINT PRIMARY KEY,
-                    banned_until TIMESTAMP
-                );
-                CREATE TABLE IF NOT EXISTS active_polls (
-                    poll_id VARCHAR(255) PRIMARY KEY,
-                    user_id BIGINT,
-                    chat_id BIGINT,
-                    message_id BIGINT,
-                    thread_id BIGINT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                CREATE INDEX IF NOT EXISTS idx_banned_users_banned_until 
-                ON banned_users (banned_until);
-                """
-            )
+        await pool.close()
     elif config.DB_TYPE == "mysql":
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS passed_users (
-                        user_id BIGINT PRIMARY KEY,
-                        passed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    """
-                )
-                await cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS banned_users (
-                        user_id BIGINT PRIMARY KEY,
-                        banned_until TIMESTAMP
-                    )
-                    """
-                )
-                await cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS active_polls (
-                        poll_id VARCHAR(255) PRIMARY KEY,
-                        user_id BIGINT,
-                        chat_id BIGINT,
-                        message_id BIGINT,
-                        thread_id BIGINT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    """
-                )
-                try:
-                    await cur.execute(
-                        """
-                        CREATE INDEX idx_banned_users_banned_until 
-                        ON banned_users (banned_until)
-                        """
-                    )
-                except pymysql.err.OperationalError as e:
-                    if e.args[0] == 1061:  # Duplicate key name
-                        pass
-                    else:
-                        raise
-    logging.info("Database initialized")
+        pool.close()
+        await pool.wait_closed()
+
+
+async def init_db(pool: PoolType) -> None:
+    """Приведение схемы БД к актуальной версии миграций."""
+    version = await run_migrations(pool)
+    logging.info(f"Database initialized (schema version {version})")
+
 
+async def check_user_passed(pool: PoolType, user_id: int, chat_id: int) -> bool:
+    """Проверка, прошел ли пользователь викторину в чате."""
+    if verdict_cache.contains(chat_id, user_id):
+        return True
+    # Отрицательный ответ готового фильтра Блума точен: новичок
+    # отсекается без запроса к БД
+    if passed_filter.definitely_absent(chat_id, user_id):
+        return False
 
-async def check_user_passed(pool: PoolType, user_id: int) -> bool:
-    """Проверка, прошел ли пользователь викторину."""
+    passed = await _fetch_user_passed(pool, user_id, chat_id)
+    if passed:
+        verdict_cache.add(chat_id, user_id)
+    return passed
+
+
+@guarded()
+async def _fetch_user_passed(pool: PoolType, user_id: int, chat_id: int) -> bool:
     if config.DB_TYPE == "postgres":
         async with pool.acquire() as conn:
             return await conn.fetchval(
-                "SELECT EXISTS(SELECT 1 FROM passed_users WHERE user_id = $1)", user_id
+                "SELECT EXISTS(SELECT 1 FROM passed_users WHERE chat_id = $1 AND user_id = $2)",
+                chat_id,
+                user_id,
             )
     elif config.DB_TYPE == "mysql":
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(
-                    "SELECT EXISTS(SELECT 1 FROM passed_users WHERE user_id = %s)",
-                    (user_id,),
+                    "SELECT EXISTS(SELECT 1 FROM passed_users WHERE chat_id = %s AND user_id = %s)",
+                    (chat_id, user_id),
                 )
                 result = await cur.fetchone()
                 return bool(result[0])
 
 
-async def check_user_banned(pool: PoolType, user_id: int) -> bool:
-    """Проверка, забанен ли пользователь."""
+@guarded()
+async def check_user_banned(pool: PoolType, user_id: int, chat_id: int) -> bool:
+    """Проверка, забанен ли пользователь в чате."""
     if config.DB_TYPE == "postgres":
         async with pool.acquire() as conn:
             return await conn.fetchval(
-                "SELECT EXISTS(SELECT 1 FROM banned_users WHERE user_id = $1 AND banned_until > NOW())",
+                "SELECT EXISTS(SELECT 1 FROM banned_users "
+                "WHERE chat_id = $1 AND user_id = $2 AND banned_until > NOW())",
+                chat_id,
                 user_id,
             )
     elif config.DB_TYPE == "mysql":
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(
-                    "SELECT EXISTS(SELECT 1 FROM banned_users WHERE user_id = %s AND banned_until > NOW())",
-                    (user_id,),
+                    "SELECT EXISTS(SELECT 1 FROM banned_users "
+                    "WHERE chat_id = %s AND user_id = %s AND banned_until > NOW())",
+                    (chat_id, user_id),
                 )
                 result = await cur.fetchone()
                 return bool(result[0])
 
 
-async def mark_user_passed(pool: PoolType, user_id: int) -> None:
-    """Отметка пользователя как прошедшего викторину."""
+async def mark_user_passed(pool: PoolType, user_id: int, chat_id: int) -> None:
+    """Отметка пользователя как прошедшего викторину в чате.
+
+    Состояние в памяти обновляется сразу: пока БД недоступна и запись
+    ждёт в очереди, пользователь уже считается прошедшим.
+    """
+    verdict_cache.add(chat_id, user_id)
+    passed_filter.add(chat_id, user_id)
+    await _store_user_passed(pool, user_id, chat_id)
+
+
+@guarded(write=True)
+async def _store_user_passed(pool: PoolType, user_id: int, chat_id: int) -> None:
     if config.DB_TYPE == "postgres":
         async with pool.acquire() as conn:
             await conn.execute(
-                "INSERT INTO passed_users (user_id) VALUES ($1) ON CONFLICT DO NOTHING",
+                "INSERT INTO passed_users (chat_id, user_id) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+                chat_id,
                 user_id,
             )
     elif config.DB_TYPE == "mysql":
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(
-                    "INSERT INTO passed_users (user_id) VALUES (%s) ON DUPLICATE KEY UPDATE user_id = user_id",
-                    (user_id,),
+                    "INSERT INTO passed_users (chat_id, user_id) VALUES (%s, %s) "
+                    "ON DUPLICATE KEY UPDATE user_id = user_id",
+                    (chat_id, user_id),
+                )
+
+
+async def bulk_mark_users_passed(
+    pool: PoolType, user_ids: List[int], chat_id: int
+) -> int:
+    """Массовая отметка пользователей прошедшими; возвращает число новых записей.
+
+    PostgreSQL: COPY во временную таблицу и один INSERT ... SELECT.
+    MySQL: многострочный INSERT через executemany.
+    """
+    if not user_ids:
+        return 0
+    for user_id in user_ids:
+        passed_filter.add(chat_id, user_id)
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE IF NOT EXISTS passed_users_import (
+                        chat_id BIGINT,
+                        user_id BIGINT
+                    ) ON COMMIT DELETE ROWS
+                    """
+                )
+                await conn.copy_records_to_table(
+                    "passed_users_import",
+                    records=[(chat_id, user_id) for user_id in user_ids],
+                )
+                result = await conn.execute(
+                    """
+                    INSERT INTO passed_users (chat_id, user_id)
+                    SELECT DISTINCT chat_id, user_id FROM passed_users_import
+                    ON CONFLICT DO NOTHING
+                    """
                 )
+                return int(result.split()[-1])
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(
+                    "INSERT INTO passed_users (chat_id, user_id) VALUES (%s, %s) "
+                    "ON DUPLICATE KEY UPDATE user_id = user_id",
+                    [(chat_id, user_id) for user_id in user_ids],
+                )
+                return cur.rowcount
+
+
+async def iter_passed_users(
+    pool: PoolType, chat_id: int, batch_size: int = 10000
+) -> AsyncIterator[List[int]]:
+    """Потоковое чтение прошедших пользователей чата пачками (keyset-пагинация по PK)."""
+    last_user_id = -(2**63)  # минимальный BIGINT
+    while True:
+        if config.DB_TYPE == "postgres":
+            async with pool.acquire() as conn:
+                rows = await conn.fetch(
+                    "SELECT user_id FROM passed_users WHERE chat_id = $1 "
+                    "AND user_id > $2 ORDER BY user_id LIMIT $3",
+                    chat_id,
+                    last_user_id,
+                    batch_size,
+                )
+                batch = [row["user_id"] for row in rows]
+        elif config.DB_TYPE == "mysql":
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        "SELECT user_id FROM passed_users WHERE chat_id = %s "
+                        "AND user_id > %s ORDER BY user_id LIMIT %s",
+                        (chat_id, last_user_id, batch_size),
+                    )
+                    batch = [row[0] for row in await cur.fetchall()]
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+        last_user_id = batch[-1]
+
+
+async def warm_verdict_cache(
+    pool: PoolType,
+    chat_id: int,
+    user_filter: Optional[Callable[[int], bool]] = None,
+) -> None:
+    """Заполнение кэша вердиктов из passed_users до его лимита.
+
+    user_filter позволяет шарду держать в памяти только своих пользователей.
+    """
+    async for batch in iter_passed_users(pool, chat_id):
+        for user_id in batch:
+            if user_filter is None or user_filter(user_id):
+                verdict_cache.add(chat_id, user_id)
+        if verdict_cache.is_full():
+            break
+    logging.info(f"Verdict cache warmed: {len(verdict_cache)} users")
+
+
+async def refresh_passed_filter(
+    pool: PoolType, chat_id: int, force: bool = False
+) -> None:
+    """Загрузка фильтра Блума из снапшота или его перестройка из passed_users.
 
+    Между перестройками фильтр обменивается ключами с другими процессами
+    через снапшот. Перестройка выполняется раз в BLOOM_REBUILD_INTERVAL
+    (или при force): она подхватывает записи, добавленные в обход бота
+    и снапшота, например вручную в БД.
+    """
+    if not force:
+        if not passed_filter.ready and passed_filter.load_snapshot():
+            logging.info("Passed-users filter loaded from snapshot")
+            return
+        if not passed_filter.needs_rebuild():
+            passed_filter.sync()
+            return
 
-async def ban_user_in_db(pool: PoolType, user_id: int, until: datetime) -> None:
-    """Запись бана пользователя в БД."""
+    rebuilt = passed_filter.begin_rebuild()
+    count = 0
+    async for batch in iter_passed_users(pool, chat_id):
+        for user_id in batch:
+            rebuilt.add(chat_id, user_id)
+        count += len(batch)
+    passed_filter.finish_rebuild()
+    logging.info(f"Passed-users filter rebuilt from table: {count} users")
+
+
+@guarded(write=True)
+async def ban_user_in_db(
+    pool: PoolType, user_id: int, chat_id: int, until: datetime
+) -> None:
+    """Запись бана пользователя в БД; по истечении его обработает sweep_expired_bans."""
     if config.DB_TYPE == "postgres":
         async with pool.acquire() as conn:
             await conn.execute(
-                "INSERT INTO banned_users (user_id, banned_until) VALUES ($1, $2) "
-                "ON CONFLICT (user_id) DO UPDATE SET banned_until = $2",
+                "INSERT INTO banned_users (chat_id, user_id, banned_until) VALUES ($1, $2, $3) "
+                "ON CONFLICT (chat_id, user_id) DO UPDATE SET banned_until = $3",
+                chat_id,
                 user_id,
                 until,
             )
@@ -188,49 +339,89 @@ async def ban_user_in_db(pool: PoolType, user_id: int, until: datetime) -> None:
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(
-                    "INSERT INTO banned_users (user_id, banned_until) VALUES (%s, %s) "
+                    "INSERT INTO banned_users (chat_id, user_id, banned_until) VALUES (%s, %s, %s) "
                     "ON DUPLICATE KEY UPDATE banned_until = %s",
-                    (user_id, until, until),
+                    (chat_id, user_id, until, until),
                 )
 
 
-async def cleanup_expired_bans(pool: PoolType) -> None:
-    """Удаление истёкших банов."""
+@guarded()
+async def fetch_expired_bans(pool: PoolType, limit: int) -> List[Tuple[int, int]]:
+    """Пачка истёкших банов (chat_id, user_id), самые старые первыми, по индексу banned_until."""
     if config.DB_TYPE == "postgres":
         async with pool.acquire() as conn:
-            result = await conn.execute(
-                "DELETE FROM banned_users WHERE banned_until <= NOW()"
+            rows = await conn.fetch(
+                "SELECT chat_id, user_id FROM banned_users WHERE banned_until <= NOW() "
+                "ORDER BY banned_until LIMIT $1",
+                limit,
             )
-            if result != "DELETE 0":
-                logging.info(f"Removed expired bans: {result}")
+            return [(row["chat_id"], row["user_id"]) for row in rows]
     elif config.DB_TYPE == "mysql":
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(
-                    "DELETE FROM banned_users WHERE banned_until <= NOW()"
+                    "SELECT chat_id, user_id FROM banned_users WHERE banned_until <= NOW() "
+                    "ORDER BY banned_until LIMIT %s",
+                    (limit,),
                 )
-                if cur.rowcount > 0:
-                    logging.info(f"Removed expired bans: {cur.rowcount}")
+                return [tuple(row) for row in await cur.fetchall()]
 
 
-async def delete_user_from_db(pool: PoolType, user_id: int) -> None:
-    """Удаление пользователя из таблиц passed_users и banned_users."""
+@guarded()
+async def delete_expired_bans(pool: PoolType, bans: List[Tuple[int, int]]) -> None:
+    """Удаление обработанных банов одним запросом.
+
+    Повторный бан, записанный после выборки, не удаляется: условие
+    banned_until <= NOW() проверяется ещё раз.
+    """
+    if not bans:
+        return
+    chat_ids, user_ids = (list(column) for column in zip(*bans))
     if config.DB_TYPE == "postgres":
         async with pool.acquire() as conn:
-            await conn.execute("DELETE FROM passed_users WHERE user_id = $1", user_id)
-            await conn.execute("DELETE FROM banned_users WHERE user_id = $1", user_id)
+            await conn.execute(
+                """
+                DELETE FROM banned_users b
+                USING unnest($1::BIGINT[], $2::BIGINT[]) AS d (chat_id, user_id)
+                WHERE b.chat_id = d.chat_id AND b.user_id = d.user_id
+                  AND b.banned_until <= NOW()
+                """,
+                chat_ids,
+                user_ids,
+            )
     elif config.DB_TYPE == "mysql":
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
-                await cur.execute(
-                    "DELETE FROM passed_users WHERE user_id = %s", (user_id,)
+                await cur.executemany(
+                    "DELETE FROM banned_users "
+                    "WHERE chat_id = %s AND user_id = %s AND banned_until <= NOW()",
+                    bans,
                 )
+
+
+@guarded()
+async def cleanup_stale_polls(pool: PoolType, max_age: int) -> None:
+    """Удаление опросов, которые пережили свой таймер (например, после рестарта)."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            result = await conn.execute(
+                "DELETE FROM active_polls WHERE created_at < NOW() - make_interval(secs => $1)",
+                max_age,
+            )
+            if result != "DELETE 0":
+                logging.info(f"Removed stale polls: {result}")
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
                 await cur.execute(
-                    "DELETE FROM banned_users WHERE user_id = %s", (user_id,)
+                    "DELETE FROM active_polls WHERE created_at < NOW() - INTERVAL %s SECOND",
+                    (max_age,),
                 )
-    logging.info(f"User {user_id} deleted from database")
+                if cur.rowcount > 0:
+                    logging.info(f"Removed stale polls: {cur.rowcount}")
 
 
+@guarded(write=True)
 async def add_active_poll(
     pool: PoolType,
     poll_id: str,
@@ -267,6 +458,7 @@ async def add_active_poll(
                 )
 
 
+@guarded()
 async def get_active_poll(pool: PoolType, poll_id: str) -> Optional[dict]:
     """Получить данные активного опроса по poll_id."""
     if config.DB_TYPE == "postgres":
@@ -294,6 +486,7 @@ async def get_active_poll(pool: PoolType, poll_id: str) -> Optional[dict]:
                 return None
 
 
+@guarded(write=True)
 async def remove_active_poll(pool: PoolType, poll_id: str) -> None:
     """Удалить активный опрос из БД."""
     if config.DB_TYPE == "postgres":
@@ -305,3 +498,232 @@ async def remove_active_poll(pool: PoolType, poll_id: str) -> None:
                 await cur.execute(
                     "DELETE FROM active_polls WHERE poll_id = %s", (poll_id,)
                 )
+
+
+@guarded()
+async def load_question_stats(pool: PoolType) -> List[tuple]:
+    """Накопленная статистика ответов по вопросам и языкам."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT question_id, language, correct, incorrect, timeout FROM question_stats"
+            )
+            return [tuple(row) for row in rows]
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "SELECT question_id, language, correct, incorrect, timeout FROM question_stats"
+                )
+                return list(await cur.fetchall())
+
+
+@guarded()
+async def add_question_stats(pool: PoolType, rows: List[tuple]) -> None:
+    """Прибавление приращений (question_id, language, correct, incorrect, timeout)."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO question_stats (question_id, language, correct, incorrect, timeout)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (question_id, language) DO UPDATE SET
+                    correct = question_stats.correct + EXCLUDED.correct,
+                    incorrect = question_stats.incorrect + EXCLUDED.incorrect,
+                    timeout = question_stats.timeout + EXCLUDED.timeout
+                """,
+                rows,
+            )
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(
+                    """
+                    INSERT INTO question_stats (question_id, language, correct, incorrect, timeout)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        correct = correct + VALUES(correct),
+                        incorrect = incorrect + VALUES(incorrect),
+                        timeout = timeout + VALUES(timeout)
+                    """,
+                    rows,
+                )
+
+
+@guarded()
+async def add_verification_stats(pool: PoolType, rows: List[tuple]) -> None:
+    """Прибавление приращений счётчиков (granularity, bucket_start, outcome, count)."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO verification_stats (granularity, bucket_start, outcome, count)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (granularity, bucket_start, outcome) DO UPDATE SET
+                    count = verification_stats.count + EXCLUDED.count
+                """,
+                rows,
+            )
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(
+                    """
+                    INSERT INTO verification_stats (granularity, bucket_start, outcome, count)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+                    """,
+                    rows,
+                )
+
+
+@guarded()
+async def load_verification_stats(
+    pool: PoolType, granularity: int, since: datetime
+) -> List[Tuple[str, int]]:
+    """Суммы по исходам за бакеты, начиная с since; читаются только бакеты окна."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT outcome, SUM(count) FROM verification_stats "
+                "WHERE granularity = $1 AND bucket_start >= $2 GROUP BY outcome",
+                granularity,
+                since,
+            )
+            return [(row[0], int(row[1])) for row in rows]
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "SELECT outcome, SUM(count) FROM verification_stats "
+                    "WHERE granularity = %s AND bucket_start >= %s GROUP BY outcome",
+                    (granularity, since),
+                )
+                return [(row[0], int(row[1])) for row in await cur.fetchall()]
+
+
+@guarded()
+async def cleanup_verification_stats(
+    pool: PoolType, granularity: int, before: datetime
+) -> None:
+    """Удаление бакетов гранулярности granularity старше before."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            await conn.execute(
+                "DELETE FROM verification_stats WHERE granularity = $1 AND bucket_start < $2",
+                granularity,
+                before,
+            )
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "DELETE FROM verification_stats WHERE granularity = %s AND bucket_start < %s",
+                    (granularity, before),
+                )
+
+
+# Столбцы verification_events в порядке полей записи события
+EVENT_COLUMNS = ("created_at", "chat_id", "user_id", "event", "detail")
+
+
+@guarded()
+async def append_verification_events(pool: PoolType, rows: List[tuple]) -> None:
+    """Пакетная дозапись событий (created_at, chat_id, user_id, event, detail)."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            await conn.copy_records_to_table(
+                "verification_events", records=rows, columns=EVENT_COLUMNS
+            )
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                # executemany превращает INSERT ... VALUES в многострочную вставку
+                await cur.executemany(
+                    "INSERT INTO verification_events "
+                    "(created_at, chat_id, user_id, event, detail) "
+                    "VALUES (%s, %s, %s, %s, %s)",
+                    rows,
+                )
+
+
+@guarded()
+async def query_verification_events(
+    pool: PoolType, user_id: int, since: datetime, until: datetime, limit: int = 100
+) -> List[tuple]:
+    """События пользователя за интервал [since, until) по индексу (user_id, created_at)."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT created_at, chat_id, user_id, event, detail FROM verification_events "
+                "WHERE user_id = $1 AND created_at >= $2 AND created_at < $3 "
+                "ORDER BY created_at LIMIT $4",
+                user_id,
+                since,
+                until,
+                limit,
+            )
+            return [tuple(row) for row in rows]
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "SELECT created_at, chat_id, user_id, event, detail FROM verification_events "
+                    "WHERE user_id = %s AND created_at >= %s AND created_at < %s "
+                    "ORDER BY created_at LIMIT %s",
+                    (user_id, since, until, limit),
+                )
+                return list(await cur.fetchall())
+
+
+@guarded()
+async def claim_idempotency_key(pool: PoolType, key: str, ttl: float) -> bool:
+    """Захват ключа операции на ttl секунд; False, если ключ уже занят другим узлом."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            claimed = await conn.fetchval(
+                "INSERT INTO idempotency_keys (op_key, expires_at) "
+                "VALUES ($1, NOW() + make_interval(secs => $2)) "
+                "ON CONFLICT (op_key) DO UPDATE SET expires_at = EXCLUDED.expires_at "
+                "WHERE idempotency_keys.expires_at < NOW() "
+                "RETURNING op_key",
+                key,
+                float(ttl),
+            )
+            return claimed is not None
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                # rowcount: 1 — вставка, 2 — перезапись истёкшего ключа, 0 — ключ занят
+                await cur.execute(
+                    "INSERT INTO idempotency_keys (op_key, expires_at) "
+                    "VALUES (%s, NOW() + INTERVAL %s SECOND) "
+                    "ON DUPLICATE KEY UPDATE expires_at = "
+                    "IF(expires_at < NOW(), VALUES(expires_at), expires_at)",
+                    (key, int(ttl)),
+                )
+                return cur.rowcount > 0
+
+
+@guarded(write=True)
+async def release_idempotency_key(pool: PoolType, key: str) -> None:
+    """Освобождение ключа, чтобы операцию можно было повторить."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            await conn.execute("DELETE FROM idempotency_keys WHERE op_key = $1", key)
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("DELETE FROM idempotency_keys WHERE op_key = %s", (key,))
+
+
+@guarded()
+async def cleanup_idempotency_keys(pool: PoolType) -> None:
+    """Удаление истёкших ключей операций."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            await conn.execute("DELETE FROM idempotency_keys WHERE expires_at < NOW()")
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("DELETE FROM idempotency_keys WHERE expires_at < NOW()")
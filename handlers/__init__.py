@@ -3,18 +3,14 @@ from functools import partial
 from aiogram import Dispatcher, types
 from aiogram.filters import Command, ChatMemberUpdatedFilter, JOIN_TRANSITION, Filter
 
+from .admin import profile_handler, stats_handler
+from .inline_quiz import inline_answer_handler
 from .language import language_selection_handler, language_callback_handler
 from .quiz import group_message_handler, poll_answer_handler, poll_handler
 from .start import start_handler
 from .message import message_handler
 
 
-# Пользовательский фильтр для проверки, что отправитель не бот
-class IsNotBot(Filter):
-    async def __call__(self, message: types.Message) -> bool:
-        return not message.from_user.is_bot
-
-
 # Пользовательский фильтр для проверки типа чата (группа или супергруппа)
 class ChatTypeGroup(Filter):
     async def __call__(self, message: types.Message) -> bool:
@@ -35,9 +31,21 @@ def setup_handlers(dp: Dispatcher, bot, pool) -> None:
         Command(commands=["start"]),
     )
 
+    # Команда /stats для администраторов
+    dp.message.register(
+        partial(stats_handler, bot=bot, pool=pool),
+        Command(commands=["stats"]),
+    )
+
+    # Команда /profile для администраторов
+    dp.message.register(
+        partial(profile_handler, bot=bot),
+        Command(commands=["profile"]),
+    )
+
     # Присоединение участника к чату
     dp.chat_member.register(
-        partial(group_message_handler, bot=bot, pool=pool),
+        partial(group_message_handler, dp=dp, bot=bot, pool=pool),
         ChatMemberUpdatedFilter(member_status_changed=JOIN_TRANSITION),
     )
 
@@ -47,11 +55,16 @@ def setup_handlers(dp: Dispatcher, bot, pool) -> None:
         lambda c: c.data.startswith("lang_"),
     )
 
-    # Сообщения в группах и супергруппах (не от ботов)
+    # Ответы на вопрос inline-квиза в группе
+    dp.callback_query.register(
+        partial(inline_answer_handler, bot=bot, pool=pool),
+        lambda c: c.data.startswith("iq:"),
+    )
+
+    # Сообщения в группах и супергруппах (боты отсекаются в GroupPrefilterMiddleware)
     dp.message.register(
-        partial(message_handler, bot=bot, pool=pool),
+        partial(message_handler, dp=dp, bot=bot, pool=pool),
         ChatTypeGroup(),
-        IsNotBot(),
     )
 
     # Ответы на опросы
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+from aiogram import Bot, types
+from aiogram.exceptions import TelegramAPIError
+
+from config import config
+from database import PoolType
+from utils.loop_monitor import profiler
+from utils.staff import ADMIN_STATUSES
+from utils.stats import format_summary, verification_stats
+
+# Верхняя граница длительности профилирования по команде, секунд
+MAX_PROFILE_SECONDS = 300
+
+
+async def is_chat_admin(bot: Bot, user_id: int) -> bool:
+    """Является ли пользователь администратором обслуживаемого чата.
+
+    Права на команды проверяются запросом к Telegram, а не по кэшу
+    администраторов: снятый администратор теряет доступ сразу, даже если
+    событие chat_member не дошло до бота.
+    """
+    try:
+        member = await bot.get_chat_member(config.ALLOWED_CHAT_ID, user_id)
+    except TelegramAPIError as e:
+        logging.warning(f"Не удалось проверить права пользователя {user_id}: {e}")
+        return False
+    return member.status in ADMIN_STATUSES
+
+
+async def stats_handler(message: types.Message, bot: Bot, pool: PoolType) -> None:
+    """Команда /stats: сводка исходов проверки для администраторов."""
+    if message.from_user is None or not await is_chat_admin(bot, message.from_user.id):
+        return
+    summary = await verification_stats.summary(pool)
+    await message.reply(format_summary(summary), parse_mode="HTML")
+
+
+async def _profile_and_reply(message: types.Message, seconds: int) -> None:
+    path = await profiler.run(seconds)
+    if path is None:
+        await message.reply("Профилировщик уже запущен.")
+        return
+    await message.reply(f"Профиль записан: {path}")
+
+
+async def profile_handler(message: types.Message, bot: Bot) -> None:
+    """Команда /profile [секунды]: профилирование event loop для администраторов."""
+    if message.from_user is None or not await is_chat_admin(bot, message.from_user.id):
+        return
+    parts = (message.text or "").split()
+    seconds = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else config.PROFILE_SECONDS
+    seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+    await message.reply(f"Профилирование на {seconds} с...")
+    # Не держим слот обработки апдейтов на всё время профилирования
+    asyncio.create_task(_profile_and_reply(message, seconds))
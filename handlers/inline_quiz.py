@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+
+from aiogram import Bot, types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+
+from config import config, dialogs
+from database import mark_user_passed, PoolType
+from utils.event_log import event_log
+from utils.message_utils import delete_message
+from utils.question_engine import question_engine
+from utils.rate_limit import spam_limiter
+from utils.signed_callback import answer_order, pack_answer, unpack_answer
+from utils.stats import verification_stats
+from utils.user_locks import user_locks
+from .outcome import (
+    INCORRECT,
+    QUIZ_TIMEOUT,
+    claim_session,
+    fail_verification,
+    inline_session,
+)
+from .states import UserState
+
+
+async def send_inline_quiz(
+    callback: types.CallbackQuery, state: FSMContext, lang: str, pool: PoolType
+) -> None:
+    """Превращает сообщение выбора языка в вопрос с кнопками ответа.
+
+    Вопрос задаётся в группе одним edit_text вместо ссылки на ЛС,
+    /start и отдельных сообщений с приветствием и опросом.
+    """
+    bot = callback.message.bot
+    chat_id = callback.message.chat.id
+    user_id = callback.from_user.id
+    question = question_engine.pick(lang)
+    answers = question["answers"][lang]
+    issued = int(time.time())
+    order = answer_order(user_id, question["id"], issued, len(answers))
+
+    text = dialogs["greeting"][lang].format(name=callback.from_user.mention_html())
+    keyboard = types.InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                types.InlineKeyboardButton(
+                    text=answers[index],
+                    callback_data=pack_answer(
+                        chat_id, user_id, question["id"], lang, issued, option
+                    ),
+                )
+            ]
+            for option, index in enumerate(order)
+        ]
+    )
+    try:
+        await callback.message.edit_text(
+            text=f"{text}{question['question'][lang]}",
+            reply_markup=keyboard,
+            parse_mode="HTML",
+        )
+    except TelegramBadRequest as e:
+        logging.error(f"Не удалось показать вопрос пользователю {user_id}: {e}")
+        return
+    await callback.answer()
+
+    await state.set_state(UserState.answering_quiz)
+    await state.update_data(
+        language=lang,
+        quiz_mode="inline",
+        quiz_issued=issued,
+        question_id=question["id"],
+    )
+    logging.info(f"Вопрос {question['id']} показан пользователю {user_id} в группе")
+    asyncio.create_task(
+        inline_quiz_timeout(bot, state, chat_id, user_id, issued, pool)
+    )
+
+
+async def inline_quiz_timeout(
+    bot: Bot,
+    state: FSMContext,
+    chat_id: int,
+    user_id: int,
+    issued: int,
+    pool: PoolType,
+) -> None:
+    """Провал по таймауту, если на вопрос в группе не ответили."""
+    await asyncio.sleep(config.QUIZ_ANSWER_TIMEOUT)
+    async with user_locks.for_user(user_id):
+        user_data = await state.get_data()
+        if user_data.get("quiz_issued") != issued:
+            return
+        await fail_verification(
+            bot,
+            pool,
+            inline_session(chat_id, user_id, issued),
+            QUIZ_TIMEOUT,
+            user_id,
+            chat_id,
+            user_data,
+            state,
+        )
+
+
+async def inline_answer_handler(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    bot: Bot,
+    pool: PoolType,
+) -> None:
+    """Обработка нажатия на вариант ответа.
+
+    Подлинность, адресат и правильность ответа проверяются по подписи
+    callback_data без обращения к FSM и БД.
+    """
+    chat_id = callback.message.chat.id
+    answer = unpack_answer(chat_id, callback.data)
+    if answer is None:
+        logging.warning(f"Неверная подпись кнопки от пользователя {callback.from_user.id}")
+        await callback.answer()
+        return
+    if answer.user_id != callback.from_user.id:
+        await callback.answer("Этот опрос не для вас.")
+        return
+    question = question_engine.questions.get(answer.question_id)
+    if question is None or time.time() - answer.issued > config.QUIZ_ANSWER_TIMEOUT:
+        await callback.answer()
+        return
+
+    user_id = answer.user_id
+    order = answer_order(
+        user_id, answer.question_id, answer.issued, len(question["answers"][answer.lang])
+    )
+    correct = order[answer.option] == question["correct_index"]
+    session = inline_session(chat_id, user_id, answer.issued)
+
+    if not correct:
+        await callback.answer()
+        await fail_verification(
+            bot,
+            pool,
+            session,
+            INCORRECT,
+            user_id,
+            chat_id,
+            await state.get_data(),
+            state,
+            name=callback.from_user.mention_html(),
+        )
+        return
+
+    if not await claim_session(pool, session):
+        await callback.answer()
+        return
+    event_log.emit("answer_correct", user_id, chat_id, str(answer.question_id))
+    question_engine.record(answer.question_id, answer.lang, "correct")
+    verification_stats.record("passed")
+    spam_limiter.reset(chat_id, user_id)
+    await state.set_state(UserState.completed)
+    await mark_user_passed(pool, user_id, chat_id)
+
+    user_data = await state.get_data()
+    await callback.answer(f"✅ {dialogs['correct'][answer.lang]}")
+    try:
+        await callback.message.edit_text(
+            text=f"✅ {dialogs['correct'][answer.lang]}", reply_markup=None
+        )
+    except TelegramBadRequest as e:
+        logging.warning(f"Не удалось обновить вопрос пользователя {user_id}: {e}")
+    for msg_id in user_data.get("bot_messages", []):
+        asyncio.create_task(
+            delete_message(bot, chat_id, msg_id, config.MESSAGE_DELETE_DELAY_CORRECT)
+        )
+    logging.info(f"Пользователь {user_id} ответил правильно в группе")
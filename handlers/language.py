@@ -1,15 +1,28 @@
 import asyncio
 import logging
 
-from aiogram import Bot, types
+from aiogram import Bot, Dispatcher, types
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 
 from config import config, dialogs
 from database import check_user_passed, PoolType
+from utils.circuit_breaker import DatabaseUnavailable, db_breaker
+from utils.event_log import event_log
+from utils.idempotency import idempotency
+from utils.raid_index import raid_index
+from utils.stats import verification_stats
+from utils.user_locks import user_locks
+from .inline_quiz import send_inline_quiz
+from .outcome import (
+    LANGUAGE_TIMEOUT,
+    fail_verification,
+    language_session,
+    prompt_key,
+)
+from .raid import restrict_raid
+from .start import prepare_quiz
 from .states import UserState
-from utils.moderation import ban_user_after_timeout
-from utils.message_utils import delete_message
 
 
 async def language_selection_handler(
@@ -17,16 +30,37 @@ async def language_selection_handler(
     state: FSMContext,
     bot: Bot,
     pool: PoolType,
+    dp: Dispatcher,
 ) -> None:
     """Запрашивает у новых пользователей выбор языка с таймаутом."""
     current_state = await state.get_state()
     if current_state in [UserState.waiting_for_language, UserState.answering_quiz]:
         return
 
-    if (
-        message.chat.id != config.ALLOWED_CHAT_ID
-        or await check_user_passed(pool, message.from_user.id)
-        or message.from_user.is_bot
+    if message.chat.id != config.ALLOWED_CHAT_ID or message.from_user.is_bot:
+        return
+    try:
+        if await check_user_passed(pool, message.from_user.id, message.chat.id):
+            return
+    except DatabaseUnavailable:
+        # Неизвестного пользователя без БД не проверяем и не баним:
+        # проверка начнётся с его сообщения после восстановления БД
+        db_breaker.record_degraded("verification_deferred")
+        return
+
+    # Первое сообщение новичка, не найденного в БД, сверяется с недавними:
+    # рейд ограничивается без квиза. Прошедшие проверку сюда не доходят,
+    # даже если их вытеснили из кэша вердиктов или истекло их состояние
+    members = raid_index.observe(message)
+    if members:
+        await restrict_raid(dp, bot, pool, message.chat.id, members)
+        return
+
+    # Повторная доставка апдейта или вторая реплика не шлют второе приглашение
+    if not await idempotency.claim(
+        pool,
+        prompt_key(message.chat.id, message.from_user.id),
+        config.LANGUAGE_SELECTION_TIMEOUT,
     ):
         return
 
@@ -64,6 +98,7 @@ async def language_selection_handler(
         )
     except TelegramBadRequest as e:
         logging.warning(f"Failed to send language selection: {e}")
+        await idempotency.release(pool, prompt_key(message.chat.id, message.from_user.id))
         return
 
     # Сохраняем данные в состоянии
@@ -74,6 +109,7 @@ async def language_selection_handler(
         first_message_id=message.message_id,
         bot_messages=[lang_msg.message_id],
     )
+    verification_stats.record("started")
 
     asyncio.create_task(
         language_selection_timeout(
@@ -92,43 +128,22 @@ async def language_selection_timeout(
 ) -> None:
     """Обрабатывает таймаут для выбора языка."""
     await asyncio.sleep(config.LANGUAGE_SELECTION_TIMEOUT)
-    current_state = await state.get_state()
-    if current_state != UserState.waiting_for_language:
-        return
-
-    user_data = await state.get_data()
-    lang_message_id = user_data.get("lang_message_id")
-    first_message_id = user_data.get("first_message_id")
-    bot_messages = user_data.get("bot_messages", [])
-
-    # Отправляем сообщение о таймауте в чат
-    timeout_text = dialogs["language_timeout"]["ru"].format(
-        name=f'<a href="tg://user?id={user_id}">{user_id}</a>'
-    )
-    timeout_msg = await bot.send_message(
-        chat_id=chat_id,
-        text=timeout_text,
-        parse_mode="HTML",
-        message_thread_id=thread_id,
-    )
-
-    # Моментально удаляем сообщения в чате
-    if first_message_id:
-        asyncio.create_task(delete_message(bot, chat_id, first_message_id, delay=0))
-    if lang_message_id:
-        asyncio.create_task(delete_message(bot, chat_id, lang_message_id, delay=0))
-    for msg_id in bot_messages:
-        asyncio.create_task(delete_message(bot, chat_id, msg_id, delay=0))
-    asyncio.create_task(
-        delete_message(
-            bot, chat_id, timeout_msg.message_id, config.DEFAULT_MESSAGE_DELETE_DELAY
+    async with user_locks.for_user(user_id):
+        current_state = await state.get_state()
+        if current_state != UserState.waiting_for_language:
+            return
+
+        user_data = await state.get_data()
+        await fail_verification(
+            bot,
+            pool,
+            language_session(chat_id, user_id, user_data.get("lang_message_id")),
+            LANGUAGE_TIMEOUT,
+            user_id,
+            chat_id,
+            user_data,
+            state,
         )
-    )
-
-    # Блокируем пользователя
-    await ban_user_after_timeout(bot, chat_id, user_id, pool)
-    logging.info(f"Пользователь {user_id} забанен из-за таймаута выбора языка")
-    await state.clear()
 
 
 async def language_callback_handler(
@@ -143,6 +158,12 @@ async def language_callback_handler(
 
     lang = data[2]
     await state.update_data(language=lang)
+    event_log.emit(
+        "language_selected", callback.from_user.id, callback.message.chat.id, lang
+    )
+    if config.QUIZ_MODE == "inline":
+        await send_inline_quiz(callback, state, lang, pool)
+        return
 
     user_mention = callback.from_user.mention_html()
     confirmation_text = dialogs["language_set"][lang].format(name=user_mention)
@@ -163,7 +184,7 @@ async def language_callback_handler(
     button_text = dialogs["quiz_button"][lang]
     instruction_text = dialogs["quiz_instruction"][lang]
 
-    bot_username = (await callback.message.bot.get_me()).username
+    bot_username = (await callback.message.bot.me()).username
     quiz_button_msg = await callback.message.bot.send_message(
         chat_id=group_chat_id,
         text=instruction_text,
@@ -180,10 +201,14 @@ async def language_callback_handler(
         message_thread_id=thread_id,
     )
 
-    # Обновляем bot_messages
+    # Обновляем bot_messages; вопрос готовится заранее, пока пользователь
+    # переходит по ссылке в ЛС
     bot_messages = user_data.get("bot_messages", [])
     bot_messages.append(quiz_button_msg.message_id)
-    await state.update_data(bot_messages=bot_messages)
+    await state.update_data(
+        bot_messages=bot_messages,
+        prepared_quiz=prepare_quiz(lang, callback.from_user.mention_html()),
+    )
 
     # Удаляем сообщение выбора языка
     try:
@@ -1,21 +1,23 @@
 import logging
 
-from aiogram import types, Bot
-from aiogram.exceptions import TelegramBadRequest
+from aiogram import types, Bot, Dispatcher
 from aiogram.fsm.context import FSMContext
 
-from config import config
+from utils.message_utils import deletion_batcher
+from utils.moderation import ban_user_after_timeout
+from utils.rate_limit import spam_limiter
 from .states import UserState
 from .language import language_selection_handler
 
 
 async def message_handler(
-    message: types.Message, state: FSMContext, bot: Bot, pool
+    message: types.Message, state: FSMContext, dp: Dispatcher, bot: Bot, pool
 ) -> None:
-    """Обработка сообщений пользователя."""
-    if message.from_user.is_bot or message.chat.id != config.ALLOWED_CHAT_ID:
-        return
+    """Обработка сообщений пользователя.
 
+    Чужие чаты, боты и прошедшие проверку участники отсекаются раньше,
+    в GroupPrefilterMiddleware.
+    """
     current_state = await state.get_state()
 
     # Сохраняем ID первого сообщения пользователя
@@ -23,24 +25,17 @@ async def message_handler(
     if not user_data.get("first_message_id"):
         await state.update_data(first_message_id=message.message_id)
 
-    # Удаляем сообщения во время выбора языка
-    if current_state == UserState.waiting_for_language:
-        try:
-            await bot.delete_message(message.chat.id, message.message_id)
-            logging.info(
-                f"Удалено сообщение {message.message_id} во время выбора языка"
-            )
-        except TelegramBadRequest:
-            logging.warning(f"Не удалось удалить сообщение {message.message_id}")
-        return
-
-    # Удаляем сообщения во время квиза
-    elif current_state == UserState.answering_quiz:
-        try:
-            await bot.delete_message(message.chat.id, message.message_id)
-            logging.info(f"Удалено сообщение {message.message_id} во время квиза")
-        except TelegramBadRequest:
-            logging.warning(f"Не удалось удалить сообщение {message.message_id}")
+    # Сообщения во время выбора языка и квиза удаляются пакетами;
+    # флуд сверх порога сразу ограничивается мутом
+    if current_state in (UserState.waiting_for_language, UserState.answering_quiz):
+        chat_id, user_id = message.chat.id, message.from_user.id
+        deletion_batcher.add(chat_id, message.message_id)
+        if spam_limiter.over_limit(chat_id, user_id) and spam_limiter.escalate(
+            chat_id, user_id
+        ):
+            logging.info(f"Пользователь {user_id} ограничен за флуд во время проверки")
+            await ban_user_after_timeout(bot, chat_id, user_id, pool, "spam")
+            await deletion_batcher.flush_chat(chat_id)
         return
 
-    await language_selection_handler(message, state, bot, pool)
+    await language_selection_handler(message, state, bot, pool, dp)
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+
+from config import config, dialogs
+from database import PoolType
+from utils.active_polls import active_polls
+from utils.circuit_breaker import db_breaker
+from utils.event_log import event_log
+from utils.idempotency import idempotency
+from utils.message_utils import delete_message, deletion_batcher
+from utils.moderation import ban_user_after_timeout
+from utils.question_engine import question_engine
+from utils.stats import verification_stats
+
+# Причины провала проверки
+LANGUAGE_TIMEOUT = "language_timeout"
+QUIZ_TIMEOUT = "quiz_timeout"
+INCORRECT = "incorrect"
+
+# Сколько хранить ключ исхода сессии: сессии уникальны, срок нужен для очистки
+OUTCOME_TTL = 24 * 3600
+
+
+def quiz_session(poll_id: str) -> str:
+    """Ключ сессии проверки через опрос в ЛС."""
+    return f"poll:{poll_id}"
+
+
+def inline_session(chat_id: int, user_id: int, issued: int) -> str:
+    """Ключ сессии проверки кнопками в группе."""
+    return f"inline:{chat_id}:{user_id}:{issued}"
+
+
+def language_session(chat_id: int, user_id: int, lang_message_id: Any) -> str:
+    """Ключ сессии выбора языка в группе."""
+    return f"lang:{chat_id}:{user_id}:{lang_message_id}"
+
+
+def prompt_key(chat_id: int, user_id: int) -> str:
+    """Ключ операции «пригласить пользователя к проверке»."""
+    return f"prompt:{chat_id}:{user_id}"
+
+
+async def claim_session(pool: PoolType, session: str) -> bool:
+    """Закрепляет исход за сессией; False, если исход уже обработан."""
+    return await idempotency.claim(pool, f"outcome:{session}", OUTCOME_TTL)
+
+
+def _user_link(user_id: int) -> str:
+    return f'<a href="tg://user?id={user_id}">{user_id}</a>'
+
+
+async def _send_notice(
+    bot: Bot, chat_id: int, text: str, thread_id: Optional[int], delay: int
+) -> None:
+    try:
+        notice = await bot.send_message(
+            chat_id, text, parse_mode="HTML", message_thread_id=thread_id
+        )
+    except TelegramBadRequest as e:
+        logging.error(f"Не удалось отправить уведомление в чат {chat_id}: {e}")
+        return
+    asyncio.create_task(delete_message(bot, chat_id, notice.message_id, delay))
+
+
+def _delete_verification_messages(
+    bot: Bot,
+    user_id: int,
+    group_chat_id: Optional[int],
+    user_data: Dict[str, Any],
+    pm_delay: int,
+) -> None:
+    """Сообщения в группе удаляются сразу, в ЛС — после показа результата."""
+    if group_chat_id:
+        group_messages = [
+            user_data.get("first_message_id"),
+            user_data.get("lang_message_id"),
+            *user_data.get("bot_messages", []),
+        ]
+        for msg_id in dict.fromkeys(group_messages):
+            if msg_id:
+                deletion_batcher.add(group_chat_id, msg_id)
+    if user_data.get("quiz_message_id"):
+        asyncio.create_task(
+            delete_message(bot, user_id, user_data["quiz_message_id"], pm_delay)
+        )
+    if user_data.get("greeting_message_id"):
+        asyncio.create_task(
+            delete_message(bot, user_id, user_data["greeting_message_id"], pm_delay)
+        )
+
+
+async def fail_verification(
+    bot: Bot,
+    pool: PoolType,
+    session: str,
+    reason: str,
+    user_id: int,
+    group_chat_id: Optional[int],
+    user_data: Dict[str, Any],
+    group_state: Optional[FSMContext],
+    pm_state: Optional[FSMContext] = None,
+    name: Optional[str] = None,
+) -> bool:
+    """Провал проверки: уведомление, удаление сообщений, бан и сброс состояний.
+
+    Исход обрабатывается один раз на сессию: конкурирующие источники
+    (таймер, закрытие опроса, ответ) после первого ничего не делают.
+    Независимые вызовы API и БД выполняются параллельно.
+    """
+    if not await claim_session(pool, session):
+        return False
+    # Ответ фиксируется только вместе с исходом: поздний ответ после
+    # таймаута в журнал не попадает
+    if reason == INCORRECT:
+        event_log.emit("answer_incorrect", user_id, group_chat_id, user_data.get("question_id"))
+
+    if reason != INCORRECT and db_breaker.is_degraded:
+        # Без БД таймаут не отличить от ответа, который не удалось обработать:
+        # не баним, проверка начнётся заново со следующего сообщения
+        db_breaker.record_degraded("ban_deferred")
+        logging.warning(f"БД недоступна: бан пользователя {user_id} ({reason}) отложен")
+        _delete_verification_messages(bot, user_id, group_chat_id, user_data, 0)
+        await asyncio.gather(
+            *(state.clear() for state in (group_state, pm_state) if state)
+        )
+        if group_chat_id:
+            await idempotency.release(pool, prompt_key(group_chat_id, user_id))
+        return False
+
+    verification_stats.record(reason)
+    lang = user_data.get("language", "en")
+    name = name or _user_link(user_id)
+    # Уведомление приходит туда, где шла проверка: в группу или в ЛС
+    if reason == LANGUAGE_TIMEOUT or user_data.get("quiz_mode") == "inline":
+        notice_chat_id = group_chat_id
+        thread_id = user_data.get("thread_id")
+    else:
+        notice_chat_id = user_id
+        thread_id = None
+    if reason == LANGUAGE_TIMEOUT:
+        text = dialogs["language_timeout"]["ru"].format(name=name)
+        delay = config.DEFAULT_MESSAGE_DELETE_DELAY
+    else:
+        outcome = "incorrect" if reason == INCORRECT else "timeout"
+        question_engine.record(user_data.get("question_id"), lang, outcome)
+        if reason == INCORRECT:
+            text = f"❌ {dialogs['incorrect'][lang].format(name=name)}"
+            delay = config.MESSAGE_DELETE_DELAY_INCORRECT
+        else:
+            text = f"⏰ {dialogs['timeout'][lang].format(name=name)}"
+            delay = config.MESSAGE_DELETE_DELAY_TIMEOUT
+        text = f"{text} {dialogs['blocked_message'][lang]}"
+
+    _delete_verification_messages(bot, user_id, group_chat_id, user_data, delay)
+    operations = [_send_notice(bot, notice_chat_id, text, thread_id, delay)]
+    if group_chat_id:
+        operations.append(
+            ban_user_after_timeout(bot, group_chat_id, user_id, pool, reason)
+        )
+    if user_data.get("quiz_poll_id"):
+        operations.append(active_polls.remove(pool, user_data["quiz_poll_id"]))
+    operations.extend(state.clear() for state in (group_state, pm_state) if state)
+
+    for result in await asyncio.gather(*operations, return_exceptions=True):
+        if isinstance(result, Exception):
+            logging.error(f"Ошибка при обработке провала проверки {user_id}: {result}")
+    logging.info(
+        f"Пользователь {user_id} не прошёл проверку ({reason}) в чате {group_chat_id}"
+    )
+    return True
@@ -5,17 +5,28 @@ from aiogram import Bot, Dispatcher, types
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 
-from config import config, questions, dialogs
+from config import config, dialogs
 from database import (
     check_user_passed,
     check_user_banned,
     mark_user_passed,
     PoolType,
-    get_active_poll,
-    remove_active_poll,
 )
-from utils.moderation import ban_user_after_timeout
+from utils.active_polls import active_polls
+from utils.circuit_breaker import DatabaseUnavailable, db_breaker
+from utils.event_log import event_log
 from utils.message_utils import delete_message
+from utils.question_engine import question_engine
+from utils.rate_limit import spam_limiter
+from utils.stats import verification_stats
+from utils.user_locks import user_locks
+from .outcome import (
+    INCORRECT,
+    QUIZ_TIMEOUT,
+    claim_session,
+    fail_verification,
+    quiz_session,
+)
 from .states import UserState
 
 
@@ -24,6 +35,7 @@ async def group_message_handler(
     state: FSMContext,
     bot: Bot,
     pool: PoolType,
+    dp: Dispatcher,
     **kwargs,
 ) -> None:
     """Обработка новых участников."""
@@ -31,13 +43,23 @@ async def group_message_handler(
         return
 
     user = update.new_chat_member.user
+    # Участника мог добавить админ: проверка и её состояние — у самого участника,
+    # и его шард выбирается по нему же
+    if update.from_user.id != user.id:
+        state = dp.fsm.get_context(bot=bot, chat_id=update.chat.id, user_id=user.id)
     if (
         update.old_chat_member.status not in ("left", "kicked")
         or update.new_chat_member.status != "member"
-        or await check_user_passed(pool, user.id)
-        or await check_user_banned(pool, user.id)
     ):
         return
+    try:
+        passed = await check_user_passed(pool, user.id, update.chat.id)
+        if passed or await check_user_banned(pool, user.id, update.chat.id):
+            return
+    except DatabaseUnavailable:
+        # Новичок ждёт: проверка начнётся с его первого сообщения
+        db_breaker.record_degraded("join_deferred")
+        return
 
     from .language import language_selection_handler
 
@@ -48,7 +70,8 @@ async def group_message_handler(
         date=update.date,
     )
     await state.update_data(first_message_id=message.message_id)
-    await language_selection_handler(message, state, bot=bot, pool=pool)
+    event_log.emit("joined", user.id, update.chat.id)
+    await language_selection_handler(message, state, bot=bot, pool=pool, dp=dp)
 
 
 async def poll_answer_handler(
@@ -61,7 +84,7 @@ async def poll_answer_handler(
     poll_id = poll_answer.poll_id
     user_id = poll_answer.user.id
 
-    poll_data = await get_active_poll(pool, poll_id)
+    poll_data = await active_polls.get(pool, poll_id)
     if not poll_data or poll_data["user_id"] != user_id:
         return
 
@@ -77,115 +100,79 @@ async def poll_answer_handler(
     selected_option = poll_answer.option_ids[0]
     correct_index = user_data["correct_index"]
     lang = user_data["language"]
+    group_chat_id = user_data.get("group_chat_id")
+    group_state = (
+        dp.fsm.get_context(bot=bot, chat_id=group_chat_id, user_id=user_id)
+        if group_chat_id
+        else None
+    )
 
     await state.update_data(has_answered=True)
-
-    if selected_option == correct_index:
-        await state.set_state(UserState.completed)
-        await mark_user_passed(pool, user_id)
-        result_msg = await bot.send_message(
-            chat_id=chat_id,
-            text=f"✅ {dialogs['correct'][lang]}",
-            parse_mode="HTML",
+    if selected_option != correct_index:
+        await fail_verification(
+            bot,
+            pool,
+            quiz_session(poll_id),
+            INCORRECT,
+            user_id,
+            group_chat_id,
+            user_data,
+            group_state,
+            state,
+            name=poll_answer.user.mention_html(),
         )
-        group_chat_id = user_data.get("group_chat_id")
-        bot_messages = user_data.get("bot_messages", [])
-        greeting_message_id = user_data.get("greeting_message_id")
-        for msg_id in bot_messages:
-            if group_chat_id:
-                asyncio.create_task(
-                    delete_message(
-                        bot, group_chat_id, msg_id, config.MESSAGE_DELETE_DELAY_CORRECT
-                    )
-                )
-        if greeting_message_id:
-            asyncio.create_task(
-                delete_message(
-                    bot,
-                    chat_id,
-                    greeting_message_id,
-                    config.MESSAGE_DELETE_DELAY_CORRECT,
-                )
-            )
-        asyncio.create_task(
-            delete_message(
-                bot, chat_id, result_msg.message_id, config.MESSAGE_DELETE_DELAY_CORRECT
-            )
-        )
-        logging.info(f"Пользователь {user_id} ответил правильно в ЛС")
-
-        group_state = dp.fsm.get_context(
-            bot=bot, chat_id=group_chat_id, user_id=user_id
-        )
-        await group_state.set_state(UserState.completed)
-        logging.info(
-            f"Установлено состояние completed для пользователя {user_id} в чате {group_chat_id}"
-        )
-    else:
-        combined_message = (
-            f"❌ {dialogs['incorrect'][lang].format(name=poll_answer.user.mention_html())} "
-            f"{dialogs['blocked_message'][lang]}"
-        )
-        result_msg = await bot.send_message(
-            chat_id=chat_id,
-            text=combined_message,
-            parse_mode="HTML",
-        )
-        group_chat_id = user_data.get("group_chat_id")
-        first_message_id = user_data.get("first_message_id")
-        bot_messages = user_data.get("bot_messages", [])
-        quiz_message_id = user_data.get("quiz_message_id")
-        greeting_message_id = user_data.get("greeting_message_id")
+        return
 
-        if first_message_id and group_chat_id:
-            asyncio.create_task(
-                delete_message(bot, group_chat_id, first_message_id, delay=0)
-            )
-        for msg_id in bot_messages:
-            if group_chat_id:
-                asyncio.create_task(delete_message(bot, group_chat_id, msg_id, delay=0))
-        if greeting_message_id:
-            asyncio.create_task(
-                delete_message(
-                    bot,
-                    chat_id,
-                    greeting_message_id,
-                    config.MESSAGE_DELETE_DELAY_INCORRECT,
-                )
-            )
-        if quiz_message_id:
+    # Ответ, пришедший после срабатывания таймаута, уже ничего не меняет
+    if not await claim_session(pool, quiz_session(poll_id)):
+        return
+    event_log.emit("answer_correct", user_id, group_chat_id, user_data.get("question_id"))
+    question_engine.record(user_data.get("question_id"), lang, "correct")
+    verification_stats.record("passed")
+    spam_limiter.reset(group_chat_id, user_id)
+    await state.set_state(UserState.completed)
+    await mark_user_passed(pool, user_id, group_chat_id)
+    result_msg = await bot.send_message(
+        chat_id=chat_id,
+        text=f"✅ {dialogs['correct'][lang]}",
+        parse_mode="HTML",
+    )
+    bot_messages = user_data.get("bot_messages", [])
+    greeting_message_id = user_data.get("greeting_message_id")
+    for msg_id in bot_messages:
+        if group_chat_id:
             asyncio.create_task(
                 delete_message(
-                    bot, user_id, quiz_message_id, config.MESSAGE_DELETE_DELAY_INCORRECT
+                    bot, group_chat_id, msg_id, config.MESSAGE_DELETE_DELAY_CORRECT
                 )
             )
+    if greeting_message_id:
         asyncio.create_task(
             delete_message(
                 bot,
                 chat_id,
-                result_msg.message_id,
-                config.MESSAGE_DELETE_DELAY_INCORRECT,
+                greeting_message_id,
+                config.MESSAGE_DELETE_DELAY_CORRECT,
             )
         )
-
-        if group_chat_id:
-            await ban_user_after_timeout(bot, group_chat_id, user_id, pool)
-            logging.info(f"Пользователь {user_id} забанен из-за неправильного ответа")
-
-        group_state = dp.fsm.get_context(
-            bot=bot, chat_id=group_chat_id, user_id=user_id
+    asyncio.create_task(
+        delete_message(
+            bot, chat_id, result_msg.message_id, config.MESSAGE_DELETE_DELAY_CORRECT
         )
-        await group_state.clear()
+    )
+    logging.info(f"Пользователь {user_id} ответил правильно в ЛС")
+
+    if group_state:
+        await group_state.set_state(UserState.completed)
         logging.info(
-            f"Очищено состояние группы для пользователя {user_id} в чате {group_chat_id}"
+            f"Установлено состояние completed для пользователя {user_id} в чате {group_chat_id}"
         )
-        await state.clear()
 
     try:
         await bot.delete_message(chat_id, message_id)
     except TelegramBadRequest:
         logging.warning(f"Не удалось удалить опрос {poll_id} в чате {chat_id}")
-    await remove_active_poll(pool, poll_id)
+    await active_polls.remove(pool, poll_id)
 
 
 async def poll_handler(
@@ -198,82 +185,38 @@ async def poll_handler(
     if not poll.is_closed:
         return
 
-    poll_data = await get_active_poll(pool, poll.id)
+    poll_data = await active_polls.get(pool, poll.id)
     if not poll_data:
         return
 
     user_id = poll_data["user_id"]
     chat_id = poll_data["chat_id"]
-    message_id = poll_data["message_id"]
 
-    state = dp.fsm.get_context(bot=bot, chat_id=chat_id, user_id=user_id)
-    user_data = await state.get_data()
+    # Апдейт poll без пользователя не изолируется FSM-middleware
+    async with user_locks.for_user(user_id):
+        state = dp.fsm.get_context(bot=bot, chat_id=chat_id, user_id=user_id)
+        user_data = await state.get_data()
+        if user_data.get("has_answered", False):
+            return
 
-    if not user_data.get("has_answered", False):
-        lang = user_data.get("language", "en")
-        combined_message = (
-            f"⏰ {dialogs['timeout'][lang].format(name=f'<a href=\"tg://user?id={user_id}\">{user_id}</a>')} "
-            f"{dialogs['blocked_message'][lang]}"
-        )
-        timeout_msg = await bot.send_message(
-            chat_id,
-            combined_message,
-            parse_mode="HTML",
-        )
         group_chat_id = user_data.get("group_chat_id")
-        first_message_id = user_data.get("first_message_id")
-        bot_messages = user_data.get("bot_messages", [])
-        quiz_message_id = user_data.get("quiz_message_id")
-        greeting_message_id = user_data.get("greeting_message_id")
-
-        if first_message_id and group_chat_id:
-            asyncio.create_task(
-                delete_message(bot, group_chat_id, first_message_id, delay=0)
-            )
-        for msg_id in bot_messages:
-            if group_chat_id:
-                asyncio.create_task(delete_message(bot, group_chat_id, msg_id, delay=0))
-        if greeting_message_id:
-            asyncio.create_task(
-                delete_message(
-                    bot,
-                    chat_id,
-                    greeting_message_id,
-                    config.MESSAGE_DELETE_DELAY_TIMEOUT,
-                )
-            )
-        if quiz_message_id:
-            asyncio.create_task(
-                delete_message(
-                    bot, user_id, quiz_message_id, config.MESSAGE_DELETE_DELAY_TIMEOUT
-                )
-            )
-        asyncio.create_task(
-            delete_message(
-                bot,
-                chat_id,
-                timeout_msg.message_id,
-                config.MESSAGE_DELETE_DELAY_TIMEOUT,
-            )
-        )
-
-        if group_chat_id:
-            await ban_user_after_timeout(bot, group_chat_id, user_id, pool)
-            logging.info(
-                f"Пользователь {user_id} забанен из-за таймаута опроса (запасной обработчик)"
-            )
-
-        group_state = dp.fsm.get_context(
-            bot=bot, chat_id=group_chat_id, user_id=user_id
+        event_log.emit("poll_closed", user_id, group_chat_id, user_data.get("question_id"))
+        group_state = (
+            dp.fsm.get_context(bot=bot, chat_id=group_chat_id, user_id=user_id)
+            if group_chat_id
+            else None
         )
-        await group_state.clear()
-        logging.info(
-            f"Очищено состояние группы для пользователя {user_id} в чате {group_chat_id}"
+        # Опрос мог не попасть в состояние (например, после перезапуска)
+        user_data.setdefault("quiz_poll_id", poll.id)
+        user_data.setdefault("quiz_message_id", poll_data["message_id"])
+        await fail_verification(
+            bot,
+            pool,
+            quiz_session(poll.id),
+            QUIZ_TIMEOUT,
+            user_id,
+            group_chat_id,
+            user_data,
+            group_state,
+            state,
         )
-        await state.clear()
-
-    try:
-        await bot.delete_message(chat_id, message_id)
-    except TelegramBadRequest:
-        logging.warning(f"Не удалось удалить опрос {poll.id} в чате {chat_id}")
-    await remove_active_poll(pool, poll.id)
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import List
+
+from aiogram import Bot, Dispatcher
+
+from config import config
+from utils.idempotency import idempotency
+from utils.message_utils import deletion_batcher
+from utils.moderation import ban_user_after_timeout
+from utils.raid_index import Fingerprint
+from utils.rate_limit import spam_limiter
+from utils.stats import verification_stats
+from .outcome import (
+    claim_session,
+    inline_session,
+    language_session,
+    prompt_key,
+    quiz_session,
+)
+
+
+async def _cancel_verification(
+    dp: Dispatcher, bot: Bot, pool, member: Fingerprint
+) -> None:
+    """Снятие начатой проверки участника рейда.
+
+    Участник мог успеть получить приглашение или квиз до того, как кластер
+    стал горячим. Его сессии закрепляются за рейдом, а состояния
+    сбрасываются, поэтому запущенные таймеры не забанят его повторно и не
+    пришлют уведомление. Блокировку участника не берём: обработчик уже
+    держит блокировку своей полосы, а она может совпасть с его полосой.
+    """
+    chat_id, user_id = member.chat_id, member.user_id
+    group_state = dp.fsm.get_context(bot=bot, chat_id=chat_id, user_id=user_id)
+    pm_state = dp.fsm.get_context(bot=bot, chat_id=user_id, user_id=user_id)
+    user_data, pm_data = await asyncio.gather(group_state.get_data(), pm_state.get_data())
+
+    sessions = []
+    if user_data.get("lang_message_id"):
+        sessions.append(language_session(chat_id, user_id, user_data["lang_message_id"]))
+    if user_data.get("quiz_issued"):
+        sessions.append(inline_session(chat_id, user_id, user_data["quiz_issued"]))
+    if pm_data.get("quiz_poll_id"):
+        sessions.append(quiz_session(pm_data["quiz_poll_id"]))
+    await asyncio.gather(
+        # Новое приглашение не отправляется до конца мута
+        idempotency.claim(pool, prompt_key(chat_id, user_id), config.MUTE_DURATION),
+        *(claim_session(pool, session) for session in sessions),
+    )
+    await asyncio.gather(group_state.clear(), pm_state.clear())
+
+    group_messages = [user_data.get("lang_message_id"), *user_data.get("bot_messages", [])]
+    for msg_id in dict.fromkeys(group_messages):
+        if msg_id:
+            deletion_batcher.add(chat_id, msg_id)
+
+
+async def restrict_raid(
+    dp: Dispatcher, bot: Bot, pool, chat_id: int, members: List[Fingerprint]
+) -> None:
+    """Мут участников рейдового кластера и пакетное удаление их сообщений."""
+    await asyncio.gather(
+        *(_cancel_verification(dp, bot, pool, member) for member in members)
+    )
+    for member in members:
+        deletion_batcher.add(member.chat_id, member.message_id)
+        spam_limiter.escalate(member.chat_id, member.user_id)
+        verification_stats.record("raid")
+    logging.warning(
+        f"Рейд в чате {chat_id}: похожие сообщения от {len(members)} пользователей"
+    )
+    await asyncio.gather(
+        deletion_batcher.flush_chat(chat_id),
+        *(
+            ban_user_after_timeout(bot, member.chat_id, member.user_id, pool, "raid")
+            for member in members
+        ),
+    )
@@ -3,13 +3,15 @@ import logging
 import random
 
 from aiogram import types, Bot
-from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 
-from config import config, questions, dialogs
-from database import PoolType, add_active_poll, remove_active_poll
+from config import config, dialogs
+from database import PoolType
+from handlers.outcome import QUIZ_TIMEOUT, fail_verification, quiz_session
 from handlers.states import UserState
-from utils.message_utils import delete_message
+from utils.active_polls import active_polls
+from utils.question_engine import question_engine
+from utils.user_locks import user_locks
 
 
 async def start_handler(
@@ -42,6 +44,7 @@ async def start_handler(
                     group_chat_id=group_chat_id,
                     first_message_id=first_message_id,
                     bot_messages=bot_messages,
+                    prepared_quiz=group_data.get("prepared_quiz"),
                 )
                 await send_poll_to_pm(message, state, bot, pool, dp)
             except ValueError:
@@ -54,29 +57,38 @@ async def start_handler(
         await message.reply("Добро пожаловать! Используйте /quiz для начала опроса.")
 
 
+def prepare_quiz(lang: str, name: str) -> dict:
+    """Выбор вопроса, перемешивание ответов и текст приветствия для опроса в ЛС."""
+    question = question_engine.pick(lang)
+    answers = question["answers"][lang]
+    indices = list(range(len(answers)))
+    random.shuffle(indices)
+    return {
+        "language": lang,
+        "question_id": question["id"],
+        "question": question["question"][lang],
+        "options": [answers[i] for i in indices],
+        "correct_index": indices.index(question["correct_index"]),
+        "greeting": dialogs["greeting"][lang].format(name=name),
+    }
+
+
 async def send_poll_to_pm(
     message: types.Message, state: FSMContext, bot: Bot, pool: PoolType, dp
 ) -> None:
     """Отправляет опрос в ЛС пользователя и запускает таймер."""
     user_data = await state.get_data()
     lang = user_data.get("language", "en")
-    question = random.choice(questions)
-    answers = question["answers"][lang]
-    correct_index = question["correct_index"]
-
-    indices = list(range(len(answers)))
-    random.shuffle(indices)
-    shuffled_answers = [answers[i] for i in indices]
-    new_correct_index = indices.index(correct_index)
+    # Вопрос обычно подготовлен ещё при выборе языка в группе
+    quiz = user_data.get("prepared_quiz")
+    if not quiz or quiz["language"] != lang:
+        quiz = prepare_quiz(lang, message.from_user.mention_html())
 
     # Отправляем приветственное сообщение отдельно
-    greeting_text = dialogs["greeting"][lang].format(
-        name=message.from_user.mention_html()
-    )
     try:
         greeting_msg = await bot.send_message(
             chat_id=message.from_user.id,
-            text=greeting_text,
+            text=quiz["greeting"],
             parse_mode="HTML",
         )
     except Exception as e:
@@ -87,10 +99,10 @@ async def send_poll_to_pm(
     try:
         poll = await bot.send_poll(
             chat_id=message.from_user.id,
-            question=question["question"][lang],  # Только текст вопроса
-            options=shuffled_answers,
+            question=quiz["question"],  # Только текст вопроса
+            options=quiz["options"],
             type="quiz",
-            correct_option_id=new_correct_index,
+            correct_option_id=quiz["correct_index"],
             open_period=config.QUIZ_ANSWER_TIMEOUT,  # 30 секунд
             is_anonymous=False,
         )
@@ -101,8 +113,8 @@ async def send_poll_to_pm(
         await bot.delete_message(message.from_user.id, greeting_msg.message_id)
         return
 
-    # Регистрируем опрос в базе данных
-    await add_active_poll(
+    # Опрос сразу доступен из памяти, запись в БД идёт в фоне
+    active_polls.register(
         pool,
         poll.poll.id,
         message.from_user.id,
@@ -120,10 +132,12 @@ async def send_poll_to_pm(
         quiz_poll_id=poll.poll.id,
         quiz_message_id=poll.message_id,
         greeting_message_id=greeting_msg.message_id,  # Сохраняем ID приветствия
-        correct_index=new_correct_index,
+        correct_index=quiz["correct_index"],
+        question_id=quiz["question_id"],
         has_answered=False,
         chat_id=message.from_user.id,
         language=lang,
+        prepared_quiz=None,
     )
 
     # Запускаем таймер для проверки таймаута
@@ -135,80 +149,26 @@ async def check_poll_timeout(
 ) -> None:
     """Проверяет, ответил ли пользователь на опрос за отведенное время."""
     await asyncio.sleep(config.QUIZ_ANSWER_TIMEOUT)
-    user_data = await state.get_data()
-    if not user_data.get("has_answered", False):
-        lang = user_data.get("language", "en")
-        group_chat_id = user_data.get("group_chat_id")
-        first_message_id = user_data.get("first_message_id")
-        bot_messages = user_data.get("bot_messages", [])
-        quiz_message_id = user_data.get("quiz_message_id")
-        greeting_message_id = user_data.get("greeting_message_id")
+    async with user_locks.for_user(user_id):
+        user_data = await state.get_data()
         poll_id = user_data.get("quiz_poll_id")
-
-        try:
-            combined_message = (
-                f"⏰ {dialogs['timeout'][lang].format(name=f'<a href=\"tg://user?id={user_id}\">{user_id}</a>')} "
-                f"{dialogs['blocked_message'][lang]}"
-            )
-            timeout_msg = await bot.send_message(
-                user_id, combined_message, parse_mode="HTML"
-            )
-        except TelegramBadRequest as e:
-            logging.error(
-                f"Не удалось отправить сообщение о таймауте в ЛС {user_id}: {e}"
-            )
+        if user_data.get("has_answered", False) or not poll_id:
             return
 
-        try:
-            if first_message_id and group_chat_id:
-                asyncio.create_task(
-                    delete_message(bot, group_chat_id, first_message_id, delay=0)
-                )
-            for msg_id in bot_messages:
-                if group_chat_id:
-                    asyncio.create_task(
-                        delete_message(bot, group_chat_id, msg_id, delay=0)
-                    )
-            if greeting_message_id:
-                asyncio.create_task(
-                    delete_message(
-                        bot,
-                        user_id,
-                        greeting_message_id,
-                        config.MESSAGE_DELETE_DELAY_TIMEOUT,
-                    )
-                )
-            if quiz_message_id:
-                asyncio.create_task(
-                    delete_message(
-                        bot,
-                        user_id,
-                        quiz_message_id,
-                        config.MESSAGE_DELETE_DELAY_TIMEOUT,
-                    )
-                )
-            asyncio.create_task(
-                delete_message(
-                    bot,
-                    user_id,
-                    timeout_msg.message_id,
-                    config.MESSAGE_DELETE_DELAY_TIMEOUT,
-                )
-            )
-        except Exception as e:
-            logging.error(f"Ошибка при удалении сообщений для {user_id}: {e}")
-
-        if group_chat_id:
-            from utils.moderation import ban_user_after_timeout
-
-            await ban_user_after_timeout(bot, group_chat_id, user_id, pool)
-            logging.info(f"Пользователь {user_id} забанен из-за таймаута опроса")
-
-        group_state = dp.fsm.get_context(
-            bot=bot, chat_id=group_chat_id, user_id=user_id
+        group_chat_id = user_data.get("group_chat_id")
+        group_state = (
+            dp.fsm.get_context(bot=bot, chat_id=group_chat_id, user_id=user_id)
+            if group_chat_id
+            else None
+        )
+        await fail_verification(
+            bot,
+            pool,
+            quiz_session(poll_id),
+            QUIZ_TIMEOUT,
+            user_id,
+            group_chat_id,
+            user_data,
+            group_state,
+            state,
         )
-        await group_state.clear()
-        await state.clear()
-
-        if poll_id:
-            await remove_active_poll(pool, poll_id)
@@ -0,0 +1,724 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from config import config
+
+# Узлы плана PostgreSQL, которыми должен обслуживаться горячий запрос
+INDEX_SCAN = "Index Scan"
+INDEX_ONLY_SCAN = "Index Only Scan"
+
+
+class QueryCheck(NamedTuple):
+    """Горячий запрос для EXPLAIN-проверки: SQL, параметры, ожидаемый узел плана и индекс."""
+
+    query: str
+    args: Tuple[Any, ...]
+    # INDEX_SCAN допускает и index-only scan; INDEX_ONLY_SCAN — только его
+    expect: str = INDEX_SCAN
+    # Ключ, который должен стоять в плане MySQL (PRIMARY или имя индекса)
+    index: Optional[str] = None
+
+
+class Migration(NamedTuple):
+    """Шаг миграции схемы для одного бэкенда."""
+
+    version: int
+    description: str
+    # Для PostgreSQL получает соединение asyncpg, для MySQL — курсор aiomysql
+    apply: Callable[[Any], Awaitable[None]]
+    # Запросы, которые должны обслуживаться индексами после миграции
+    checks: List[QueryCheck] = []
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL
+# ---------------------------------------------------------------------------
+
+
+async def _pg_baseline(conn) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS passed_users (
+            user_id BIGINT PRIMARY KEY,
+            passed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS banned_users (
+            user_id BIGINT PRIMARY KEY,
+            banned_until TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS active_polls (
+            poll_id VARCHAR(255) PRIMARY KEY,
+            user_id BIGINT,
+            chat_id BIGINT,
+            message_id BIGINT,
+            thread_id BIGINT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_banned_users_banned_until
+        ON banned_users (banned_until);
+        """
+    )
+
+
+async def _pg_access_paths(conn) -> None:
+    # Существующие записи относятся к единственному обслуживаемому чату
+    await conn.execute(
+        f"""
+        ALTER TABLE passed_users
+            ADD COLUMN chat_id BIGINT NOT NULL DEFAULT {int(config.ALLOWED_CHAT_ID)};
+        ALTER TABLE passed_users ALTER COLUMN chat_id DROP DEFAULT;
+        ALTER TABLE passed_users
+            DROP CONSTRAINT passed_users_pkey,
+            ADD PRIMARY KEY (chat_id, user_id);
+        ALTER TABLE active_polls
+            ALTER COLUMN poll_id TYPE VARCHAR(64),
+            ALTER COLUMN message_id TYPE INTEGER,
+            ALTER COLUMN thread_id TYPE INTEGER;
+        CREATE INDEX IF NOT EXISTS idx_active_polls_created_at
+        ON active_polls (created_at);
+        """
+    )
+
+
+async def _pg_question_stats(conn) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS question_stats (
+            question_id INT NOT NULL,
+            language VARCHAR(8) NOT NULL,
+            correct BIGINT NOT NULL DEFAULT 0,
+            incorrect BIGINT NOT NULL DEFAULT 0,
+            timeout BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (question_id, language)
+        );
+        """
+    )
+
+
+async def _pg_chat_scoped_bans(conn) -> None:
+    # Существующие баны относятся к единственному обслуживаемому чату
+    await conn.execute(
+        f"""
+        ALTER TABLE banned_users
+            ADD COLUMN chat_id BIGINT NOT NULL DEFAULT {int(config.ALLOWED_CHAT_ID)};
+        ALTER TABLE banned_users ALTER COLUMN chat_id DROP DEFAULT;
+        ALTER TABLE banned_users
+            DROP CONSTRAINT banned_users_pkey,
+            ADD PRIMARY KEY (chat_id, user_id);
+        """
+    )
+
+
+async def _pg_verification_stats(conn) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS verification_stats (
+            granularity INT NOT NULL,
+            bucket_start TIMESTAMP NOT NULL,
+            outcome VARCHAR(32) NOT NULL,
+            count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket_start, outcome)
+        );
+        """
+    )
+
+
+async def _pg_verification_events(conn) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS verification_events (
+            id BIGSERIAL PRIMARY KEY,
+            created_at TIMESTAMP NOT NULL,
+            chat_id BIGINT,
+            user_id BIGINT NOT NULL,
+            event VARCHAR(32) NOT NULL,
+            detail VARCHAR(255)
+        );
+        CREATE INDEX IF NOT EXISTS idx_verification_events_user_created
+        ON verification_events (user_id, created_at);
+        """
+    )
+
+
+async def _pg_leader_lease(conn) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leader_lease (
+            name VARCHAR(64) PRIMARY KEY,
+            node_id VARCHAR(255) NOT NULL,
+            acquired_at TIMESTAMP NOT NULL,
+            renewed_at TIMESTAMP NOT NULL
+        );
+        """
+    )
+
+
+async def _pg_idempotency_keys(conn) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            op_key VARCHAR(191) PRIMARY KEY,
+            expires_at TIMESTAMP NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at
+        ON idempotency_keys (expires_at);
+        """
+    )
+
+
+POSTGRES_MIGRATIONS = [
+    Migration(
+        1,
+        "baseline schema",
+        _pg_baseline,
+        [
+            ("SELECT banned_until FROM banned_users WHERE user_id = $1", (0,)),
+            ("SELECT user_id FROM banned_users WHERE banned_until <= NOW()", ()),
+        ],
+    ),
+    Migration(
+        2,
+        "chat-scoped passed_users, narrow active_polls, created_at index",
+        _pg_access_paths,
+        [
+            (
+                "SELECT 1 FROM passed_users WHERE chat_id = $1 AND user_id = $2",
+                (0, 0),
+                INDEX_ONLY_SCAN,
+            ),
+            ("SELECT user_id FROM active_polls WHERE poll_id = $1", ("0",)),
+            (
+                "SELECT poll_id FROM active_polls WHERE created_at < NOW() - INTERVAL '1 hour'",
+                (),
+            ),
+        ],
+    ),
+    Migration(
+        3,
+        "per-question answer stats",
+        _pg_question_stats,
+        [
+            (
+                "SELECT correct FROM question_stats WHERE question_id = $1 AND language = $2",
+                (0, "en"),
+            ),
+        ],
+    ),
+    Migration(
+        4,
+        "chat-scoped banned_users for the expired-ban sweeper",
+        _pg_chat_scoped_bans,
+        [
+            (
+                "SELECT banned_until FROM banned_users WHERE chat_id = $1 AND user_id = $2",
+                (0, 0),
+            ),
+            (
+                "SELECT chat_id, user_id FROM banned_users WHERE banned_until <= NOW() "
+                "ORDER BY banned_until LIMIT 1000",
+                (),
+            ),
+        ],
+    ),
+    Migration(
+        5,
+        "per-minute and per-hour verification rollups",
+        _pg_verification_stats,
+        [
+            (
+                "SELECT outcome, count FROM verification_stats "
+                "WHERE granularity = $1 AND bucket_start >= $2",
+                (60, datetime(2000, 1, 1)),
+            ),
+        ],
+    ),
+    Migration(
+        6,
+        "append-only verification event log",
+        _pg_verification_events,
+        [
+            (
+                "SELECT event FROM verification_events "
+                "WHERE user_id = $1 AND created_at >= $2 AND created_at < $3 "
+                "ORDER BY created_at LIMIT 100",
+                (0, datetime(2000, 1, 1), datetime(2000, 1, 2)),
+            ),
+        ],
+    ),
+    Migration(
+        7,
+        "leader lease for singleton maintenance jobs",
+        _pg_leader_lease,
+        [
+            (
+                "SELECT node_id, renewed_at FROM leader_lease WHERE name = $1",
+                ("maintenance",),
+            ),
+        ],
+    ),
+    Migration(
+        8,
+        "idempotency keys for side-effecting operations",
+        _pg_idempotency_keys,
+        [
+            (
+                "SELECT op_key FROM idempotency_keys WHERE expires_at < $1",
+                (datetime(2000, 1, 1),),
+            ),
+        ],
+    ),
+]
+
+
+# ---------------------------------------------------------------------------
+# MySQL
+# ---------------------------------------------------------------------------
+
+
+async def _mysql_create_index(cur, table: str, name: str, columns: str) -> None:
+    """CREATE INDEX, если индекса ещё нет (в MySQL нет IF NOT EXISTS для индексов)."""
+    await cur.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+        (table, name),
+    )
+    if not (await cur.fetchone())[0]:
+        await cur.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+
+
+async def _mysql_baseline(cur) -> None:
+    await cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS passed_users (
+            user_id BIGINT PRIMARY KEY,
+            passed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS banned_users (
+            user_id BIGINT PRIMARY KEY,
+            banned_until TIMESTAMP
+        )
+        """
+    )
+    await cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS active_polls (
+            poll_id VARCHAR(255) PRIMARY KEY,
+            user_id BIGINT,
+            chat_id BIGINT,
+            message_id BIGINT,
+            thread_id BIGINT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await _mysql_create_index(
+        cur, "banned_users", "idx_banned_users_banned_until", "banned_until"
+    )
+
+
+async def _mysql_access_paths(cur) -> None:
+    # Существующие записи относятся к единственному обслуживаемому чату
+    await cur.execute(
+        f"""
+        ALTER TABLE passed_users
+            ADD COLUMN chat_id BIGINT NOT NULL DEFAULT {int(config.ALLOWED_CHAT_ID)} FIRST,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (chat_id, user_id)
+        """
+    )
+    await cur.execute("ALTER TABLE passed_users ALTER COLUMN chat_id DROP DEFAULT")
+    await cur.execute(
+        """
+        ALTER TABLE active_polls
+            MODIFY poll_id VARCHAR(64) NOT NULL,
+            MODIFY message_id INT,
+            MODIFY thread_id INT
+        """
+    )
+    await _mysql_create_index(
+        cur, "active_polls", "idx_active_polls_created_at", "created_at"
+    )
+
+
+async def _mysql_question_stats(cur) -> None:
+    await cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS question_stats (
+            question_id INT NOT NULL,
+            language VARCHAR(8) NOT NULL,
+            correct BIGINT NOT NULL DEFAULT 0,
+            incorrect BIGINT NOT NULL DEFAULT 0,
+            timeout BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (question_id, language)
+        )
+        """
+    )
+
+
+async def _mysql_chat_scoped_bans(cur) -> None:
+    # Существующие баны относятся к единственному обслуживаемому чату
+    await cur.execute(
+        f"""
+        ALTER TABLE banned_users
+            ADD COLUMN chat_id BIGINT NOT NULL DEFAULT {int(config.ALLOWED_CHAT_ID)} FIRST,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (chat_id, user_id)
+        """
+    )
+    await cur.execute("ALTER TABLE banned_users ALTER COLUMN chat_id DROP DEFAULT")
+
+
+async def _mysql_verification_stats(cur) -> None:
+    await cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS verification_stats (
+            granularity INT NOT NULL,
+            bucket_start DATETIME NOT NULL,
+            outcome VARCHAR(32) NOT NULL,
+            count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket_start, outcome)
+        )
+        """
+    )
+
+
+async def _mysql_verification_events(cur) -> None:
+    await cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS verification_events (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            created_at DATETIME NOT NULL,
+            chat_id BIGINT,
+            user_id BIGINT NOT NULL,
+            event VARCHAR(32) NOT NULL,
+            detail VARCHAR(255)
+        )
+        """
+    )
+    await _mysql_create_index(
+        cur,
+        "verification_events",
+        "idx_verification_events_user_created",
+        "user_id, created_at",
+    )
+
+
+async def _mysql_leader_lease(cur) -> None:
+    await cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leader_lease (
+            name VARCHAR(64) PRIMARY KEY,
+            node_id VARCHAR(255) NOT NULL,
+            acquired_at DATETIME NOT NULL,
+            renewed_at DATETIME NOT NULL
+        )
+        """
+    )
+
+
+async def _mysql_idempotency_keys(cur) -> None:
+    await cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            op_key VARCHAR(191) PRIMARY KEY,
+            expires_at DATETIME NOT NULL
+        )
+        """
+    )
+    await _mysql_create_index(
+        cur, "idempotency_keys", "idx_idempotency_keys_expires_at", "expires_at"
+    )
+
+
+MYSQL_MIGRATIONS = [
+    Migration(
+        1,
+        "baseline schema",
+        _mysql_baseline,
+        [
+            (
+                "SELECT banned_until FROM banned_users WHERE user_id = %s",
+                (0,),
+                INDEX_SCAN,
+                "PRIMARY",
+            ),
+            (
+                "SELECT user_id FROM banned_users WHERE banned_until <= NOW()",
+                (),
+                INDEX_SCAN,
+                "idx_banned_users_banned_until",
+            ),
+        ],
+    ),
+    Migration(
+        2,
+        "chat-scoped passed_users, narrow active_polls, created_at index",
+        _mysql_access_paths,
+        [
+            (
+                "SELECT 1 FROM passed_users WHERE chat_id = %s AND user_id = %s",
+                (0, 0),
+                INDEX_ONLY_SCAN,
+                "PRIMARY",
+            ),
+            (
+                "SELECT user_id FROM active_polls WHERE poll_id = %s",
+                ("0",),
+                INDEX_SCAN,
+                "PRIMARY",
+            ),
+            (
+                "SELECT poll_id FROM active_polls WHERE created_at < NOW() - INTERVAL 1 HOUR",
+                (),
+                INDEX_SCAN,
+                "idx_active_polls_created_at",
+            ),
+        ],
+    ),
+    Migration(
+        3,
+        "per-question answer stats",
+        _mysql_question_stats,
+        [
+            (
+                "SELECT correct FROM question_stats WHERE question_id = %s AND language = %s",
+                (0, "en"),
+                INDEX_SCAN,
+                "PRIMARY",
+            ),
+        ],
+    ),
+    Migration(
+        4,
+        "chat-scoped banned_users for the expired-ban sweeper",
+        _mysql_chat_scoped_bans,
+        [
+            (
+                "SELECT banned_until FROM banned_users WHERE chat_id = %s AND user_id = %s",
+                (0, 0),
+                INDEX_SCAN,
+                "PRIMARY",
+            ),
+            (
+                "SELECT chat_id, user_id FROM banned_users WHERE banned_until <= NOW() "
+                "ORDER BY banned_until LIMIT 1000",
+                (),
+                INDEX_SCAN,
+                "idx_banned_users_banned_until",
+            ),
+        ],
+    ),
+    Migration(
+        5,
+        "per-minute and per-hour verification rollups",
+        _mysql_verification_stats,
+        [
+            (
+                "SELECT outcome, count FROM verification_stats "
+                "WHERE granularity = %s AND bucket_start >= %s",
+                (60, datetime(2000, 1, 1)),
+                INDEX_SCAN,
+                "PRIMARY",
+            ),
+        ],
+    ),
+    Migration(
+        6,
+        "append-only verification event log",
+        _mysql_verification_events,
+        [
+            (
+                "SELECT event FROM verification_events "
+                "WHERE user_id = %s AND created_at >= %s AND created_at < %s "
+                "ORDER BY created_at LIMIT 100",
+                (0, datetime(2000, 1, 1), datetime(2000, 1, 2)),
+                INDEX_SCAN,
+                "idx_verification_events_user_created",
+            ),
+        ],
+    ),
+    Migration(
+        7,
+        "leader lease for singleton maintenance jobs",
+        _mysql_leader_lease,
+        [
+            (
+                "SELECT node_id, renewed_at FROM leader_lease WHERE name = %s",
+                ("maintenance",),
+                INDEX_SCAN,
+                "PRIMARY",
+            ),
+        ],
+    ),
+    Migration(
+        8,
+        "idempotency keys for side-effecting operations",
+        _mysql_idempotency_keys,
+        [
+            (
+                "SELECT op_key FROM idempotency_keys WHERE expires_at < %s",
+                (datetime(2000, 1, 1),),
+                INDEX_SCAN,
+                "idx_idempotency_keys_expires_at",
+            ),
+        ],
+    ),
+]
+
+MIGRATIONS: Dict[str, List[Migration]] = {
+    "postgres": POSTGRES_MIGRATIONS,
+    "mysql": MYSQL_MIGRATIONS,
+}
+
+
+# ---------------------------------------------------------------------------
+# Маркер версии и раннер
+# ---------------------------------------------------------------------------
+
+
+async def get_schema_version(pool) -> Optional[int]:
+    """Текущая версия схемы из маркера в БД (None, если маркера ещё нет)."""
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            if not await conn.fetchval(
+                "SELECT to_regclass('schema_version') IS NOT NULL"
+            ):
+                return None
+            return await conn.fetchval("SELECT MAX(version) FROM schema_version")
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "SELECT COUNT(*) FROM information_schema.tables "
+                    "WHERE table_schema = DATABASE() AND table_name = 'schema_version'"
+                )
+                if not (await cur.fetchone())[0]:
+                    return None
+                await cur.execute("SELECT MAX(version) FROM schema_version")
+                return (await cur.fetchone())[0]
+
+
+async def _pg_set_version(conn, version: int) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (version INT NOT NULL);
+        DELETE FROM schema_version;
+        """
+    )
+    await conn.execute("INSERT INTO schema_version (version) VALUES ($1)", version)
+
+
+async def _mysql_set_version(cur, version: int) -> None:
+    await cur.execute("CREATE TABLE IF NOT EXISTS schema_version (version INT NOT NULL)")
+    await cur.execute("DELETE FROM schema_version")
+    await cur.execute("INSERT INTO schema_version (version) VALUES (%s)", (version,))
+
+
+def _pg_plan_nodes(plan: dict) -> List[str]:
+    nodes = [plan["Node Type"]]
+    for child in plan.get("Plans", []):
+        nodes.extend(_pg_plan_nodes(child))
+    return nodes
+
+
+def _pg_plan_ok(nodes: List[str], expect: str) -> bool:
+    if expect == INDEX_ONLY_SCAN:
+        return INDEX_ONLY_SCAN in nodes
+    return INDEX_SCAN in nodes or INDEX_ONLY_SCAN in nodes
+
+
+def _mysql_plan_ok(plan: dict, expect: str, index: Optional[str]) -> bool:
+    extra = plan.get("Extra") or ""
+    # Строка не найдена ещё при оптимизации: так бывает только при поиске
+    # по всему первичному ключу, и ключ в плане уже не показывается
+    if "no matching row in const table" in extra:
+        return index == "PRIMARY"
+    if not plan.get("key") or (index is not None and plan["key"] != index):
+        return False
+    return expect != INDEX_ONLY_SCAN or "Using index" in extra
+
+
+async def check_query_plans(pool, checks: List[QueryCheck]) -> bool:
+    """EXPLAIN горячих запросов: предупреждает, если запрос не обслуживается индексом.
+
+    В PostgreSQL seq scan и bitmap scan отключаются на время проверки,
+    чтобы планировщик не выбирал их из-за маленьких таблиц на свежей базе,
+    и в плане ищется ожидаемый узел (index scan или index-only scan).
+    В MySQL с той же целью max_seeks_for_key снижается до 1, а в плане
+    должен стоять ожидаемый ключ.
+    """
+    ok = True
+    if config.DB_TYPE == "postgres":
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SET LOCAL enable_seqscan = off")
+                await conn.execute("SET LOCAL enable_bitmapscan = off")
+                for query, args, expect, _ in (QueryCheck(*check) for check in checks):
+                    raw = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *args)
+                    plan = json.loads(raw)[0]["Plan"]
+                    nodes = _pg_plan_nodes(plan)
+                    if _pg_plan_ok(nodes, expect):
+                        logging.info(f"Query plan {nodes}: {query}")
+                    else:
+                        ok = False
+                        logging.warning(f"Query plan {nodes} has no {expect}: {query}")
+    elif config.DB_TYPE == "mysql":
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                # Оценка поиска по индексу не выше одного чтения: полный
+                # просмотр почти пустой таблицы больше не выглядит дешевле
+                await cur.execute("SET SESSION max_seeks_for_key = 1")
+                try:
+                    for query, args, expect, index in (QueryCheck(*check) for check in checks):
+                        await cur.execute(f"EXPLAIN {query}", args)
+                        columns = [column[0] for column in cur.description]
+                        for row in await cur.fetchall():
+                            plan = dict(zip(columns, row))
+                            extra = plan.get("Extra") or ""
+                            if _mysql_plan_ok(plan, expect, index):
+                                logging.info(
+                                    f"Query plan key={plan.get('key')} "
+                                    f"type={plan.get('type')} extra={extra}: {query}"
+                                )
+                            else:
+                                ok = False
+                                logging.warning(
+                                    f"Query is not served by {expect} on {index} "
+                                    f"(key={plan.get('key')} type={plan.get('type')} extra={extra}): {query}"
+                                )
+                finally:
+                    await cur.execute("SET SESSION max_seeks_for_key = DEFAULT")
+    return ok
+
+
+async def run_migrations(pool) -> int:
+    """Применяет миграции новее маркера версии и возвращает итоговую версию."""
+    migrations = MIGRATIONS[config.DB_TYPE]
+    current = await get_schema_version(pool) or 0
+    pending = [migration for migration in migrations if migration.version > current]
+    if not pending:
+        logging.info(f"Database schema is up to date (version {current})")
+        return current
+
+    for migration in pending:
+        logging.info(
+            f"Applying migration {migration.version}: {migration.description}"
+        )
+        async with pool.acquire() as conn:
+            if config.DB_TYPE == "postgres":
+                async with conn.transaction():
+                    await migration.apply(conn)
+                    await _pg_set_version(conn, migration.version)
+            else:
+                # DDL в MySQL не транзакционен: маркер пишется после каждого шага
+                async with conn.cursor() as cur:
+                    await migration.apply(cur)
+                    await _mysql_set_version(cur, migration.version)
+        await check_query_plans(pool, migration.checks)
+    return pending[-1].version
@@ -0,0 +1,23 @@
+import os
+
+# Обязательные поля Config: тесты не обращаются ни к Telegram, ни к БД
+TEST_ENV = {
+    "BOT_TOKEN": "111111111:ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghi",
+    "DB_TYPE": "postgres",
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_NAME": "test",
+    "DB_HOST": "localhost",
+    "ALLOWED_CHAT_ID": "-100123",
+    "LANGUAGE_SELECTION_TIMEOUT": "300",
+    "QUIZ_ANSWER_TIMEOUT": "30",
+    "MESSAGE_DELETE_DELAY_CORRECT": "10",
+    "MESSAGE_DELETE_DELAY_INCORRECT": "30",
+    "MESSAGE_DELETE_DELAY_TIMEOUT": "60",
+    "DEFAULT_MESSAGE_DELETE_DELAY": "5",
+    "MUTE_DURATION": "86400",
+    "CLEANUP_INTERVAL": "120",
+}
+
+for key, value in TEST_ENV.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+import utils.active_polls as active_polls_module
+from utils.active_polls import ActivePollCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Таблица active_polls в памяти с журналом обращений."""
+    rows = {}
+    log = []
+
+    async def add_active_poll(pool, poll_id, user_id, chat_id, message_id, thread_id):
+        # Вставка медленнее, чем обработка следующего апдейта
+        await asyncio.sleep(0.01)
+        if poll_id == "broken":
+            raise OSError("connection lost")
+        rows[poll_id] = {
+            "user_id": user_id,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "thread_id": thread_id,
+        }
+        log.append(("insert", poll_id))
+
+    async def get_active_poll(pool, poll_id):
+        log.append(("select", poll_id))
+        return rows.get(poll_id)
+
+    async def remove_active_poll(pool, poll_id):
+        rows.pop(poll_id, None)
+        log.append(("delete", poll_id))
+
+    monkeypatch.setattr(active_polls_module, "add_active_poll", add_active_poll)
+    monkeypatch.setattr(active_polls_module, "get_active_poll", get_active_poll)
+    monkeypatch.setattr(active_polls_module, "remove_active_poll", remove_active_poll)
+    return rows, log
+
+
+def register(cache, poll_id, user_id=1):
+    cache.register(None, poll_id, user_id, user_id, 10, None)
+
+
+def test_remove_waits_for_background_insert(db):
+    rows, log = db
+    cache = ActivePollCache(ttl=60, max_size=10)
+
+    async def scenario():
+        register(cache, "p1")
+        # Ответ читается из кэша, пока вставка ещё не дошла до БД
+        cached = await cache.get(None, "p1")
+        await cache.remove(None, "p1")
+        return cached, await cache.get(None, "p1")
+
+    cached, after = asyncio.run(scenario())
+    assert cached["user_id"] == 1 and after is None
+    assert log == [("insert", "p1"), ("delete", "p1"), ("select", "p1")]
+    assert rows == {} and cache._pending == {}
+
+
+def test_failed_insert_does_not_block_remove(db):
+    rows, log = db
+    cache = ActivePollCache(ttl=60, max_size=10)
+
+    async def scenario():
+        register(cache, "broken")
+        await cache.remove(None, "broken")
+
+    asyncio.run(scenario())
+    assert log == [("delete", "broken")]
+
+
+def test_oldest_poll_is_evicted_at_capacity(db):
+    rows, log = db
+    cache = ActivePollCache(ttl=60, max_size=2)
+
+    async def scenario():
+        for number in (1, 2, 3):
+            register(cache, f"p{number}", user_id=number)
+        await asyncio.gather(*cache._pending.values())
+        return [(await cache.get(None, f"p{number}"))["user_id"] for number in (1, 2, 3)]
+
+    # Вытесненный опрос читается из БД, остальные — из кэша
+    assert asyncio.run(scenario()) == [1, 2, 3]
+    assert len(cache) == 2
+    assert [entry for entry in log if entry[0] == "select"] == [("select", "p1")]
+
+
+def test_expired_poll_falls_back_to_db(db, monkeypatch):
+    rows, log = db
+    clock = Clock()
+    monkeypatch.setattr(active_polls_module, "time", clock)
+    cache = ActivePollCache(ttl=60, max_size=10)
+
+    async def scenario():
+        register(cache, "p1")
+        await asyncio.gather(*cache._pending.values())
+        fresh = await cache.get(None, "p1")
+        clock.now = 61
+        # Запись истекла: чтение уходит в БД, запись удаляется из кэша
+        rows["p1"] = {**rows["p1"], "message_id": 20}
+        return fresh, await cache.get(None, "p1")
+
+    fresh, expired = asyncio.run(scenario())
+    assert fresh["message_id"] == 10 and expired["message_id"] == 20
+    assert len(cache) == 0
+    assert log == [("insert", "p1"), ("select", "p1")]
@@ -0,0 +1,39 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import GetChatMember
+
+from config import config
+from handlers.admin import is_chat_admin
+from utils.staff import staff_cache
+
+
+class MemberBot:
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = 0
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.calls += 1
+        status = self.statuses.get(user_id)
+        if status is None:
+            raise TelegramBadRequest(GetChatMember(chat_id=chat_id, user_id=user_id), "not found")
+        return SimpleNamespace(status=status)
+
+
+def test_admin_commands_check_live_status():
+    # Кэш считает пользователя администратором, но Telegram уже снял права
+    staff_cache._staff[config.ALLOWED_CHAT_ID] = {1}
+    staff_cache._expires[config.ALLOWED_CHAT_ID] = float("inf")
+    bot = MemberBot({1: "member", 2: "creator"})
+
+    async def scenario():
+        return [await is_chat_admin(bot, user_id) for user_id in (1, 2, 3)]
+
+    try:
+        assert asyncio.run(scenario()) == [False, True, False]
+    finally:
+        staff_cache._staff.pop(config.ALLOWED_CHAT_ID, None)
+        staff_cache._expires.pop(config.ALLOWED_CHAT_ID, None)
+    assert bot.calls == 3
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+import database
+from utils.bloom import BloomFilter, PassedUsersFilter, snapshot_lock
+from utils.verdict_cache import verdict_cache
+
+
+def test_added_keys_are_always_found():
+    bloom = BloomFilter.for_capacity(10000, 0.01)
+    for user_id in range(10000):
+        bloom.add(-100, user_id)
+    assert all(bloom.might_contain(-100, user_id) for user_id in range(10000))
+
+
+def test_false_positive_rate_near_target():
+    bloom = BloomFilter.for_capacity(10000, 0.01)
+    for user_id in range(10000):
+        bloom.add(-100, user_id)
+    false_positives = sum(bloom.might_contain(-100, user_id) for user_id in range(10000, 60000))
+    assert false_positives / 50000 < 0.02
+
+
+def test_chat_is_part_of_key():
+    bloom = BloomFilter.for_capacity(1000, 0.001)
+    bloom.add(-100, 1)
+    assert not bloom.might_contain(-200, 1)
+
+
+def test_merge_requires_same_parameters():
+    a = BloomFilter.for_capacity(1000, 0.01)
+    b = BloomFilter.for_capacity(1000, 0.01)
+    a.add(-100, 1)
+    b.add(-100, 2)
+    a.merge(b)
+    assert a.might_contain(-100, 1) and a.might_contain(-100, 2)
+    with pytest.raises(ValueError):
+        a.merge(BloomFilter.for_capacity(5000, 0.01))
+
+
+def test_snapshot_roundtrip_and_corruption(tmp_path):
+    path = str(tmp_path / "passed.bloom")
+    bloom = BloomFilter.for_capacity(1000, 0.01)
+    bloom.add(-100, 7)
+    bloom.save(path)
+    loaded = BloomFilter.load(path)
+    assert loaded.might_contain(-100, 7)
+    assert (loaded.size_bits, loaded.hashes) == (bloom.size_bits, bloom.hashes)
+    with open(path, "r+b") as f:
+        f.truncate(20)
+    assert BloomFilter.load(path) is None
+    assert BloomFilter.load(str(tmp_path / "missing.bloom")) is None
+
+
+def test_concurrent_saves_never_expose_partial_file(tmp_path):
+    path = str(tmp_path / "passed.bloom")
+    bloom = BloomFilter.for_capacity(200000, 0.01)
+    errors = []
+
+    def writer():
+        for _ in range(20):
+            try:
+                bloom.save(path)
+            except OSError as e:
+                errors.append(e)
+
+    def reader():
+        for _ in range(200):
+            if BloomFilter.load(path) is None and (tmp_path / "passed.bloom").exists():
+                errors.append("partial snapshot")
+
+    threads = [threading.Thread(target=writer) for _ in range(4)] + [threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert [p.name for p in tmp_path.iterdir()] == ["passed.bloom"]
+
+
+@pytest.fixture
+def fetched(monkeypatch, tmp_path):
+    passed_filter = PassedUsersFilter(1000, 0.01, str(tmp_path / "passed.bloom"))
+    monkeypatch.setattr(database, "passed_filter", passed_filter)
+    queried = []
+
+    async def fetch(pool, user_id, chat_id):
+        queried.append(user_id)
+        return user_id in (41, 42)
+
+    monkeypatch.setattr(database, "_fetch_user_passed", fetch)
+    yield passed_filter, queried
+    for user_id in (41, 42):
+        verdict_cache.discard(-100, user_id)
+
+
+def test_negative_is_final_once_ready(fetched):
+    passed_filter, queried = fetched
+    # До загрузки фильтра решает БД
+    assert asyncio.run(database.check_user_passed(None, 41, -100))
+    passed_filter.ready = True
+    passed_filter.add(-100, 42)
+    assert not asyncio.run(database.check_user_passed(None, 43, -100))
+    assert asyncio.run(database.check_user_passed(None, 42, -100))
+    assert queried == [41, 42]
+
+
+def test_negative_picks_up_snapshot_of_other_process(fetched):
+    passed_filter, queried = fetched
+    passed_filter.ready = True
+    passed_filter.save_snapshot()
+    # whitelist.py или другой шард дописал пользователя в общий снапшот
+    snapshot = BloomFilter.load(passed_filter.snapshot_path)
+    snapshot.add(-100, 42)
+    snapshot.save(passed_filter.snapshot_path)
+    passed_filter._snapshot_mtime = 0.0
+    assert asyncio.run(database.check_user_passed(None, 42, -100))
+    assert queried == [42]
+
+
+def test_sync_saves_new_keys_unless_snapshot_is_locked(tmp_path):
+    path = str(tmp_path / "passed.bloom")
+    first = PassedUsersFilter(1000, 0.01, path)
+    second = PassedUsersFilter(1000, 0.01, path)
+    first.ready = second.ready = True
+    first.add(-100, 1)
+    with snapshot_lock(path):
+        first.sync()
+    assert first.dirty and not os.path.exists(path)
+    first.sync()
+    assert not first.dirty
+    second.add(-100, 2)
+    second.sync()
+    first.sync()
+    # Оба ключа в снапшоте и в фильтрах: запись не затёрла чужие биты
+    assert BloomFilter.load(path).might_contain(-100, 1)
+    assert BloomFilter.load(path).might_contain(-100, 2)
+    assert not first.definitely_absent(-100, 2)
+
+
+def test_merge_snapshot_picks_up_other_process(tmp_path):
+    path = str(tmp_path / "passed.bloom")
+    running = PassedUsersFilter(1000, 0.01, path)
+    running.ready = True
+    running.save_snapshot()
+    importer = BloomFilter.load(path)
+    importer.add(-100, 5)
+    importer.save(path)
+    # Импорт мог уложиться в ту же секунду, что и сохранение бота
+    running._snapshot_mtime = 0.0
+    assert running.merge_snapshot()
+    assert not running.definitely_absent(-100, 5)
+    assert not running.merge_snapshot()
+
+
+def test_whitelist_import_extends_existing_snapshot(monkeypatch, tmp_path):
+    import whitelist
+    from config import config
+
+    path = str(tmp_path / "passed.bloom")
+    monkeypatch.setattr(config, "BLOOM_SNAPSHOT_PATH", path)
+    # Без снапшота бот перестраивает фильтр из таблицы, файл не создаётся
+    assert not whitelist.add_to_snapshot(-100, [1])
+    assert not os.path.exists(path)
+    BloomFilter.for_capacity(1000, 0.01).save(path)
+    assert whitelist.add_to_snapshot(-100, [1, 2])
+    assert BloomFilter.load(path).might_contain(-100, 2)
@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+import bot as bot_module
+import utils.circuit_breaker as breaker_module
+from config import config
+from database import guarded
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, DatabaseUnavailable
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker_module, "time", clock)
+    return clock
+
+
+async def down():
+    raise OSError("connection refused")
+
+
+async def up(value="ok"):
+    return value
+
+
+def test_closed_open_half_open_closed(clock):
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10, call_timeout=1, queue_size=10)
+
+    async def scenario():
+        states = []
+        for _ in range(2):
+            with pytest.raises(DatabaseUnavailable):
+                await breaker.call(down)
+            states.append(breaker.state)
+        # Разомкнутый автомат не ходит в БД до истечения reset_timeout
+        clock.now = 5
+        with pytest.raises(DatabaseUnavailable, match="circuit open"):
+            await breaker.call(up)
+        # Пробный запрос со сбоем снова размыкает автомат
+        clock.now = 10
+        with pytest.raises(DatabaseUnavailable):
+            await breaker.call(down)
+        states.append(breaker.state)
+        clock.now = 15
+        with pytest.raises(DatabaseUnavailable, match="circuit open"):
+            await breaker.call(up)
+        clock.now = 20
+
+        async def probe():
+            return breaker.state
+
+        # Пробный запрос идёт в полуоткрытом состоянии, успех замыкает автомат
+        states.append(await breaker.call(probe))
+        states.append(breaker.state)
+        return states
+
+    assert asyncio.run(scenario()) == [CLOSED, OPEN, OPEN, HALF_OPEN, CLOSED]
+    assert breaker.failures == 0
+
+
+def test_query_error_is_not_an_outage(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10, call_timeout=1, queue_size=10)
+
+    async def broken_query():
+        raise ValueError("syntax error")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await breaker.call(broken_query)
+        return breaker.state
+
+    assert asyncio.run(scenario()) == CLOSED
+
+
+def test_queued_writes_replay_in_order_after_recovery(clock, monkeypatch):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10, call_timeout=1, queue_size=2)
+    monkeypatch.setattr("database.db_breaker", breaker)
+    written = []
+    available = {"db": False}
+
+    @guarded(write=True)
+    async def write(value):
+        if not available["db"]:
+            raise OSError("connection refused")
+        written.append(value)
+
+    async def scenario():
+        for value in ("a", "b", "c"):
+            await write(value)
+        # Очередь на две записи: самая старая потеряна
+        assert breaker.state == OPEN and breaker.dropped_writes == 1
+        clock.now = 10
+        available["db"] = True
+        await write("d")
+        while breaker.writes or breaker._replaying:
+            await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert written == ["d", "b", "c"]
+    assert breaker.status()["degraded_decisions"] == {"write_queued": 3}
+
+
+def test_replay_stops_at_new_outage_and_keeps_the_rest(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10, call_timeout=1, queue_size=10)
+    written = []
+
+    async def write(value):
+        if value == "b":
+            raise OSError("connection refused")
+        written.append(value)
+
+    async def scenario():
+        for value in ("a", "b", "c"):
+            breaker.queue_write(write, (value,), {})
+        breaker.state = OPEN
+        clock.now = 10
+        await breaker.call(up)
+        while breaker._replaying or breaker.state != OPEN:
+            await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert written == ["a"]
+    assert breaker.state == OPEN
+    assert [args for _, args, _ in breaker.writes] == [("b",), ("c",)]
+
+
+def test_question_stats_load_is_retried(monkeypatch):
+    monkeypatch.setattr(config, "QUIZ_STATS_FLUSH_INTERVAL", 0)
+    attempts = []
+    loaded = []
+    flushed = []
+
+    async def load_question_stats(pool):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise DatabaseUnavailable("circuit open")
+        return [(1, "ru", 5, 1, 0)]
+
+    async def add_question_stats(pool, rows):
+        flushed.append(rows)
+
+    monkeypatch.setattr(bot_module, "load_question_stats", load_question_stats)
+    monkeypatch.setattr(bot_module, "add_question_stats", add_question_stats)
+    monkeypatch.setattr(bot_module.question_engine, "load", loaded.extend)
+    monkeypatch.setattr(bot_module.question_engine, "take_pending", lambda: [(1, "ru", 1, 0, 0)])
+    monkeypatch.setattr(bot_module.question_engine, "rebuild", lambda: None)
+
+    async def scenario():
+        task = asyncio.create_task(bot_module.question_stats_task(None))
+        while not flushed:
+            await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert len(attempts) == 3
+    assert loaded == [(1, "ru", 5, 1, 0)]
+    # Приращения не сбрасывались, пока итоги не были загружены
+    assert flushed[0] == [(1, "ru", 1, 0, 0)]
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+
+import pytest
+
+import utils.event_log as event_log_module
+from utils.event_log import EventLog
+
+
+def events(log):
+    return [row[3] for row in log.buffer]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """append_verification_events, который падает по флагу и даёт вклиниться emit()."""
+    state = {"down": False, "written": [], "during_flush": []}
+
+    async def append_verification_events(pool, rows):
+        await asyncio.sleep(0)
+        for emit in state["during_flush"]:
+            emit()
+        state["during_flush"] = []
+        if state["down"]:
+            raise OSError("connection lost")
+        state["written"].extend(row[3] for row in rows)
+
+    monkeypatch.setattr(event_log_module, "append_verification_events", append_verification_events)
+    return state
+
+
+def test_overflow_drops_oldest_and_is_reported(db, caplog):
+    log = EventLog(max_size=3)
+    for event in ("a", "b", "c", "d", "e"):
+        log.emit(event, user_id=1)
+    assert events(log) == ["c", "d", "e"] and log.dropped == 2
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(log.flush(None))
+    assert "2 events dropped" in caplog.text
+    assert db["written"] == ["c", "d", "e"] and log.dropped == 0
+
+
+def test_failed_flush_puts_events_back_before_new_ones(db):
+    log = EventLog(max_size=10)
+    log.emit("a", user_id=1)
+    log.emit("b", user_id=1)
+    db["down"] = True
+    db["during_flush"] = [lambda: log.emit("c", user_id=2)]
+    asyncio.run(log.flush(None))
+    assert events(log) == ["a", "b", "c"] and log.dropped == 0
+
+    db["down"] = False
+    asyncio.run(log.flush(None))
+    assert db["written"] == ["a", "b", "c"] and not log.buffer
+
+
+def test_restore_keeps_newest_events_when_buffer_refilled(db):
+    log = EventLog(max_size=3)
+    log.emit("a", user_id=1)
+    log.emit("b", user_id=1)
+    db["down"] = True
+    db["during_flush"] = [lambda: log.emit("c", user_id=2), lambda: log.emit("d", user_id=2)]
+    asyncio.run(log.flush(None))
+    # Места хватило на одно возвращённое событие: теряется самое старое
+    assert events(log) == ["b", "c", "d"] and log.dropped == 1
@@ -0,0 +1,93 @@
+import asyncio
+
+from aiogram.fsm.storage.base import StorageKey
+
+from handlers.states import UserState
+from utils.fsm_storage import TTLMemoryStorage
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=-100, user_id=user_id)
+
+
+def storage(clock: Clock, ttl: float = 60, finished_ttl: float = 10, slots: int = 16):
+    return TTLMemoryStorage(ttl, finished_ttl, (UserState.completed,), slots=slots, clock=clock)
+
+
+def test_reads_do_not_create_records():
+    store = storage(Clock())
+
+    async def scenario():
+        assert await store.get_state(key(1)) is None
+        assert await store.get_data(key(1)) == {}
+        await store.set_state(key(2), None)
+        await store.set_data(key(3), {})
+
+    asyncio.run(scenario())
+    assert len(store) == 0
+
+
+def test_record_expires_after_ttl_and_touch_extends_it():
+    clock = Clock()
+    store = storage(clock)
+
+    async def scenario():
+        await store.set_state(key(1), UserState.waiting_for_language)
+        await store.set_state(key(2), UserState.waiting_for_language)
+        clock.now = 50
+        await store.update_data(key(2), {"first_message_id": 7})
+
+    asyncio.run(scenario())
+    assert store.advance(59) == 0
+    assert store.advance(60) == 1
+    assert list(store.records) == [key(2)]
+    assert store.advance(110) == 1
+    assert len(store) == 0 and store.evicted == 2
+
+
+def test_finished_state_uses_short_ttl():
+    clock = Clock()
+    store = storage(clock)
+
+    async def scenario():
+        await store.set_state(key(1), UserState.answering_quiz)
+        clock.now = 5
+        await store.set_state(key(1), UserState.completed)
+
+    asyncio.run(scenario())
+    assert store.advance(14) == 0
+    assert store.advance(15) == 1
+
+
+def test_ttl_longer_than_wheel_waits_for_its_revolution():
+    clock = Clock()
+    # 16 ячеек, TTL 40 тиков: запись проходит через свою ячейку дважды до истечения
+    store = storage(clock, ttl=40, slots=16)
+    asyncio.run(store.set_state(key(1), UserState.waiting_for_language))
+    for tick in range(1, 40):
+        assert store.advance(tick) == 0
+    assert store.advance(40) == 1
+
+
+def test_long_pause_processes_one_revolution():
+    clock = Clock()
+    store = storage(clock, ttl=5, slots=16)
+
+    async def scenario():
+        for user_id in range(100):
+            clock.now = user_id
+            await store.set_state(key(user_id), UserState.waiting_for_language)
+
+    asyncio.run(scenario())
+    # Пауза намного длиннее оборота колеса: истекают все записи за один вызов
+    assert store.advance(10_000) == 100
+    assert len(store) == 0
+    assert all(not slot for slot in store._wheel)
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+import utils.idempotency as idempotency_module
+from config import config
+from utils.circuit_breaker import CLOSED, OPEN, DatabaseUnavailable, db_breaker
+from utils.idempotency import IdempotencyGuard, RecentUpdates
+
+
+def test_recent_updates_forgets_oldest_at_capacity():
+    recent = RecentUpdates(3)
+    assert [recent.seen(update_id) for update_id in (1, 2, 3)] == [False] * 3
+    assert recent.seen(2)
+    assert not recent.seen(4)
+    assert len(recent) == 3
+    # update_id 1 вытеснен и снова считается новым
+    assert not recent.seen(1)
+    assert recent.seen(4)
+
+
+def test_local_claim_release_and_expiry(monkeypatch):
+    monkeypatch.setattr(config, "IDEMPOTENCY_BACKEND", "memory")
+    guard = IdempotencyGuard(max_keys=2)
+
+    async def scenario():
+        results = [await guard.claim(None, "a", 60), await guard.claim(None, "a", 60)]
+        await guard.release(None, "a")
+        results.append(await guard.claim(None, "a", 60))
+        # Нулевой TTL истекает сразу
+        results += [await guard.claim(None, "b", 0), await guard.claim(None, "b", 0)]
+        return results
+
+    assert asyncio.run(scenario()) == [True, False, True, True, True]
+
+
+@pytest.fixture
+def db_backend(monkeypatch):
+    calls = {"claimed": [], "released": []}
+
+    async def claim(pool, key, ttl):
+        if db_breaker.is_degraded:
+            raise DatabaseUnavailable("circuit open")
+        calls["claimed"].append(key)
+        return True
+
+    async def release(pool, key):
+        calls["released"].append(key)
+
+    monkeypatch.setattr(config, "IDEMPOTENCY_BACKEND", "db")
+    monkeypatch.setattr(idempotency_module, "claim_idempotency_key", claim)
+    monkeypatch.setattr(idempotency_module, "release_idempotency_key", release)
+    yield calls
+    db_breaker.state = CLOSED
+
+
+def test_release_is_skipped_while_db_is_degraded(db_backend):
+    guard = IdempotencyGuard(max_keys=10)
+
+    async def scenario():
+        db_breaker.state = OPEN
+        claimed = await guard.claim(None, "prompt:1", 60)
+        await guard.release(None, "prompt:1")
+        return claimed, await guard.claim(None, "prompt:1", 60)
+
+    # Без БД решает локальный захват, освобождение не уходит в БД
+    assert asyncio.run(scenario()) == (True, True)
+    assert db_backend["released"] == []
+
+
+def test_release_reaches_db_when_closed(db_backend):
+    guard = IdempotencyGuard(max_keys=10)
+
+    async def scenario():
+        await guard.claim(None, "prompt:2", 60)
+        await guard.release(None, "prompt:2")
+
+    asyncio.run(scenario())
+    assert db_backend == {"claimed": ["prompt:2"], "released": ["prompt:2"]}
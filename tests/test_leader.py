@@ -0,0 +1,159 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import config
+from utils.circuit_breaker import CLOSED, OPEN, DatabaseUnavailable, db_breaker
+from utils.leader import LeaderElector
+
+
+class FakeDatabase:
+    """Advisory lock на соединение и строка leader_lease, как в PostgreSQL."""
+
+    def __init__(self) -> None:
+        self.lock_holder = None
+        self.lease = None
+        self.now = datetime(2026, 1, 1)
+        self.down = False
+        self.queries = 0
+
+
+class FakeConnection:
+    def __init__(self, db: FakeDatabase) -> None:
+        self.db = db
+        self.broken = False
+
+    def _check(self) -> None:
+        self.db.queries += 1
+        if self.db.down or self.broken:
+            raise OSError("connection lost")
+
+    async def fetchval(self, query, *args):
+        self._check()
+        if "pg_try_advisory_lock" in query:
+            if self.db.lock_holder in (None, self):
+                self.db.lock_holder = self
+                return True
+            return False
+        name, node_id = args
+        if self.db.lease is None or self.db.lease["node_id"] != node_id:
+            self.db.lease = {"node_id": node_id, "acquired_at": self.db.now}
+        self.db.lease["renewed_at"] = self.db.now
+
+    async def fetchrow(self, query, *args):
+        self._check()
+        lease = self.db.lease
+        if lease is None:
+            return None
+        age = (self.db.now - lease["renewed_at"]).total_seconds()
+        return (lease["node_id"], lease["acquired_at"], lease["renewed_at"], age)
+
+    def terminate(self) -> None:
+        # Закрытое соединение снимает сессионную блокировку
+        self.broken = True
+        if self.db.lock_holder is self:
+            self.db.lock_holder = None
+
+
+class Acquire:
+    def __init__(self, conn: FakeConnection) -> None:
+        self.conn = conn
+
+    def __await__(self):
+        return self._get().__await__()
+
+    async def _get(self):
+        return self.conn
+
+    async def __aenter__(self):
+        return self.conn
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakePool:
+    def __init__(self, db: FakeDatabase) -> None:
+        self.db = db
+
+    def acquire(self) -> Acquire:
+        return Acquire(FakeConnection(self.db))
+
+    async def release(self, conn) -> None:
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(config, "DB_TYPE", "postgres")
+    yield FakeDatabase()
+    db_breaker.state = CLOSED
+    db_breaker.failures = 0
+
+
+def test_acquire_and_renew(db):
+    first = LeaderElector(FakePool(db), "a")
+    second = LeaderElector(FakePool(db), "b")
+
+    async def scenario():
+        await first._step()
+        acquired = db.lease["acquired_at"]
+        db.now += timedelta(seconds=5)
+        await first._step()
+        await second._step()
+        return acquired
+
+    acquired = asyncio.run(scenario())
+    assert first.is_leader and not second.is_leader
+    # Продление не меняет момент захвата; проигравший вернул соединение
+    assert db.lease == {"node_id": "a", "acquired_at": acquired, "renewed_at": db.now}
+    assert second._conn is None
+
+
+def test_lost_connection_hands_leadership_over(db, monkeypatch):
+    monkeypatch.setattr(config, "LEADER_RENEW_INTERVAL", 0.01)
+    first = LeaderElector(FakePool(db), "a")
+    second = LeaderElector(FakePool(db), "b")
+
+    async def wait_for(condition):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        task = asyncio.create_task(first.run())
+        await asyncio.wait_for(wait_for(lambda: first.is_leader), 1)
+        first._conn.broken = True
+        await asyncio.wait_for(wait_for(lambda: not first.is_leader), 1)
+        db.now += timedelta(seconds=30)
+        await second._step()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert second.is_leader and not first.is_leader
+    assert db.lease["node_id"] == "b" and db.lease["acquired_at"] == db.now
+    assert db.lock_holder is second._conn
+
+
+def test_status_reports_lease_and_goes_through_breaker(db, monkeypatch):
+    monkeypatch.setattr(db_breaker, "threshold", 1)
+    elector = LeaderElector(FakePool(db), "a")
+
+    async def scenario():
+        await elector._step()
+        db.now += timedelta(seconds=60)
+        status = await elector.status()
+        db.down = True
+        with pytest.raises(DatabaseUnavailable):
+            await elector.status()
+        queries = db.queries
+        # Разомкнутый автомат отвечает сразу, не обращаясь к БД
+        with pytest.raises(DatabaseUnavailable, match="circuit open"):
+            await elector.status()
+        return status, queries
+
+    status, queries = asyncio.run(scenario())
+    assert status["is_leader"] and status["leader"]["node_id"] == "a"
+    assert status["leader"]["lease_age"] == 60.0 and status["leader"]["stale"]
+    assert db_breaker.state == OPEN and db.queries == queries
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import time
+
+from utils.loop_monitor import LoopLagMonitor
+
+
+def test_lag_histogram_bucket_bounds_are_inclusive():
+    monitor = LoopLagMonitor(interval=0.5, block_threshold=1.0)
+    for lag in (0.0, 0.0005, 0.001, 0.005, 0.0051, 0.999, 1.0, 2.5):
+        monitor.record(lag)
+    status = monitor.status()
+    assert status["histogram"] == {
+        "<=1ms": 3,
+        "<=5ms": 1,
+        "<=10ms": 1,
+        "<=25ms": 0,
+        "<=50ms": 0,
+        "<=100ms": 0,
+        "<=250ms": 0,
+        "<=500ms": 0,
+        "<=1000ms": 2,
+        ">1000ms": 1,
+    }
+    assert status["last_lag_ms"] == 2500.0 and status["max_lag_ms"] == 2500.0
+    assert status["interval_ms"] == 500.0
+
+
+def blocking_call(seconds):
+    time.sleep(seconds)
+
+
+def test_only_stalls_over_threshold_are_reported_once(caplog):
+    monitor = LoopLagMonitor(interval=0.01, block_threshold=0.2)
+
+    async def scenario():
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        # Короче порога: попадает в гистограмму, но не считается блокировкой
+        blocking_call(0.08)
+        await asyncio.sleep(0.3)
+        blocking_call(0.5)
+        await asyncio.sleep(0.3)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(scenario())
+    assert monitor.blocked == 1
+    assert monitor.max_lag >= 0.4
+    warnings = [r.getMessage() for r in caplog.records if "Event loop blocked" in r.getMessage()]
+    assert len(warnings) == 1 and "blocking_call" in warnings[0]
@@ -0,0 +1,59 @@
+from migrations import (
+    INDEX_ONLY_SCAN,
+    INDEX_SCAN,
+    MYSQL_MIGRATIONS,
+    QueryCheck,
+    _mysql_plan_ok,
+    _pg_plan_nodes,
+    _pg_plan_ok,
+)
+
+
+def test_pg_plan_nodes_walks_children():
+    plan = {"Node Type": "Limit", "Plans": [{"Node Type": "Index Scan"}]}
+    assert _pg_plan_nodes(plan) == ["Limit", "Index Scan"]
+
+
+def test_pg_index_scan_expectation():
+    assert _pg_plan_ok(["Index Scan"], INDEX_SCAN)
+    assert _pg_plan_ok(["Limit", "Index Only Scan"], INDEX_SCAN)
+    assert not _pg_plan_ok(["Bitmap Heap Scan", "Bitmap Index Scan"], INDEX_SCAN)
+    assert not _pg_plan_ok(["Seq Scan"], INDEX_SCAN)
+
+
+def test_pg_index_only_scan_expectation():
+    assert _pg_plan_ok(["Index Only Scan"], INDEX_ONLY_SCAN)
+    assert not _pg_plan_ok(["Index Scan"], INDEX_ONLY_SCAN)
+
+
+def test_mysql_plan_expectations():
+    covering = {"key": "PRIMARY", "type": "ref", "Extra": "Using index"}
+    lookup = {"key": "PRIMARY", "type": "ref", "Extra": None}
+    full_scan = {"key": None, "type": "ALL", "Extra": "Using where"}
+    assert _mysql_plan_ok(covering, INDEX_ONLY_SCAN, "PRIMARY")
+    assert not _mysql_plan_ok(lookup, INDEX_ONLY_SCAN, "PRIMARY")
+    assert _mysql_plan_ok(lookup, INDEX_SCAN, "PRIMARY")
+    assert not _mysql_plan_ok(full_scan, INDEX_SCAN, "PRIMARY")
+
+
+def test_mysql_plan_requires_expected_key():
+    other_index = {"key": "idx_banned_users_banned_until", "type": "range", "Extra": None}
+    assert not _mysql_plan_ok(other_index, INDEX_SCAN, "PRIMARY")
+    assert _mysql_plan_ok(other_index, INDEX_SCAN, "idx_banned_users_banned_until")
+
+
+def test_mysql_const_table_only_proves_primary_key_lookup():
+    empty = {"key": None, "type": None, "Extra": "no matching row in const table"}
+    assert _mysql_plan_ok(empty, INDEX_ONLY_SCAN, "PRIMARY")
+    assert not _mysql_plan_ok(empty, INDEX_SCAN, "idx_active_polls_created_at")
+    assert not _mysql_plan_ok(empty, INDEX_SCAN, None)
+
+
+def test_every_mysql_check_names_its_index():
+    for migration in MYSQL_MIGRATIONS:
+        for check in migration.checks:
+            assert QueryCheck(*check).index, (migration.version, check)
+
+
+def test_two_element_check_defaults_to_index_scan():
+    assert QueryCheck(*("SELECT 1", ())).expect == INDEX_SCAN
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+import handlers.outcome as outcome
+from config import config
+from utils.event_log import event_log
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = {"deleted": [], "banned": [], "notices": []}
+
+    async def delete_message(bot, chat_id, message_id, delay=0):
+        calls["deleted"].append((chat_id, message_id, delay))
+
+    async def ban(bot, chat_id, user_id, pool, reason):
+        calls["banned"].append((chat_id, user_id, reason))
+
+    async def notice(bot, chat_id, text, thread_id, delay):
+        calls["notices"].append(chat_id)
+
+    monkeypatch.setattr(outcome, "delete_message", delete_message)
+    monkeypatch.setattr(outcome, "ban_user_after_timeout", ban)
+    monkeypatch.setattr(outcome, "_send_notice", notice)
+    monkeypatch.setattr(config, "IDEMPOTENCY_BACKEND", "memory")
+    return calls
+
+
+def answer_events(user_id):
+    return [row[3] for row in event_log.buffer if row[2] == user_id and row[3].startswith("answer")]
+
+
+def test_pm_quiz_is_deleted_after_result_delay(calls):
+    user_data = {"quiz_message_id": 11, "greeting_message_id": 10, "question_id": 1, "language": "en"}
+
+    async def scenario():
+        await outcome.fail_verification(
+            None, None, "test:pm-delay", outcome.INCORRECT, 701, None, user_data, None
+        )
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    delay = config.MESSAGE_DELETE_DELAY_INCORRECT
+    assert (701, 11, delay) in calls["deleted"]
+    assert (701, 10, delay) in calls["deleted"]
+
+
+def test_incorrect_answer_is_logged_once_per_outcome(calls):
+    user_data = {"question_id": 3, "language": "en"}
+
+    async def scenario():
+        first = await outcome.fail_verification(
+            None, None, "test:late", outcome.QUIZ_TIMEOUT, 702, -100, user_data, None
+        )
+        late = await outcome.fail_verification(
+            None, None, "test:late", outcome.INCORRECT, 702, -100, user_data, None
+        )
+        return first, late
+
+    assert asyncio.run(scenario()) == (True, False)
+    assert answer_events(702) == []
+    assert calls["banned"] == [(-100, 702, outcome.QUIZ_TIMEOUT)]
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import pytest
+from aiogram import types
+
+from bot import GroupPrefilterMiddleware
+from config import config
+from utils.staff import staff_cache
+from utils.verdict_cache import verdict_cache
+
+
+def message_update(chat_id=None, user_id=1, is_bot=False, text="привет"):
+    return types.Update(
+        update_id=1,
+        message=types.Message(
+            message_id=1,
+            date=int(time.time()),
+            chat=types.Chat(id=chat_id or config.ALLOWED_CHAT_ID, type="supergroup"),
+            from_user=types.User(id=user_id, is_bot=is_bot, first_name="u"),
+            text=text,
+        ),
+    )
+
+
+@pytest.fixture
+def passes(monkeypatch):
+    monkeypatch.setattr(staff_cache, "refresh_if_stale", lambda bot, chat_id: None)
+    middleware = GroupPrefilterMiddleware()
+
+    def check(update):
+        reached = []
+
+        async def handler(event, data):
+            reached.append(event)
+
+        asyncio.run(middleware(handler, update, {"bot": None}))
+        return bool(reached)
+
+    return check
+
+
+def test_foreign_chat_and_bots_are_dropped(passes):
+    assert not passes(message_update(chat_id=-999))
+    assert not passes(message_update(is_bot=True))
+
+
+def test_verified_member_is_dropped_but_commands_pass(passes):
+    verdict_cache.add(config.ALLOWED_CHAT_ID, 501)
+    try:
+        assert not passes(message_update(user_id=501))
+        assert passes(message_update(user_id=501, text="/stats"))
+    finally:
+        verdict_cache.discard(config.ALLOWED_CHAT_ID, 501)
+
+
+def test_unknown_member_reaches_handlers(passes):
+    assert passes(message_update(user_id=502))
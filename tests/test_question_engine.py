@@ -0,0 +1,56 @@
+import random
+from collections import Counter
+
+from utils.question_engine import AliasSampler, QuestionEngine
+
+
+def make_questions(count):
+    return [
+        {
+            "id": qid,
+            "question": {"en": f"q{qid}"},
+            "answers": {"en": ["a", "b"]},
+            "correct_index": 0,
+        }
+        for qid in range(count)
+    ]
+
+
+def test_alias_sampler_matches_weights():
+    random.seed(1)
+    sampler = AliasSampler(["a", "b", "c"], [1, 2, 7])
+    counts = Counter(sampler.sample() for _ in range(100000))
+    for item, share in (("a", 0.1), ("b", 0.2), ("c", 0.7)):
+        assert abs(counts[item] / 100000 - share) < 0.01
+
+
+def test_alias_sampler_single_item():
+    assert AliasSampler(["only"], [0.3]).sample() == "only"
+
+
+def test_failed_questions_are_picked_more_often():
+    random.seed(2)
+    engine = QuestionEngine(make_questions(2), pool_size=0)
+    engine.load([(0, "en", 90, 0, 0), (1, "en", 10, 60, 20)])
+    counts = Counter(engine.pick("en")["id"] for _ in range(20000))
+    assert counts[1] > 5 * counts[0]
+
+
+def test_active_pool_keeps_hardest_plus_one_random():
+    engine = QuestionEngine(make_questions(10), pool_size=3)
+    engine.load([(qid, "en", 0, qid, 0) for qid in range(10)])
+    active = set(engine.samplers["en"].items)
+    assert len(active) == 4
+    assert {9, 8, 7} <= active
+
+
+def test_pending_counters_roundtrip():
+    engine = QuestionEngine(make_questions(2), pool_size=0)
+    engine.record(0, "en", "correct")
+    engine.record(0, "en", "timeout")
+    engine.record(99, "en", "correct")
+    rows = engine.take_pending()
+    assert rows == [(0, "en", 1, 0, 1)]
+    assert engine.take_pending() == []
+    engine.restore_pending(rows)
+    assert engine.take_pending() == rows
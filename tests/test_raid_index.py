@@ -0,0 +1,202 @@
+import asyncio
+import time
+
+from aiogram import Dispatcher
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Message
+
+import handlers.language as language_handlers
+import handlers.message as message_handlers
+import handlers.raid as raid_handlers
+from config import config
+from handlers.outcome import claim_session, language_session
+from handlers.states import UserState
+from utils.raid_index import RaidIndex, simhash
+
+CHAT_ID = -100123
+SPAM = "Заработок от 500$ в день без вложений, пиши в личку прямо сейчас"
+
+
+def message(user_id, text=None, chat_id=CHAT_ID, **media):
+    data = {
+        "message_id": user_id * 10,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "supergroup", "title": "t"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "u"},
+        **media,
+    }
+    if text is not None:
+        data["text"] = text
+    return Message.model_validate(data)
+
+
+def file(unique_id):
+    return {"file_id": f"id-{unique_id}", "file_unique_id": unique_id}
+
+
+def test_simhash_is_stable_and_close_for_similar_texts():
+    tokens = SPAM.lower().split()
+    assert simhash(tokens) == simhash(list(tokens))
+    variant = tokens[:-1] + ["сейчас!!"]
+    distance = bin(simhash(tokens) ^ simhash(variant)).count("1")
+    other = "сегодня обсуждаем релиз новой версии и планы на следующую неделю".split()
+    assert distance < bin(simhash(tokens) ^ simhash(other)).count("1")
+    assert simhash(["одно"]) == simhash(["одно"])
+
+
+def test_cluster_of_similar_first_messages():
+    index = RaidIndex(window=300, cluster_size=3, max_distance=3, min_length=16)
+    assert index.observe(message(1, SPAM), now=0) == []
+    assert index.observe(message(2, SPAM.upper()), now=1) == []
+    # Другой чат и другой текст в кластер не входят
+    assert index.observe(message(9, SPAM, chat_id=-100999), now=2) == []
+    assert index.observe(message(8, "Всем привет, я из Казани, люблю Python"), now=2) == []
+    members = index.observe(message(3, SPAM + "!"), now=3)
+    assert sorted(member.user_id for member in members) == [1, 2, 3]
+
+
+def test_flagged_members_survive_generation_rotation():
+    index = RaidIndex(window=300, cluster_size=3, max_distance=3, min_length=16)
+    assert index.observe(message(1, SPAM), now=250) == []
+    assert index.observe(message(2, SPAM), now=260) == []
+    assert [m.user_id for m in index.observe(message(3, SPAM), now=270)] == [1, 2, 3]
+    # Новое поколение: 1–3 ещё в предыдущем и уже отданы на удаление
+    assert [m.user_id for m in index.observe(message(4, SPAM), now=310)] == [4]
+    # Ещё через поколение отметка 4 переехала вместе с его отпечатком
+    assert index.observe(message(5, SPAM), now=600) == []
+    assert [m.user_id for m in index.observe(message(6, SPAM), now=601)] == [5, 6]
+
+
+def test_shared_sticker_is_not_a_raid():
+    index = RaidIndex(window=300, cluster_size=3, max_distance=3, min_length=16)
+    sticker = {
+        "sticker": {
+            **file("hello-sticker"),
+            "type": "regular",
+            "width": 512,
+            "height": 512,
+            "is_animated": False,
+            "is_video": False,
+        }
+    }
+    photo = {"photo": [{**file("spam-photo"), "width": 90, "height": 90}]}
+    assert all(index.observe(message(user_id, **sticker), now=user_id) == [] for user_id in (1, 2, 3))
+    assert index.observe(message(4, **photo), now=4) == []
+    assert index.observe(message(5, **photo), now=5) == []
+    assert len(index.observe(message(6, **photo), now=6)) == 3
+
+
+def test_restrict_raid_cancels_pending_verification(monkeypatch):
+    monkeypatch.setattr(config, "IDEMPOTENCY_BACKEND", "memory")
+    banned = []
+
+    async def ban(bot, chat_id, user_id, pool, reason):
+        banned.append((user_id, reason))
+
+    async def flush_chat(chat_id):
+        pass
+
+    monkeypatch.setattr(raid_handlers, "ban_user_after_timeout", ban)
+    monkeypatch.setattr(raid_handlers.deletion_batcher, "flush_chat", flush_chat)
+
+    class FakeBot:
+        id = 1
+
+    bot = FakeBot()
+    dp = Dispatcher(storage=MemoryStorage())
+    index = RaidIndex(window=300, cluster_size=3, max_distance=3, min_length=16)
+
+    async def scenario():
+        # Пользователь 1 уже получил приглашение выбрать язык
+        state = dp.fsm.get_context(bot=bot, chat_id=CHAT_ID, user_id=1)
+        await state.set_state(UserState.waiting_for_language)
+        await state.update_data(lang_message_id=77, bot_messages=[77])
+        for user_id in (1, 2):
+            index.observe(message(user_id, SPAM), now=user_id)
+        members = index.observe(message(3, SPAM), now=3)
+        await raid_handlers.restrict_raid(dp, bot, None, CHAT_ID, members)
+        # Таймер выбора языка больше не может закрепить исход
+        return await state.get_state(), await claim_session(
+            None, language_session(CHAT_ID, 1, 77)
+        )
+
+    try:
+        assert asyncio.run(scenario()) == (None, False)
+    finally:
+        raid_handlers.deletion_batcher.pending.pop(CHAT_ID, None)
+    assert sorted(banned) == [(1, "raid"), (2, "raid"), (3, "raid")]
+
+
+def test_verified_members_without_state_are_not_fingerprinted(monkeypatch):
+    monkeypatch.setattr(config, "ALLOWED_CHAT_ID", CHAT_ID)
+    banned = []
+
+    async def ban(bot, chat_id, user_id, pool, reason):
+        banned.append((user_id, reason))
+
+    async def check_user_passed(pool, user_id, chat_id):
+        # Вердикт из БД: участники давно прошли проверку, но в кэше и FSM их нет
+        return True
+
+    index = RaidIndex(window=300, cluster_size=3, max_distance=3, min_length=16)
+    monkeypatch.setattr(raid_handlers, "ban_user_after_timeout", ban)
+    monkeypatch.setattr(language_handlers, "check_user_passed", check_user_passed)
+    monkeypatch.setattr(language_handlers, "raid_index", index)
+
+    class FakeBot:
+        id = 1
+
+    bot = FakeBot()
+    dp = Dispatcher(storage=MemoryStorage())
+
+    async def scenario():
+        for user_id in (1, 2, 3, 4):
+            state = dp.fsm.get_context(bot=bot, chat_id=CHAT_ID, user_id=user_id)
+            await message_handlers.message_handler(
+                message(user_id, SPAM), state, bot=bot, pool=None, dp=dp
+            )
+
+    asyncio.run(scenario())
+    assert banned == []
+    assert not index._current and not index._previous
+
+
+def test_unverified_newcomer_completes_raid_cluster(monkeypatch):
+    monkeypatch.setattr(config, "ALLOWED_CHAT_ID", CHAT_ID)
+    monkeypatch.setattr(config, "IDEMPOTENCY_BACKEND", "memory")
+    banned = []
+
+    async def ban(bot, chat_id, user_id, pool, reason):
+        banned.append((user_id, reason))
+
+    async def flush_chat(chat_id):
+        pass
+
+    async def check_user_passed(pool, user_id, chat_id):
+        return False
+
+    index = RaidIndex(window=300, cluster_size=3, max_distance=3, min_length=16)
+    monkeypatch.setattr(raid_handlers, "ban_user_after_timeout", ban)
+    monkeypatch.setattr(raid_handlers.deletion_batcher, "flush_chat", flush_chat)
+    monkeypatch.setattr(language_handlers, "check_user_passed", check_user_passed)
+    monkeypatch.setattr(language_handlers, "raid_index", index)
+
+    class FakeBot:
+        id = 1
+
+    bot = FakeBot()
+    dp = Dispatcher(storage=MemoryStorage())
+
+    async def scenario():
+        for user_id in (1, 2):
+            index.observe(message(user_id, SPAM))
+        state = dp.fsm.get_context(bot=bot, chat_id=CHAT_ID, user_id=3)
+        await message_handlers.message_handler(
+            message(3, SPAM), state, bot=bot, pool=None, dp=dp
+        )
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        raid_handlers.deletion_batcher.pending.pop(CHAT_ID, None)
+    assert sorted(banned) == [(1, "raid"), (2, "raid"), (3, "raid")]
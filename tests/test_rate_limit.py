@@ -0,0 +1,91 @@
+import asyncio
+
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter
+from aiogram.methods import DeleteMessages
+
+from utils.message_utils import DELETE_MESSAGES_LIMIT, DeletionBatcher
+from utils.rate_limit import SlidingWindowLimiter
+
+
+def test_sliding_window_weights_previous_window():
+    limiter = SlidingWindowLimiter(window=10, threshold=5, max_users=100, mute_duration=60)
+    for _ in range(6):
+        limiter.hit(-100, 1, now=5.0)
+    # Половина нового окна: вес прошлого окна 0.5, плюс текущее сообщение
+    assert limiter.hit(-100, 1, now=15.0) == 6 * 0.5 + 1
+    # Через окно без сообщений счётчики обнуляются
+    assert limiter.hit(-100, 1, now=40.0) == 1
+
+
+def test_over_limit_and_lru_eviction():
+    limiter = SlidingWindowLimiter(window=10, threshold=3, max_users=2, mute_duration=60)
+    assert not any(limiter.over_limit(-100, 1, now=1.0) for _ in range(3))
+    assert limiter.over_limit(-100, 1, now=1.0)
+    limiter.hit(-100, 2, now=1.0)
+    limiter.hit(-100, 3, now=1.0)
+    assert len(limiter) == 2
+    # Пользователь 1 вытеснен и начинает с нуля
+    assert limiter.hit(-100, 1, now=1.0) == 1
+
+
+def test_escalation_expires_after_mute():
+    limiter = SlidingWindowLimiter(window=10, threshold=3, max_users=100, mute_duration=60)
+    assert limiter.escalate(-100, 1, now=0.0)
+    assert not limiter.escalate(-100, 1, now=30.0)
+    assert limiter.is_escalated(-100, 1, now=59.0)
+    assert not limiter.is_escalated(-100, 1, now=60.0)
+    # После снятия мута повторный флуд снова ограничивается
+    assert limiter.escalate(-100, 1, now=61.0)
+    limiter.reset(-100, 1)
+    assert not limiter.is_escalated(-100, 1, now=61.0)
+
+
+class FlakyBot:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.deleted = []
+
+    async def delete_messages(self, chat_id, message_ids):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.deleted.append((chat_id, list(message_ids)))
+
+
+def test_batcher_requeues_on_retry_after():
+    method = DeleteMessages(chat_id=-100, message_ids=[1])
+    batcher = DeletionBatcher()
+    batcher.bot = FlakyBot([TelegramRetryAfter(method, "Flood control", 0)])
+    message_ids = list(range(DELETE_MESSAGES_LIMIT + 5))
+    for message_id in message_ids:
+        batcher.add(-100, message_id)
+
+    asyncio.run(batcher.flush())
+    assert batcher.pending[-100] == message_ids
+    asyncio.run(batcher.flush())
+    assert [batch for _, batch in batcher.bot.deleted] == [
+        message_ids[:DELETE_MESSAGES_LIMIT],
+        message_ids[DELETE_MESSAGES_LIMIT:],
+    ]
+
+
+def test_batcher_pauses_during_retry_after():
+    method = DeleteMessages(chat_id=-100, message_ids=[1])
+    batcher = DeletionBatcher()
+    batcher.bot = FlakyBot([TelegramRetryAfter(method, "Flood control", 30)])
+    batcher.add(-100, 1)
+    batcher.add(-200, 2)
+
+    asyncio.run(batcher.flush())
+    assert batcher.bot.deleted == []
+    assert batcher.pending[-100] == [1] and batcher.pending[-200] == [2]
+
+
+def test_batcher_survives_api_errors():
+    method = DeleteMessages(chat_id=-100, message_ids=[1])
+    batcher = DeletionBatcher()
+    batcher.bot = FlakyBot([TelegramNetworkError(method, "timeout")])
+    batcher.add(-100, 1)
+    batcher.add(-200, 2)
+
+    asyncio.run(batcher.flush())
+    assert batcher.bot.deleted == [(-200, [2])]
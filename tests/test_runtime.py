@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+import utils.runtime as runtime
+from config import Config, config
+
+
+def test_default_profile_uses_stdlib_json(monkeypatch):
+    monkeypatch.setattr(config, "RUNTIME_PROFILE", "default")
+    assert runtime.json_loads() is json.loads
+    assert runtime.json_dumps() is json.dumps
+
+
+def test_fast_profile_uses_orjson_when_installed(monkeypatch):
+    orjson = pytest.importorskip("orjson")
+    monkeypatch.setattr(config, "RUNTIME_PROFILE", "fast")
+    monkeypatch.setattr(runtime, "orjson", orjson)
+    assert runtime.json_loads() is orjson.loads
+    assert runtime.json_dumps()({"a": [1, "б"]}) == '{"a":[1,"б"]}'
+
+
+def test_fast_profile_falls_back_without_orjson(monkeypatch):
+    monkeypatch.setattr(config, "RUNTIME_PROFILE", "fast")
+    monkeypatch.setattr(runtime, "orjson", None)
+    assert runtime.json_loads() is json.loads
+    assert runtime.json_dumps() is json.dumps
+
+
+def test_unknown_profile_fails_validation():
+    fields = config.model_dump()
+    fields["RUNTIME_PROFILE"] = "fsat"
+    with pytest.raises(ValidationError):
+        Config(**fields)
+
+
+def test_parse_method_timeouts_skips_malformed_items():
+    assert runtime.parse_method_timeouts(" deleteMessage=5, sendPoll = 15 ,broken,=3,") == {
+        "deleteMessage": 5.0,
+        "sendPoll": 15.0,
+    }
+    assert runtime.parse_method_timeouts("") == {}
+
+
+def test_session_applies_method_timeouts(monkeypatch):
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.methods import DeleteMessage, GetUpdates, SendMessage
+
+    seen = []
+
+    async def make_request(self, bot, method, timeout=None):
+        seen.append((method.__api_method__, timeout))
+
+    monkeypatch.setattr(AiohttpSession, "make_request", make_request)
+    session = runtime.BotAPISession({"deleteMessage": 5, "getUpdates": 1})
+
+    async def scenario():
+        await session.make_request(None, DeleteMessage(chat_id=1, message_id=2))
+        await session.make_request(None, SendMessage(chat_id=1, text="x"))
+        # Явный таймаут long polling не перекрывается настройкой метода
+        await session.make_request(None, GetUpdates(), timeout=40)
+
+    asyncio.run(scenario())
+    assert seen == [("deleteMessage", 5), ("sendMessage", None), ("getUpdates", 40)]
@@ -0,0 +1,145 @@
+import asyncio
+
+import utils.scheduler as scheduler_module
+from utils.scheduler import Lane, UpdateScheduler
+
+
+def make_scheduler(concurrency=1, aging=60.0, messages_limit=10):
+    return UpdateScheduler(
+        concurrency,
+        aging,
+        [
+            Lane("answers", 0, 10),
+            Lane("joins", 1, 10),
+            Lane("messages", 2, messages_limit),
+        ],
+    )
+
+
+async def run_in_order(scheduler, event_types):
+    """Занимает единственный слот, ставит апдейты в очередь и возвращает порядок выдачи."""
+    order = []
+    gate = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot("message"):
+            await gate.wait()
+
+    async def worker(index, event_type):
+        async with scheduler.slot(event_type):
+            order.append(index)
+
+    held = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    workers = []
+    for index, event_type in enumerate(event_types):
+        workers.append(asyncio.create_task(worker(index, event_type)))
+        await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(held, *workers)
+    return order
+
+
+def test_answers_go_before_joins_and_messages():
+    scheduler = make_scheduler()
+    order = asyncio.run(
+        run_in_order(scheduler, ["message", "chat_member", "poll_answer", "callback_query"])
+    )
+    assert order == [2, 3, 1, 0]
+    assert scheduler.active == 0
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def test_aging_lets_old_messages_overtake(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler_module, "time", clock)
+    scheduler = make_scheduler(aging=1.0)
+
+    async def scenario():
+        order = []
+        gate = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot("message"):
+                await gate.wait()
+
+        async def worker(name, event_type):
+            async with scheduler.slot(event_type):
+                order.append(name)
+
+        held = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        old = asyncio.create_task(worker("old message", "message"))
+        await asyncio.sleep(0)
+        # Сообщение ждёт 5 с: ранг 2 - 5 ниже ранга свежего ответа
+        clock.now = 5.0
+        fresh = asyncio.create_task(worker("fresh answer", "poll_answer"))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(held, old, fresh)
+        return order
+
+    assert asyncio.run(scenario()) == ["old message", "fresh answer"]
+    assert scheduler.lanes["messages"].status()["wait_max_ms"] == 5000.0
+
+
+def test_lane_limit_leaves_room_for_other_lanes():
+    scheduler = make_scheduler(concurrency=4, messages_limit=2)
+
+    async def scenario():
+        gate = asyncio.Event()
+        peak = {"messages": 0}
+
+        async def message():
+            async with scheduler.slot("message"):
+                peak["messages"] = max(peak["messages"], scheduler.lanes["messages"].active)
+                await gate.wait()
+
+        messages = [asyncio.create_task(message()) for _ in range(5)]
+        await asyncio.sleep(0)
+        # Полоса сообщений исчерпала лимит, но ответ получает свободный слот сразу
+        async with scheduler.slot("poll_answer"):
+            answers_active = scheduler.lanes["answers"].active
+        assert scheduler.lanes["messages"].status()["queued"] == 3
+        gate.set()
+        await asyncio.gather(*messages)
+        return peak["messages"], answers_active
+
+    assert asyncio.run(scenario()) == (2, 1)
+    assert scheduler.active == 0
+    assert scheduler.lanes["messages"].processed == 5
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    scheduler = make_scheduler()
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot("message"):
+                await gate.wait()
+
+        async def waiter():
+            async with scheduler.slot("poll_answer"):
+                pass
+
+        held = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        gate.set()
+        await asyncio.gather(held, cancelled, return_exceptions=True)
+        async with scheduler.slot("message"):
+            return scheduler.active
+
+    assert asyncio.run(scenario()) == 1
+    assert scheduler.active == 0
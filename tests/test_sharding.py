@@ -0,0 +1,116 @@
+import asyncio
+import queue
+
+import utils.sharding as sharding
+from utils.sharding import ShardWorkers, shard_for, shard_key
+
+
+def test_group_and_pm_updates_of_user_share_key():
+    group = {"update_id": 1, "message": {"from": {"id": 42}, "chat": {"id": -100}}}
+    private = {"update_id": 2, "message": {"from": {"id": 42}, "chat": {"id": 42}}}
+    answer = {"update_id": 3, "poll_answer": {"poll_id": "p", "user": {"id": 42}}}
+    assert shard_key(group) == shard_key(private) == shard_key(answer) == 42
+
+
+def test_callback_uses_sender():
+    assert shard_key({"callback_query": {"from": {"id": 7}}}) == 7
+
+
+def test_chat_member_uses_new_member_not_admin():
+    # Админ 8 добавил участника 9: дальше в чате пишет участник 9
+    update = {
+        "chat_member": {
+            "from": {"id": 8},
+            "old_chat_member": {"status": "left", "user": {"id": 9}},
+            "new_chat_member": {"status": "member", "user": {"id": 9}},
+        }
+    }
+    assert shard_key(update) == 9
+    assert shard_key({"my_chat_member": {**update["chat_member"]}}) == 9
+
+
+def test_poll_close_is_broadcast():
+    assert shard_key({"update_id": 1, "poll": {"id": "p", "is_closed": True}}) is None
+
+
+def test_shard_for_is_stable_and_in_range():
+    for user_id in range(1000):
+        shard = shard_for(user_id, 4)
+        assert 0 <= shard < 4
+        assert shard == shard_for(user_id, 4)
+
+
+class FakeProcess:
+    def __init__(self) -> None:
+        self.alive = True
+        self.exitcode = None
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+
+class FakeQueue(queue.Queue):
+    def cancel_join_thread(self) -> None:
+        pass
+
+
+class FakeWorkers(ShardWorkers):
+    """Воркеры без процессов: очередь на две пачки, счётчик запусков."""
+
+    def start(self, shard):
+        self.queues[shard] = FakeQueue(2)
+        self.processes[shard] = FakeProcess()
+
+
+def message(update_id, user_id):
+    return {"update_id": update_id, "message": {"from": {"id": user_id}}}
+
+
+def test_dispatch_batches_per_shard_and_broadcasts():
+    shards = FakeWorkers(2)
+    for shard in range(2):
+        shards.start(shard)
+    poll = {"update_id": 3, "poll": {"id": "p"}}
+    asyncio.run(shards.dispatch([message(1, 10), message(2, 11), poll, message(4, 12)]))
+    assert shards.queues[0].get_nowait() == [message(1, 10), poll, message(4, 12)]
+    assert shards.queues[1].get_nowait() == [message(2, 11), poll]
+
+
+def test_full_queue_holds_ingress_until_worker_catches_up(monkeypatch):
+    monkeypatch.setattr(sharding, "BACKPRESSURE_DELAY", 0.01)
+    shards = FakeWorkers(1)
+    shards.start(0)
+
+    async def scenario():
+        for update_id in (1, 2):
+            await shards.dispatch([message(update_id, 1)])
+        blocked = asyncio.create_task(shards.dispatch([message(3, 1)]))
+        await asyncio.sleep(0.05)
+        waiting = not blocked.done()
+        shards.queues[0].get_nowait()
+        await asyncio.wait_for(blocked, 1)
+        return waiting
+
+    assert asyncio.run(scenario())
+    assert [shards.queues[0].get_nowait()[0]["update_id"] for _ in range(2)] == [2, 3]
+    assert shards.restarts == 0
+
+
+def test_dead_worker_is_restarted_with_fresh_queue(monkeypatch):
+    monkeypatch.setattr(sharding, "RESTART_BACKOFF", 0)
+    shards = FakeWorkers(1)
+    shards.start(0)
+
+    async def scenario():
+        for update_id in (1, 2):
+            await shards.dispatch([message(update_id, 1)])
+        stale = shards.queues[0]
+        shards.processes[0].alive = False
+        # Очередь полна, а читать её некому: ingress не ждёт вечно
+        await asyncio.wait_for(shards.dispatch([message(3, 1)]), 1)
+        return stale
+
+    stale = asyncio.run(scenario())
+    assert shards.restarts == 1
+    assert shards.queues[0] is not stale
+    assert shards.queues[0].get_nowait() == [message(3, 1)]
@@ -0,0 +1,40 @@
+from config import config
+from utils.signed_callback import InlineAnswer, answer_order, pack_answer, unpack_answer
+
+CHAT_ID = -100123
+
+
+def test_round_trip_fits_callback_data():
+    data = pack_answer(CHAT_ID, 2**40, 123456, "ru", 1_700_000_000, 3)
+    assert len(data.encode()) <= 64
+    assert unpack_answer(CHAT_ID, data) == InlineAnswer(2**40, 123456, "ru", 1_700_000_000, 3)
+
+
+def test_tampered_data_is_rejected():
+    data = pack_answer(CHAT_ID, 42, 7, "en", 1000, 1)
+    prefix, user_id, question_id, lang, issued, option, signature = data.split(":")
+    forged = [
+        ":".join((prefix, "43", question_id, lang, issued, option, signature)),
+        ":".join((prefix, user_id, question_id, lang, issued, "2", signature)),
+        ":".join((prefix, user_id, question_id, lang, issued, option, signature[:-1] + "A")),
+        data + ":1",
+        "xx" + data[2:],
+    ]
+    assert all(unpack_answer(CHAT_ID, item) is None for item in forged)
+    # Подпись привязана к чату: кнопку нельзя переслать в другую группу
+    assert unpack_answer(CHAT_ID - 1, data) is None
+
+
+def test_signature_depends_on_secret(monkeypatch):
+    data = pack_answer(CHAT_ID, 42, 7, "en", 1000, 1)
+    monkeypatch.setattr(config, "CALLBACK_SECRET", "rotated")
+    assert unpack_answer(CHAT_ID, data) is None
+
+
+def test_answer_order_is_deterministic_permutation():
+    order = answer_order(42, 7, 1000, 4)
+    assert sorted(order) == [0, 1, 2, 3]
+    assert answer_order(42, 7, 1000, 4) == order
+    # Разные выдачи перемешиваются по-разному
+    orders = {tuple(answer_order(42, 7, issued, 4)) for issued in range(50)}
+    assert len(orders) > 1
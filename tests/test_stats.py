@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timezone
+
+import bot as bot_module
+import utils.stats as stats_module
+from config import config
+from utils.stats import HOUR, MINUTE, VerificationStats, bucket_start
+
+NOON = datetime(2026, 1, 1, 12, 34, 56, tzinfo=timezone.utc).timestamp()
+
+
+def test_bucket_start_is_naive_utc_and_aligned():
+    assert bucket_start(NOON, MINUTE) == datetime(2026, 1, 1, 12, 34)
+    assert bucket_start(NOON, HOUR) == datetime(2026, 1, 1, 12, 0)
+    assert bucket_start(NOON, MINUTE).tzinfo is None
+
+
+def test_record_rolls_up_into_minute_and_hour():
+    stats = VerificationStats()
+    stats.record("passed", NOON)
+    stats.record("passed", NOON + 3)
+    stats.record("passed", NOON + 60)
+    stats.record("raid", NOON)
+    rows = sorted(stats.take_pending())
+    assert rows == [
+        (MINUTE, datetime(2026, 1, 1, 12, 34), "passed", 2),
+        (MINUTE, datetime(2026, 1, 1, 12, 34), "raid", 1),
+        (MINUTE, datetime(2026, 1, 1, 12, 35), "passed", 1),
+        (HOUR, datetime(2026, 1, 1, 12, 0), "passed", 3),
+        (HOUR, datetime(2026, 1, 1, 12, 0), "raid", 1),
+    ]
+    assert stats.take_pending() == []
+
+
+def test_summary_adds_unflushed_counts_to_db_rows(monkeypatch):
+    stats = VerificationStats()
+    stats.record("passed")
+    stats.record("raid")
+
+    async def load_verification_stats(pool, granularity, since):
+        return [("passed", 5)] if granularity == MINUTE else [("passed", 50), ("raid", 2)]
+
+    monkeypatch.setattr(stats_module, "load_verification_stats", load_verification_stats)
+    summary = asyncio.run(stats.summary(None))
+    assert summary["last_hour"]["passed"] == 6 and summary["last_hour"]["raid"] == 1
+    assert summary["last_day"]["passed"] == 51 and summary["last_day"]["raid"] == 3
+    assert summary["last_hour"]["incorrect"] == 0
+
+
+def test_failed_flush_restores_rows_for_next_attempt(monkeypatch):
+    stats = VerificationStats()
+    monkeypatch.setattr(bot_module, "verification_stats", stats)
+    monkeypatch.setattr(config, "STATS_FLUSH_INTERVAL", 0)
+    attempts = []
+
+    async def add_verification_stats(pool, rows):
+        attempts.append(sorted(rows))
+        if len(attempts) == 1:
+            # Пока запись падает, приходят новые исходы того же бакета
+            stats.record("passed", NOON)
+            raise OSError("connection lost")
+
+    monkeypatch.setattr(bot_module, "add_verification_stats", add_verification_stats)
+
+    async def scenario():
+        stats.record("passed", NOON)
+        task = asyncio.create_task(bot_module.verification_stats_task(None))
+        while len(attempts) < 2:
+            await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert attempts[0] == [
+        (MINUTE, datetime(2026, 1, 1, 12, 34), "passed", 1),
+        (HOUR, datetime(2026, 1, 1, 12, 0), "passed", 1),
+    ]
+    # Возвращённые строки сложились с новыми, ничего не потеряно
+    assert attempts[1] == [
+        (MINUTE, datetime(2026, 1, 1, 12, 34), "passed", 2),
+        (HOUR, datetime(2026, 1, 1, 12, 0), "passed", 2),
+    ]
+    assert stats.take_pending() == []
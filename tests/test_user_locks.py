@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from aiogram import Bot, F, types
+
+import bot as bot_module
+from config import config
+from utils.scheduler import Lane, UpdateScheduler
+
+
+def callback(update_id, user_id):
+    return types.Update.model_validate(
+        {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "chat_instance": "test",
+                "data": "slow",
+                "from": {"id": user_id, "is_bot": False, "first_name": "u"},
+                "message": {
+                    "message_id": 1,
+                    "date": int(time.time()),
+                    "chat": {"id": config.ALLOWED_CHAT_ID, "type": "supergroup"},
+                    "text": "x",
+                },
+            },
+        }
+    )
+
+
+def test_flooding_user_holds_one_slot_and_does_not_starve_others(monkeypatch):
+    scheduler = UpdateScheduler(
+        2, 60.0, [Lane("answers", 0, 2), Lane("joins", 1, 2), Lane("messages", 2, 2)]
+    )
+    monkeypatch.setattr(bot_module, "update_scheduler", scheduler)
+    bot = Bot(token=config.BOT_TOKEN)
+    dp = bot_module.build_dispatcher(bot, None)
+    handled = []
+    peak = {"active": 0}
+    gate = asyncio.Event()
+
+    async def slow(query: types.CallbackQuery) -> None:
+        peak["active"] = max(peak["active"], scheduler.active)
+        handled.append(query.from_user.id)
+        if query.from_user.id == 1:
+            await gate.wait()
+
+    dp.callback_query.register(slow, F.data == "slow")
+
+    async def scenario():
+        flood = [
+            asyncio.create_task(dp.feed_update(bot, callback(900000 + i, 1)))
+            for i in range(20)
+        ]
+        await asyncio.sleep(0.01)
+        # Флудер ждёт на своей блокировке и держит один слот из двух
+        busy = scheduler.active
+        await asyncio.wait_for(dp.feed_update(bot, callback(900100, 2)), 1)
+        gate.set()
+        await asyncio.gather(*flood)
+        return busy
+
+    assert asyncio.run(scenario()) == 1
+    assert handled.count(1) == 20 and 2 in handled
+    assert peak["active"] <= 2
+    assert scheduler.active == 0
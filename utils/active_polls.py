@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import config
+from database import (
+    PoolType,
+    add_active_poll,
+    get_active_poll,
+    remove_active_poll,
+)
+
+# Запас срока жизни записи сверх времени на ответ: закрытие опроса
+# приходит апдейтом poll чуть позже open_period
+TTL_MARGIN = 300
+
+
+class ActivePollCache:
+    """Активные опросы в памяти перед таблицей active_polls.
+
+    Отправленный опрос сразу попадает в кэш, а запись в БД выполняется
+    в фоне и не задерживает ответ пользователю. Чтение (PMMiddleware,
+    ответ на опрос, закрытие опроса) идёт в БД только при промахе —
+    например, после перезапуска. Удаление дожидается незавершённой
+    фоновой вставки, чтобы строка не осталась в таблице.
+    """
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        # poll_id -> (момент истечения по time.monotonic(), данные опроса)
+        self._polls: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._polls)
+
+    async def _insert(self, pool: PoolType, poll_id: str, poll_data: dict) -> None:
+        try:
+            await add_active_poll(
+                pool,
+                poll_id,
+                poll_data["user_id"],
+                poll_data["chat_id"],
+                poll_data["message_id"],
+                poll_data["thread_id"],
+            )
+        except Exception as e:
+            logging.error(f"Не удалось зарегистрировать опрос {poll_id} в БД: {e}")
+
+    def register(
+        self,
+        pool: PoolType,
+        poll_id: str,
+        user_id: int,
+        chat_id: int,
+        message_id: int,
+        thread_id: Optional[int],
+    ) -> None:
+        """Опрос доступен сразу; запись в БД уходит в фоновую задачу."""
+        poll_data = {
+            "user_id": user_id,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "thread_id": thread_id,
+        }
+        self._polls[poll_id] = (time.monotonic() + self.ttl, poll_data)
+        self._polls.move_to_end(poll_id)
+        if len(self._polls) > self.max_size:
+            self._polls.popitem(last=False)
+        task = asyncio.create_task(self._insert(pool, poll_id, poll_data))
+        self._pending[poll_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(poll_id, None))
+
+    async def get(self, pool: PoolType, poll_id: str) -> Optional[dict]:
+        """Данные опроса из кэша, при промахе — из БД."""
+        entry = self._polls.get(poll_id)
+        if entry is not None:
+            expires, poll_data = entry
+            if expires > time.monotonic():
+                return poll_data
+            del self._polls[poll_id]
+        return await get_active_poll(pool, poll_id)
+
+    async def remove(self, pool: PoolType, poll_id: str) -> None:
+        """Удаление опроса из кэша и из БД."""
+        self._polls.pop(poll_id, None)
+        task = self._pending.get(poll_id)
+        if task is not None:
+            await asyncio.wait([task])
+        await remove_active_poll(pool, poll_id)
+
+
+active_polls = ActivePollCache(
+    config.QUIZ_ANSWER_TIMEOUT + TTL_MARGIN, config.ACTIVE_POLL_CACHE_SIZE
+)
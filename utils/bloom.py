@@ -0,0 +1,266 @@
+import hashlib
+import logging
+import math
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+from config import config
+
+# Блокировка снапшота между процессами; без fcntl (Windows) снапшот
+# должен писать один процесс
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Заголовок снапшота: сигнатура, размер в битах, число хэш-функций
+_HEADER = struct.Struct("<8sQI")
+_MAGIC = b"DBBLOOM1"
+
+
+class BloomFilter:
+    """Фильтр Блума для ключей (chat_id, user_id).
+
+    Отрицательный ответ точный: ключ гарантированно не добавлялся.
+    Положительный ответ может быть ложным с вероятностью error_rate.
+    Удаление не поддерживается: удалённые ключи дают ложноположительные
+    ответы до следующей перестройки фильтра.
+    """
+
+    def __init__(self, size_bits: int, hashes: int) -> None:
+        self.size_bits = size_bits
+        self.hashes = hashes
+        self.bits = bytearray((size_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float) -> "BloomFilter":
+        """Подбор размера и числа хэшей под ожидаемое число ключей."""
+        size_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        hashes = max(1, round(size_bits / capacity * math.log(2)))
+        return cls(size_bits, hashes)
+
+    def _positions(self, chat_id: int, user_id: int) -> Iterable[int]:
+        digest = hashlib.blake2b(
+            struct.pack("<qq", chat_id, user_id), digest_size=16
+        ).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        h2 |= 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hashes))
+
+    def add(self, chat_id: int, user_id: int) -> None:
+        for position in self._positions(chat_id, user_id):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, chat_id: int, user_id: int) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(chat_id, user_id)
+        )
+
+    def merge(self, other: "BloomFilter") -> None:
+        """Объединение (OR) с фильтром тех же параметров."""
+        if (other.size_bits, other.hashes) != (self.size_bits, self.hashes):
+            raise ValueError("Нельзя объединить фильтры с разными параметрами")
+        merged = int.from_bytes(self.bits, "little") | int.from_bytes(other.bits, "little")
+        self.bits = bytearray(merged.to_bytes(len(self.bits), "little"))
+
+    def save(self, path: str) -> None:
+        """Атомарная запись снапшота на диск."""
+        # Уникальный временный файл: шарды и whitelist.py пишут снапшот
+        # одновременно и не должны подменять чужой недописанный файл
+        f = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path) or ".", prefix=".bloom-", delete=False
+        )
+        try:
+            with f:
+                f.write(_HEADER.pack(_MAGIC, self.size_bits, self.hashes))
+                f.write(self.bits)
+            os.replace(f.name, path)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BloomFilter"]:
+        """Чтение снапшота; None, если файла нет или он повреждён."""
+        try:
+            with open(path, "rb") as f:
+                magic, size_bits, hashes = _HEADER.unpack(f.read(_HEADER.size))
+                bits = f.read()
+        except (OSError, struct.error):
+            return None
+        if magic != _MAGIC or len(bits) != (size_bits + 7) // 8:
+            return None
+        bloom = cls(size_bits, hashes)
+        bloom.bits = bytearray(bits)
+        return bloom
+
+
+@contextmanager
+def snapshot_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """Исключительная блокировка снапшота на время чтения-слияния-записи.
+
+    Без неё два процесса, одновременно подмешавшие снапшот, перезаписали бы
+    биты друг друга. Возвращает False, если blocking=False и блокировку
+    держит другой процесс.
+    """
+    if fcntl is None:
+        yield True
+        return
+    with open(f"{path}.lock", "a") as lock_file:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(lock_file, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class PassedUsersFilter:
+    """Фильтр Блума по passed_users со снапшотом на диске.
+
+    Отрицательный ответ готового фильтра окончателен: пользователь не
+    проходил проверку, и БД не запрашивается. Поэтому каждая запись в
+    passed_users доходит до фильтра: отметки этого процесса — сразу,
+    импорт whitelist.py и другие шарды или реплики — через общий снапшот,
+    который подмешивается перед отрицательным ответом, ручные вставки —
+    при перестройке раз в BLOOM_REBUILD_INTERVAL. До загрузки
+    (ready=False) фильтр отрицательных ответов не даёт.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, snapshot_path: str) -> None:
+        self.bloom = BloomFilter.for_capacity(capacity, error_rate)
+        self.snapshot_path = snapshot_path
+        self.ready = False
+        self._rebuilt_at = 0.0
+        self._snapshot_mtime = 0.0
+        self._rebuilding: Optional[BloomFilter] = None
+        # Есть ли ключи, ещё не записанные в снапшот
+        self.dirty = False
+
+    def definitely_absent(self, chat_id: int, user_id: int) -> bool:
+        """True, если пользователь точно не проходил проверку.
+
+        Перед отрицательным ответом подмешивается снапшот, если его обновил
+        другой процесс: при неизменном файле это один вызов stat.
+        """
+        if not self.ready or self.bloom.might_contain(chat_id, user_id):
+            return False
+        return not (self.merge_snapshot() and self.bloom.might_contain(chat_id, user_id))
+
+    def add(self, chat_id: int, user_id: int) -> None:
+        self.bloom.add(chat_id, user_id)
+        if self._rebuilding is not None:
+            self._rebuilding.add(chat_id, user_id)
+        self.dirty = True
+
+    def needs_rebuild(self) -> bool:
+        """Пора ли перестроить фильтр из таблицы (убрать следы удалений и ручных правок)."""
+        return (
+            not self.ready
+            or time.monotonic() - self._rebuilt_at >= config.BLOOM_REBUILD_INTERVAL
+        )
+
+    def begin_rebuild(self) -> BloomFilter:
+        """Новый пустой фильтр; добавления во время перестройки попадут и в него."""
+        self._rebuilding = BloomFilter(self.bloom.size_bits, self.bloom.hashes)
+        return self._rebuilding
+
+    def finish_rebuild(self) -> None:
+        """Подменяет фильтр перестроенным и сохраняет снапшот."""
+        if self._rebuilding is None:
+            return
+        self.bloom, self._rebuilding = self._rebuilding, None
+        self._rebuilt_at = time.monotonic()
+        self.ready = True
+        self.dirty = True
+        self.save_snapshot()
+
+    def load_snapshot(self) -> bool:
+        """Загрузка снапшота с диска; True, если он подошёл и не устарел."""
+        snapshot = BloomFilter.load(self.snapshot_path)
+        if snapshot is None:
+            return False
+        if (snapshot.size_bits, snapshot.hashes) != (
+            self.bloom.size_bits,
+            self.bloom.hashes,
+        ):
+            logging.warning("Снапшот фильтра создан с другими параметрами")
+            return False
+        mtime = os.path.getmtime(self.snapshot_path)
+        age = time.time() - mtime
+        if age >= config.BLOOM_REBUILD_INTERVAL:
+            return False
+        self.bloom.merge(snapshot)
+        self._snapshot_mtime = mtime
+        # Возраст снапшота засчитывается в интервал перестройки
+        self._rebuilt_at = time.monotonic() - age
+        self.ready = True
+        return True
+
+    def merge_snapshot(self) -> bool:
+        """Подмешивает снапшот, обновлённый другим процессом; True, если он был новее.
+
+        Так ключи, добавленные whitelist.py или другими шардами, попадают
+        в работающий фильтр без перестройки из таблицы.
+        """
+        try:
+            mtime = os.path.getmtime(self.snapshot_path)
+        except OSError:
+            return False
+        if mtime <= self._snapshot_mtime:
+            return False
+        snapshot = BloomFilter.load(self.snapshot_path)
+        if snapshot is None:
+            return False
+        try:
+            self.bloom.merge(snapshot)
+            # Перестраиваемый фильтр тоже получает чужие ключи: после
+            # подмены этот снапшот уже не будет считаться новым
+            if self._rebuilding is not None:
+                self._rebuilding.merge(snapshot)
+        except ValueError:
+            return False
+        self._snapshot_mtime = mtime
+        return True
+
+    def save_snapshot(self) -> bool:
+        """Подмешивает чужие изменения снапшота и сохраняет фильтр.
+
+        Event loop не ждёт блокировку: если снапшот сейчас пишет другой
+        процесс или запись не удалась, ключи остаются несохранёнными до
+        следующего sync().
+        """
+        try:
+            with snapshot_lock(self.snapshot_path, blocking=False) as locked:
+                if not locked:
+                    return False
+                self.merge_snapshot()
+                self.dirty = False
+                self.bloom.save(self.snapshot_path)
+                self._snapshot_mtime = os.path.getmtime(self.snapshot_path)
+        except OSError as e:
+            self.dirty = True
+            logging.warning(f"Не удалось сохранить снапшот фильтра: {e}")
+            return False
+        return True
+
+    def sync(self) -> None:
+        """Обмен ключами с другими процессами через снапшот."""
+        if self.dirty:
+            self.save_snapshot()
+        else:
+            self.merge_snapshot()
+
+
+passed_filter = PassedUsersFilter(
+    config.BLOOM_CAPACITY, config.BLOOM_ERROR_RATE, config.BLOOM_SNAPSHOT_PATH
+)
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple
+
+from aiohttp import web
+
+from config import config
+from utils.runtime import json_dumps
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Отложенная запись: (функция, позиционные аргументы, именованные аргументы)
+QueuedWrite = Tuple[Callable[..., Awaitable[Any]], tuple, Dict[str, Any]]
+
+
+class DatabaseUnavailable(Exception):
+    """БД не отвечает: запрос не выполнялся или прерван по таймауту."""
+
+
+def _outage_errors() -> Tuple[type, ...]:
+    """Исключения, означающие недоступность БД, а не ошибку в запросе."""
+    errors: Tuple[type, ...] = (asyncio.TimeoutError, OSError)
+    if config.DB_TYPE == "postgres":
+        import asyncpg
+
+        errors += (asyncpg.PostgresConnectionError, asyncpg.InterfaceError)
+    elif config.DB_TYPE == "mysql":
+        import pymysql
+
+        errors += (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+    return errors
+
+
+class CircuitBreaker:
+    """Автомат защиты для обращений к БД.
+
+    closed — запросы идут в БД с таймаутом DB_TIMEOUT; после
+    DB_BREAKER_THRESHOLD сбоев подряд автомат размыкается.
+    open — запросы сразу получают DatabaseUnavailable, записи копятся в
+    очереди. Через DB_BREAKER_RESET секунд один запрос пропускается
+    пробным (half_open): успех замыкает автомат и запускает досылку
+    очереди, сбой снова размыкает.
+    """
+
+    def __init__(
+        self, threshold: int, reset_timeout: float, call_timeout: float, queue_size: int
+    ) -> None:
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.writes: Deque[QueuedWrite] = deque(maxlen=queue_size)
+        self.dropped_writes = 0
+        self.degraded_decisions: Counter = Counter()
+        self._errors: Tuple[type, ...] = ()
+        self._replaying = False
+
+    @property
+    def is_degraded(self) -> bool:
+        """Работаем ли без БД (автомат разомкнут или идёт пробный запрос)."""
+        return self.state != CLOSED
+
+    def record_degraded(self, decision: str) -> None:
+        """Учёт решения, принятого без БД."""
+        self.degraded_decisions[decision] += 1
+
+    def _allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        elapsed = time.monotonic() - self.opened_at
+        if self.state == OPEN and elapsed >= self.reset_timeout:
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def _on_success(self) -> None:
+        self.failures = 0
+        if self.state != CLOSED:
+            self.state = CLOSED
+            logging.info("База данных снова доступна, автомат замкнут")
+            if self.writes and not self._replaying:
+                asyncio.create_task(self._replay())
+
+    def _on_failure(self, error: BaseException) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            if self.state != OPEN:
+                logging.warning(f"База данных недоступна, автомат разомкнут: {error!r}")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Выполняет обращение к БД через автомат."""
+        if not self._errors:
+            self._errors = _outage_errors()
+        if not self._allow():
+            raise DatabaseUnavailable("circuit open")
+        try:
+            result = await asyncio.wait_for(func(*args, **kwargs), self.call_timeout)
+        except self._errors as e:
+            self._on_failure(e)
+            raise DatabaseUnavailable(repr(e)) from e
+        except BaseException:
+            # Ошибка в самом запросе не говорит о недоступности БД
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            raise
+        self._on_success()
+        return result
+
+    def queue_write(
+        self, func: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict
+    ) -> None:
+        """Откладывает запись до восстановления БД; при переполнении теряются старые."""
+        if len(self.writes) == self.writes.maxlen:
+            self.dropped_writes += 1
+        self.writes.append((func, args, kwargs))
+        self.record_degraded("write_queued")
+
+    async def _replay(self) -> None:
+        """Досылка отложенных записей по порядку; при новом сбое остаток ждёт."""
+        self._replaying = True
+        replayed = 0
+        try:
+            while self.writes:
+                func, args, kwargs = self.writes[0]
+                try:
+                    await self.call(func, *args, **kwargs)
+                except DatabaseUnavailable:
+                    break
+                except Exception as e:
+                    logging.error(f"Отложенная запись {func.__name__} не выполнена: {e}")
+                self.writes.popleft()
+                replayed += 1
+        finally:
+            self._replaying = False
+        logging.info(f"Replayed queued writes: {replayed}, left: {len(self.writes)}")
+
+    def status(self) -> Dict[str, Any]:
+        """Состояние автомата для HTTP API."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "queued_writes": len(self.writes),
+            "dropped_writes": self.dropped_writes,
+            "degraded_decisions": dict(self.degraded_decisions),
+        }
+
+
+db_breaker = CircuitBreaker(
+    config.DB_BREAKER_THRESHOLD,
+    config.DB_BREAKER_RESET,
+    config.DB_TIMEOUT,
+    config.DB_WRITE_QUEUE_SIZE,
+)
+
+
+async def breaker_view(request: web.Request) -> web.Response:
+    """HTTP-обработчик GET /db: состояние автомата и счётчик решений без БД."""
+    return web.json_response(db_breaker.status(), dumps=json_dumps())
@@ -0,0 +1,111 @@
+import logging
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+from aiohttp import web
+
+from config import config
+from database import PoolType, append_verification_events, query_verification_events
+from utils.runtime import json_dumps
+
+# Событие: (created_at, chat_id, user_id, event, detail)
+EventRow = Tuple[datetime, Optional[int], int, str, Optional[str]]
+
+
+def utc_now() -> datetime:
+    """Текущее время в UTC (naive, как в столбце TIMESTAMP)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class EventLog:
+    """Журнал событий проверки с буфером в памяти и пакетной записью.
+
+    emit() только добавляет запись в кольцевой буфер и не ждёт БД; запись
+    выполняет фоновая задача пачками. При переполнении буфера (например,
+    пока БД недоступна) вытесняются самые старые события.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.buffer: Deque[EventRow] = deque(maxlen=max_size)
+        self.dropped = 0
+
+    def emit(
+        self,
+        event: str,
+        user_id: int,
+        chat_id: Optional[int] = None,
+        detail: Optional[str] = None,
+    ) -> None:
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(
+            (utc_now(), chat_id, user_id, event, None if detail is None else str(detail))
+        )
+
+    def take(self) -> List[EventRow]:
+        """Забирает все накопленные события."""
+        rows = list(self.buffer)
+        self.buffer.clear()
+        return rows
+
+    def restore(self, rows: List[EventRow]) -> None:
+        """Возвращает в начало буфера события, которые не удалось записать."""
+        free = self.buffer.maxlen - len(self.buffer)
+        if len(rows) > free:
+            self.dropped += len(rows) - free
+            rows = rows[len(rows) - free :] if free else []
+        self.buffer.extendleft(reversed(rows))
+
+    async def flush(self, pool: PoolType) -> None:
+        """Запись накопленных событий одной пачкой."""
+        rows = self.take()
+        if self.dropped:
+            logging.warning(f"Event buffer overflow: {self.dropped} events dropped")
+            self.dropped = 0
+        if not rows:
+            return
+        try:
+            await append_verification_events(pool, rows)
+        except Exception as e:
+            logging.error(f"Не удалось записать журнал событий: {e}")
+            self.restore(rows)
+
+
+def _parse_time(value: Optional[str], default: datetime) -> datetime:
+    if not value:
+        return default
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def events_view(pool: PoolType) -> Callable[[web.Request], Awaitable[web.Response]]:
+    """HTTP-обработчик GET /events?user_id=...&since=...&until=... (ISO 8601, UTC)."""
+
+    async def handler(request: web.Request) -> web.Response:
+        try:
+            user_id = int(request.query["user_id"])
+            until = _parse_time(request.query.get("until"), utc_now())
+            since = _parse_time(request.query.get("since"), until - timedelta(days=1))
+            limit = min(int(request.query.get("limit", 100)), 1000)
+        except (KeyError, ValueError) as e:
+            raise web.HTTPBadRequest(text=f"Invalid query: {e}")
+        rows = await query_verification_events(pool, user_id, since, until, limit)
+        events = [
+            {
+                "created_at": created_at.isoformat(),
+                "chat_id": chat_id,
+                "user_id": row_user_id,
+                "event": event,
+                "detail": detail,
+            }
+            for created_at, chat_id, row_user_id, event, detail in rows
+        ]
+        return web.json_response(events, dumps=json_dumps())
+
+    return handler
+
+
+event_log = EventLog(config.EVENT_BUFFER_SIZE)
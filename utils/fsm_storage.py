@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional, Set
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorageRecord
+from aiohttp import web
+
+from utils.runtime import json_dumps
+
+# Число ячеек колеса: при шаге в секунду час TTL укладывается в один оборот
+WHEEL_SLOTS = 4096
+
+
+class TTLMemoryStorage(BaseStorage):
+    """FSM-хранилище в памяти с вытеснением записей по TTL.
+
+    В отличие от MemoryStorage, чтение не создаёт записей, а запись без
+    состояния и данных удаляется сразу. Каждая запись при изменении
+    получает срок жизни: ttl для идущей проверки и finished_ttl для
+    завершённых состояний. Сроки хранятся в хешированном колесе таймеров:
+    перенос ключа между ячейками и обработка ячейки на тике — O(1) на запись.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        finished_ttl: float,
+        finished_states: Collection[State] = (),
+        tick: float = 1.0,
+        slots: int = WHEEL_SLOTS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.finished_ttl = finished_ttl
+        self.finished_states = {state.state for state in finished_states}
+        self.tick = tick
+        self.clock = clock
+        self.records: Dict[StorageKey, MemoryStorageRecord] = {}
+        # Ключ -> номер тика, на котором запись истекает
+        self._expires: Dict[StorageKey, int] = {}
+        self._wheel: List[Set[StorageKey]] = [set() for _ in range(slots)]
+        self._current = self._now_tick()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _now_tick(self, now: Optional[float] = None) -> int:
+        return int((self.clock() if now is None else now) // self.tick)
+
+    def _slot(self, tick: int) -> Set[StorageKey]:
+        return self._wheel[tick % len(self._wheel)]
+
+    def _forget(self, key: StorageKey) -> None:
+        self.records.pop(key, None)
+        expires = self._expires.pop(key, None)
+        if expires is not None:
+            self._slot(expires).discard(key)
+
+    def _touch(self, key: StorageKey, record: MemoryStorageRecord) -> None:
+        """Сохраняет запись и переносит её срок жизни."""
+        if record.state is None and not record.data:
+            self._forget(key)
+            return
+        self.records[key] = record
+        ttl = self.finished_ttl if record.state in self.finished_states else self.ttl
+        expires = self._now_tick() + max(1, math.ceil(ttl / self.tick))
+        previous = self._expires.get(key)
+        if previous is not None:
+            self._slot(previous).discard(key)
+        self._expires[key] = expires
+        self._slot(expires).add(key)
+
+    async def close(self) -> None:
+        self.records.clear()
+        self._expires.clear()
+        for slot in self._wheel:
+            slot.clear()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = self.records.get(key) or MemoryStorageRecord()
+        record.state = state.state if isinstance(state, State) else state
+        self._touch(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self.records.get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = self.records.get(key) or MemoryStorageRecord()
+        record.data = data.copy()
+        self._touch(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self.records.get(key)
+        return record.data.copy() if record else {}
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Обработка тиков до текущего момента; возвращает число вытесненных записей."""
+        target = self._now_tick(now)
+        # После долгой паузы достаточно одного оборота колеса
+        start = max(self._current + 1, target - len(self._wheel) + 1)
+        evicted = 0
+        for tick in range(start, target + 1):
+            slot = self._slot(tick)
+            # В ячейке могут лежать записи следующих оборотов — их не трогаем
+            expired = [key for key in slot if self._expires[key] <= target]
+            for key in expired:
+                self._forget(key)
+            evicted += len(expired)
+        self._current = max(self._current, target)
+        self.evicted += evicted
+        return evicted
+
+    async def run(self) -> None:
+        """Фоновое вытеснение истёкших записей раз в тик."""
+        while True:
+            await asyncio.sleep(self.tick)
+            evicted = self.advance()
+            if evicted:
+                logging.debug(f"FSM entries evicted: {evicted}, live: {len(self)}")
+
+    def status(self) -> Dict[str, Any]:
+        """Число живых записей и вытесненных с запуска."""
+        return {"live_entries": len(self), "evicted": self.evicted}
+
+
+def fsm_view(
+    storage: TTLMemoryStorage,
+) -> Callable[[web.Request], Awaitable[web.Response]]:
+    """HTTP-обработчик GET /fsm."""
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.json_response(storage.status(), dumps=json_dumps())
+
+    return handler
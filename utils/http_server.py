@@ -0,0 +1,40 @@
+import hmac
+import logging
+from typing import Awaitable, Callable, Iterable, Optional, Tuple
+
+from aiohttp import web
+
+from config import config
+from utils.circuit_breaker import DatabaseUnavailable
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+# Маршрут: (HTTP-метод, путь, обработчик)
+Route = Tuple[str, str, Handler]
+
+
+@web.middleware
+async def _auth_middleware(request: web.Request, handler: Handler) -> web.StreamResponse:
+    """Проверка токена Bearer, если задан HTTP_TOKEN."""
+    if config.HTTP_TOKEN:
+        expected = f"Bearer {config.HTTP_TOKEN}"
+        provided = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(provided.encode(), expected.encode()):
+            raise web.HTTPUnauthorized()
+    try:
+        return await handler(request)
+    except DatabaseUnavailable as e:
+        raise web.HTTPServiceUnavailable(text=f"Database unavailable: {e}")
+
+
+async def start_http_server(routes: Iterable[Route]) -> Optional[web.AppRunner]:
+    """Запуск служебного HTTP API; None, если HTTP_PORT не задан."""
+    if not config.HTTP_PORT:
+        return None
+    app = web.Application(middlewares=[_auth_middleware])
+    for method, path, handler in routes:
+        app.router.add_route(method, path, handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, config.HTTP_HOST, config.HTTP_PORT).start()
+    logging.info(f"HTTP API listening on {config.HTTP_HOST}:{config.HTTP_PORT}")
+    return runner
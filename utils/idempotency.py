@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Set
+
+from config import config
+from database import (
+    PoolType,
+    claim_idempotency_key,
+    release_idempotency_key,
+)
+from utils.circuit_breaker import DatabaseUnavailable, db_breaker
+
+
+class RecentUpdates:
+    """Последние update_id: кольцевой буфер фиксированного размера и множество."""
+
+    def __init__(self, size: int) -> None:
+        self._ring: Deque[int] = deque(maxlen=size)
+        self._ids: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def seen(self, update_id: int) -> bool:
+        """Запоминает update_id; True, если он уже встречался."""
+        if update_id in self._ids:
+            return True
+        if len(self._ring) == self._ring.maxlen:
+            self._ids.discard(self._ring[0])
+        self._ring.append(update_id)
+        self._ids.add(update_id)
+        return False
+
+
+class IdempotencyGuard:
+    """Ключи побочных операций (приглашение к проверке, исход проверки).
+
+    Операция выполняется, только если её ключ удалось захватить. Ключи
+    живут ttl секунд в памяти процесса; при IDEMPOTENCY_BACKEND=db ключ
+    дополнительно захватывается в таблице idempotency_keys, общей для
+    всех реплик. Если БД недоступна, решает локальный захват.
+    """
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        # Ключ -> момент истечения по time.monotonic()
+        self._keys: "OrderedDict[str, float]" = OrderedDict()
+
+    def _claim_local(self, key: str, ttl: float) -> bool:
+        now = time.monotonic()
+        expires = self._keys.get(key)
+        if expires is not None and expires > now:
+            return False
+        self._keys[key] = now + ttl
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+        return True
+
+    async def claim(self, pool: PoolType, key: str, ttl: float) -> bool:
+        """Захват ключа; False, если операция уже выполнена здесь или на другой реплике."""
+        if not self._claim_local(key, ttl):
+            return False
+        if config.IDEMPOTENCY_BACKEND != "db":
+            return True
+        try:
+            return await claim_idempotency_key(pool, key, ttl)
+        except DatabaseUnavailable:
+            db_breaker.record_degraded("idempotency_local")
+            return True
+
+    async def release(self, pool: PoolType, key: str) -> None:
+        """Освобождение ключа, чтобы операцию можно было выполнить снова.
+
+        Без БД удаление не откладывается в очередь записей: досланное после
+        восстановления, оно снимет ключ, который тем временем мог захватить
+        кто-то другой. Строка в БД истечёт сама по TTL.
+        """
+        self._keys.pop(key, None)
+        if config.IDEMPOTENCY_BACKEND != "db":
+            return
+        if db_breaker.is_degraded:
+            db_breaker.record_degraded("idempotency_release_skipped")
+            return
+        await release_idempotency_key(pool, key)
+
+
+recent_updates = RecentUpdates(config.UPDATE_DEDUP_SIZE)
+idempotency = IdempotencyGuard(config.IDEMPOTENCY_MAX_KEYS)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import socket
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiohttp import web
+
+from config import config
+from database import PoolType
+from utils.circuit_breaker import db_breaker
+from utils.runtime import json_dumps
+
+LEASE_NAME = "maintenance"
+# Ключ advisory lock в PostgreSQL: байты "defender" как BIGINT
+_PG_LOCK_KEY = int.from_bytes(b"defender", "big")
+_MYSQL_LOCK_NAME = "defender_bot_maintenance"
+
+
+def default_node_id() -> str:
+    """Идентификатор узла: NODE_ID или хост и PID процесса."""
+    return config.NODE_ID or f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaderElector:
+    """Выбор ведущего узла для фоновых задач, которые должны идти в одном экземпляре.
+
+    Лидерство — это сессионная блокировка в БД (pg_try_advisory_lock или
+    GET_LOCK) на отдельном удерживаемом соединении: при падении узла или
+    обрыве соединения БД снимает её сама, и другой узел перехватывает
+    лидерство на следующей попытке. Лидер каждые LEADER_RENEW_INTERVAL
+    секунд продлевает строку в leader_lease — она же проверяет соединение
+    и показывает, кто ведёт.
+    """
+
+    def __init__(self, pool: PoolType, node_id: str) -> None:
+        self.pool = pool
+        self.node_id = node_id
+        self.is_leader = False
+        self._conn: Any = None
+
+    async def _execute(self, query: str, *args) -> Any:
+        """Запрос на удерживаемом соединении; возвращает первое поле первой строки."""
+        if config.DB_TYPE == "postgres":
+            return await self._conn.fetchval(query, *args)
+        async with self._conn.cursor() as cur:
+            await cur.execute(query, args)
+            row = await cur.fetchone()
+            return row[0] if row else None
+
+    async def _try_acquire(self) -> bool:
+        self._conn = await self.pool.acquire()
+        if config.DB_TYPE == "postgres":
+            locked = await self._execute("SELECT pg_try_advisory_lock($1)", _PG_LOCK_KEY)
+        else:
+            locked = await self._execute("SELECT GET_LOCK(%s, 0)", _MYSQL_LOCK_NAME) == 1
+        if not locked:
+            await self._release()
+        return bool(locked)
+
+    async def _renew(self) -> None:
+        if config.DB_TYPE == "postgres":
+            await self._execute(
+                """
+                INSERT INTO leader_lease (name, node_id, acquired_at, renewed_at)
+                VALUES ($1, $2, NOW(), NOW())
+                ON CONFLICT (name) DO UPDATE SET
+                    acquired_at = CASE WHEN leader_lease.node_id = EXCLUDED.node_id
+                        THEN leader_lease.acquired_at ELSE EXCLUDED.acquired_at END,
+                    node_id = EXCLUDED.node_id,
+                    renewed_at = EXCLUDED.renewed_at
+                """,
+                LEASE_NAME,
+                self.node_id,
+            )
+        else:
+            # В MySQL присваивания выполняются по порядку: acquired_at
+            # сравнивается со старым node_id
+            await self._execute(
+                """
+                INSERT INTO leader_lease (name, node_id, acquired_at, renewed_at)
+                VALUES (%s, %s, NOW(), NOW())
+                ON DUPLICATE KEY UPDATE
+                    acquired_at = IF(node_id = VALUES(node_id), acquired_at, VALUES(acquired_at)),
+                    node_id = VALUES(node_id),
+                    renewed_at = VALUES(renewed_at)
+                """,
+                LEASE_NAME,
+                self.node_id,
+            )
+
+    async def _release(self, broken: bool = False) -> None:
+        """Возврат соединения в пул; оборванное закрывается вместе с блокировкой."""
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if broken:
+                if config.DB_TYPE == "postgres":
+                    conn.terminate()
+                else:
+                    conn.close()
+            await self.pool.release(conn)
+        except Exception as e:
+            logging.warning(f"Не удалось вернуть соединение лидера в пул: {e}")
+
+    async def _step(self) -> None:
+        if not self.is_leader:
+            if not await self._try_acquire():
+                return
+            self.is_leader = True
+            logging.info(f"Узел {self.node_id} стал лидером")
+        await self._renew()
+
+    async def run(self) -> None:
+        """Цикл захвата и продления лидерства."""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._step(), config.DB_TIMEOUT)
+                except Exception as e:
+                    if self.is_leader:
+                        logging.warning(f"Узел {self.node_id} потерял лидерство: {e}")
+                    self.is_leader = False
+                    await self._release(broken=True)
+                await asyncio.sleep(config.LEADER_RENEW_INTERVAL)
+        finally:
+            # Закрытие соединения снимает блокировку: резервный узел
+            # перехватит лидерство, не дожидаясь таймаутов
+            self.is_leader = False
+            await self._release(broken=True)
+
+    async def _fetch_lease(self) -> Optional[tuple]:
+        if config.DB_TYPE == "postgres":
+            async with self.pool.acquire() as conn:
+                row = await conn.fetchrow(
+                    "SELECT node_id, acquired_at, renewed_at, "
+                    "EXTRACT(EPOCH FROM NOW() - renewed_at) AS age "
+                    "FROM leader_lease WHERE name = $1",
+                    LEASE_NAME,
+                )
+                row = tuple(row) if row else None
+        elif config.DB_TYPE == "mysql":
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        "SELECT node_id, acquired_at, renewed_at, "
+                        "TIMESTAMPDIFF(SECOND, renewed_at, NOW()) "
+                        "FROM leader_lease WHERE name = %s",
+                        (LEASE_NAME,),
+                    )
+                    row = await cur.fetchone()
+        return row
+
+    async def status(self) -> Dict[str, Any]:
+        """Кто ведёт по данным leader_lease и давно ли продлевал аренду.
+
+        Чтение идёт через db_breaker: при недоступной БД — DatabaseUnavailable
+        (HTTP 503), а не зависший запрос.
+        """
+        row = await db_breaker.call(self._fetch_lease)
+        leader: Optional[Dict[str, Any]] = None
+        if row:
+            node_id, acquired_at, renewed_at, age = row
+            leader = {
+                "node_id": node_id,
+                "acquired_at": acquired_at.isoformat(),
+                "renewed_at": renewed_at.isoformat(),
+                "lease_age": float(age),
+                # Аренда без продления дольше трёх интервалов — лидер, скорее всего, упал
+                "stale": float(age) > 3 * config.LEADER_RENEW_INTERVAL,
+            }
+        return {"node_id": self.node_id, "is_leader": self.is_leader, "leader": leader}
+
+
+def leader_view(
+    elector: LeaderElector,
+) -> Callable[[web.Request], Awaitable[web.Response]]:
+    """HTTP-обработчик GET /leader."""
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.json_response(await elector.status(), dumps=json_dumps())
+
+    return handler
@@ -0,0 +1,155 @@
+import asyncio
+import bisect
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from config import config
+from utils.runtime import json_dumps
+
+# Верхние границы корзин гистограммы задержки, мс
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+# Сколько кадров стека выводить при блокировке цикла
+STACK_LIMIT = 20
+
+
+class LoopLagMonitor:
+    """Задержка пробуждений event loop и поиск блокирующих вызовов.
+
+    Корутина run() засыпает на interval и измеряет, насколько позже
+    запланированного она проснулась; задержки копятся в гистограмме.
+    Сторожевой поток проверяет, давно ли было последнее пробуждение:
+    если цикл стоит дольше block_threshold, в лог пишется стек потока
+    цикла — это и есть медленный синхронный вызов. Накладные расходы —
+    одно пробуждение за interval и одна проверка в потоке.
+    """
+
+    def __init__(self, interval: float, block_threshold: float) -> None:
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.buckets: List[int] = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.blocked = 0
+        self.loop_thread_id: Optional[int] = None
+        self._last_tick = time.monotonic()
+
+    def record(self, lag: float) -> None:
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.buckets[bisect.bisect_left(LAG_BUCKETS_MS, lag * 1000)] += 1
+
+    def _watchdog(self) -> None:
+        reported_tick = None
+        while True:
+            time.sleep(self.block_threshold / 2)
+            tick = self._last_tick
+            stalled = time.monotonic() - tick
+            if stalled < self.block_threshold or tick == reported_tick:
+                continue
+            # Одна запись на каждую остановку цикла
+            reported_tick = tick
+            self.blocked += 1
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame else ""
+            logging.warning(f"Event loop blocked for {stalled * 1000:.0f}ms:\n{stack}")
+
+    async def run(self) -> None:
+        """Замер задержки пробуждений; запускает сторожевой поток."""
+        self.loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+        while True:
+            planned = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_tick = now
+            self.record(max(0.0, now - planned))
+
+    def status(self) -> Dict[str, Any]:
+        labels = [f"<={bound}ms" for bound in LAG_BUCKETS_MS] + [f">{LAG_BUCKETS_MS[-1]}ms"]
+        return {
+            "interval_ms": self.interval * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "blocked": self.blocked,
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class SamplingProfiler:
+    """Профилировщик по выборкам стека потока event loop.
+
+    Включается на заданное число секунд; стек снимается из отдельного
+    потока с частотой hz, без трассировки каждого вызова. Результат —
+    файл свёрнутых стеков (collapsed stacks) для flamegraph.pl или speedscope.
+    """
+
+    def __init__(self, directory: str, hz: int) -> None:
+        self.directory = directory
+        self.hz = hz
+        self.running = False
+
+    def _sample(self, thread_id: int, seconds: float) -> str:
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                stacks[";".join(reversed(names))] += 1
+            time.sleep(1 / self.hz)
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"profile-{int(time.time())}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    async def run(self, seconds: float) -> Optional[str]:
+        """Профилирование потока цикла; None, если профилировщик уже запущен."""
+        if self.running:
+            return None
+        self.running = True
+        logging.info(f"Sampling profiler started for {seconds}s")
+        try:
+            path = await asyncio.to_thread(self._sample, threading.get_ident(), seconds)
+        finally:
+            self.running = False
+        logging.info(f"Sampling profile written to {path}")
+        return path
+
+
+loop_monitor = LoopLagMonitor(
+    config.LOOP_LAG_INTERVAL_MS / 1000, config.LOOP_BLOCK_THRESHOLD_MS / 1000
+)
+profiler = SamplingProfiler(config.PROFILE_DIR, config.PROFILE_HZ)
+
+
+def install_profile_signal() -> None:
+    """SIGUSR1 включает профилировщик на PROFILE_SECONDS, где сигнал поддерживается."""
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1,
+            lambda: asyncio.create_task(profiler.run(config.PROFILE_SECONDS)),
+        )
+    except (AttributeError, NotImplementedError):
+        logging.info("SIGUSR1 недоступен, профилировщик включается только командой")
+
+
+async def loop_view(request: web.Request) -> web.Response:
+    """HTTP-обработчик GET /loop: гистограмма задержки event loop."""
+    return web.json_response(loop_monitor.status(), dumps=json_dumps())
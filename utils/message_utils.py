@@ -1,8 +1,14 @@
 import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
 from aiogram import Bot
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
 import logging
 
+from config import config
+
 
 async def delete_message(bot: Bot, chat_id: int, message_id: int, delay: int) -> None:
     """Удаление сообщения с задержкой."""
@@ -12,3 +18,71 @@ async def delete_message(bot: Bot, chat_id: int, message_id: int, delay: int) ->
         logging.info(f"Удалено сообщение {message_id} в чате {chat_id}")
     except TelegramBadRequest:
         logging.warning(f"Не удалось удалить сообщение {message_id} в чате {chat_id}")
+
+
+# Ограничение Bot API на число сообщений в одном deleteMessages
+DELETE_MESSAGES_LIMIT = 100
+
+
+class DeletionBatcher:
+    """Объединение удалений сообщений в пакетные вызовы deleteMessages.
+
+    Идентификаторы копятся по чатам и удаляются раз в
+    DELETE_BATCH_INTERVAL_MS до 100 штук за вызов вместо отдельного
+    deleteMessage на каждое сообщение. При флуд-контроле (429) пакет
+    возвращается в очередь, а удаления приостанавливаются на retry_after.
+    """
+
+    def __init__(self) -> None:
+        self.pending: Dict[int, List[int]] = defaultdict(list)
+        self.bot: Optional[Bot] = None
+        # Момент по time.monotonic(), до которого Telegram просит не слать запросы
+        self.paused_until = 0.0
+
+    def add(self, chat_id: int, message_id: int) -> None:
+        self.pending[chat_id].append(message_id)
+
+    async def flush_chat(self, chat_id: int) -> None:
+        """Немедленное удаление накопленных сообщений одного чата."""
+        if self.bot is None or time.monotonic() < self.paused_until:
+            return
+        message_ids = self.pending.pop(chat_id, [])
+        for start in range(0, len(message_ids), DELETE_MESSAGES_LIMIT):
+            batch = message_ids[start : start + DELETE_MESSAGES_LIMIT]
+            try:
+                await self.bot.delete_messages(chat_id, batch)
+                logging.info(f"Удалено сообщений пакетом: {len(batch)} в чате {chat_id}")
+            except TelegramRetryAfter as e:
+                # Неотправленный остаток уходит в начало очереди чата
+                self.pending[chat_id][:0] = message_ids[start:]
+                self.paused_until = time.monotonic() + e.retry_after
+                logging.warning(
+                    f"Удаление сообщений в чате {chat_id} отложено на {e.retry_after} с"
+                )
+                return
+            except TelegramBadRequest as e:
+                logging.warning(
+                    f"Не удалось удалить {len(batch)} сообщений в чате {chat_id}: {e}"
+                )
+            except Exception as e:
+                # Сетевые и прочие ошибки API не должны останавливать цикл run()
+                logging.error(
+                    f"Ошибка удаления {len(batch)} сообщений в чате {chat_id}: {e}"
+                )
+
+    async def flush(self) -> None:
+        for chat_id in list(self.pending):
+            await self.flush_chat(chat_id)
+
+    async def run(self, bot: Bot) -> None:
+        """Периодическая отправка накопленных удалений."""
+        self.bot = bot
+        try:
+            while True:
+                await asyncio.sleep(config.DELETE_BATCH_INTERVAL_MS / 1000)
+                await self.flush()
+        finally:
+            await self.flush()
+
+
+deletion_batcher = DeletionBatcher()
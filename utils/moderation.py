@@ -1,44 +1,93 @@
 import asyncio
 import logging
 from datetime import datetime, timedelta
+from typing import Tuple
 
 from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import ChatPermissions
 
 from config import config
-from database import ban_user_in_db, PoolType, delete_user_from_db
+from database import (
+    ban_user_in_db,
+    delete_expired_bans,
+    fetch_expired_bans,
+    PoolType,
+)
+from utils.event_log import event_log
+
+# Сколько исключений из чата выполнять одновременно при обработке пачки
+KICK_CONCURRENCY = 20
 
 
 async def ban_user_after_timeout(
-    bot: Bot, chat_id: int, user_id: int, pool: PoolType
+    bot: Bot, chat_id: int, user_id: int, pool: PoolType, reason: str = ""
 ) -> None:
-    """Мут пользователя на сутки, запись в БД, затем бан и анбан через сутки."""
-    mute_duration = config.MUTE_DURATION
-    until = datetime.now() + timedelta(seconds=mute_duration)
+    """Мут пользователя на MUTE_DURATION и запись бана в БД.
+
+    Мут снимает сам Telegram по until_date; исключение из чата после его
+    окончания выполняет sweep_expired_bans по записи в banned_users.
+    """
+    until = datetime.now() + timedelta(seconds=config.MUTE_DURATION)
+    event_log.emit("banned", user_id, chat_id, reason or None)
 
-    try:
-        await bot.restrict_chat_member(
+    # Мут и запись в БД независимы: выполняем их одновременно
+    restricted, recorded = await asyncio.gather(
+        bot.restrict_chat_member(
             chat_id, user_id, ChatPermissions(can_send_messages=False), until_date=until
+        ),
+        ban_user_in_db(pool, user_id, chat_id, until),
+        return_exceptions=True,
+    )
+    if isinstance(recorded, Exception):
+        logging.error(f"Ошибка записи бана пользователя {user_id} в БД: {recorded}")
+    else:
+        logging.info(f"Бан пользователя {user_id} записан в БД до {until}")
+    if isinstance(restricted, Exception):
+        logging.error(
+            f"Ошибка при муте пользователя {user_id} в чате {chat_id}: {restricted}"
         )
-        logging.info(f"Пользователь {user_id} замьючен на 24 часа в чате {chat_id}")
+        return
+    logging.info(f"Пользователь {user_id} замьючен до {until} в чате {chat_id}")
 
-        await ban_user_in_db(pool, user_id, until)
-        logging.info(f"Бан пользователя {user_id} записан в БД до {until}")
 
-        async def ban_and_unban():
-            await asyncio.sleep(mute_duration)
-            try:
-                await bot.ban_chat_member(chat_id, user_id)
-                logging.info(f"Пользователь {user_id} забанен в чате {chat_id}")
-                await asyncio.sleep(config.UNBAN_DELAY)
-                await bot.unban_chat_member(chat_id, user_id)
-                logging.info(f"Пользователь {user_id} разбанен в чате {chat_id}")
-                await asyncio.sleep(config.DB_DELETE_DELAY)
-                await delete_user_from_db(pool, user_id)
-                logging.info(f"Пользователь {user_id} удалён из БД после разбана")
-            except Exception as e:
-                logging.error(f"Ошибка при бане/разбане пользователя {user_id}: {e}")
-
-        asyncio.create_task(ban_and_unban())
-    except Exception as e:
-        logging.error(f"Ошибка при муте пользователя {user_id} в чате {chat_id}: {e}")
+async def _kick(bot: Bot, ban: Tuple[int, int], limiter: asyncio.Semaphore) -> bool:
+    """Исключение из чата без бана; True, если запись о бане можно удалять."""
+    chat_id, user_id = ban
+    async with limiter:
+        try:
+            # Для участника чата unban_chat_member исключает его, оставляя
+            # возможность вернуться, — одним вызовом вместо бана и анбана
+            await bot.unban_chat_member(chat_id, user_id)
+            event_log.emit("kicked", user_id, chat_id)
+            logging.info(f"Пользователь {user_id} исключён из чата {chat_id} после мута")
+        except TelegramBadRequest as e:
+            # Пользователь уже вышел или чат недоступен: повторять бессмысленно
+            logging.warning(f"Не удалось исключить {user_id} из чата {chat_id}: {e}")
+        except Exception as e:
+            logging.error(f"Ошибка при исключении {user_id} из чата {chat_id}: {e}")
+            return False
+    return True
+
+
+async def sweep_expired_bans(bot: Bot, pool: PoolType) -> None:
+    """Исключение пользователей с истёкшим мутом пачками по CLEANUP_BATCH_SIZE.
+
+    Записи с неудачным исключением (сеть, лимиты) остаются в таблице
+    и обрабатываются при следующем проходе.
+    """
+    limiter = asyncio.Semaphore(KICK_CONCURRENCY)
+    batch_size = config.CLEANUP_BATCH_SIZE
+    processed = 0
+    while True:
+        bans = await fetch_expired_bans(pool, batch_size)
+        if not bans:
+            break
+        results = await asyncio.gather(*(_kick(bot, ban, limiter) for ban in bans))
+        done = [ban for ban, ok in zip(bans, results) if ok]
+        await delete_expired_bans(pool, done)
+        processed += len(done)
+        if len(bans) < batch_size or len(done) < len(bans):
+            break
+    if processed > 0:
+        logging.info(f"Processed expired bans: {processed}")
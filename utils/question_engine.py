@@ -0,0 +1,117 @@
+import random
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from config import config, questions
+
+OUTCOMES = ("correct", "incorrect", "timeout")
+# Строка статистики: (question_id, language, correct, incorrect, timeout)
+StatsRow = Tuple[int, str, int, int, int]
+
+
+class AliasSampler:
+    """Взвешенная выборка за O(1) методом алиасов (Vose)."""
+
+    def __init__(self, items: Sequence[Any], weights: Sequence[float]) -> None:
+        n = len(items)
+        total = sum(weights)
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        self.items = list(items)
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+
+    def sample(self) -> Any:
+        i = random.randrange(len(self.items))
+        return self.items[i] if random.random() < self.prob[i] else self.items[self.alias[i]]
+
+
+class QuestionEngine:
+    """Выбор вопросов квиза с учётом статистики ответов.
+
+    Исходы копятся в памяти и периодически сбрасываются в question_stats.
+    Веса — сглаженная доля неправильных ответов и таймаутов: вопросы, на
+    которых проваливаются, выпадают чаще. Активный пул — QUIZ_ACTIVE_POOL_SIZE
+    самых «трудных» вопросов плюс один случайный из остальных, чтобы
+    статистика копилась по всем вопросам. Пул и сэмплеры пересобираются
+    только в rebuild(), выбор вопроса — O(1) без обращений к БД.
+    """
+
+    def __init__(self, question_list: List[Dict[str, Any]], pool_size: int) -> None:
+        self.questions = {question["id"]: question for question in question_list}
+        self.pool_size = pool_size
+        self.totals: Dict[Tuple[int, str], List[int]] = defaultdict(lambda: [0, 0, 0])
+        self.pending: Dict[Tuple[int, str], List[int]] = defaultdict(lambda: [0, 0, 0])
+        self.samplers: Dict[str, AliasSampler] = {}
+        self.rebuild()
+
+    def _weight(self, question_id: int, lang: str) -> float:
+        correct, incorrect, timeout = self.totals.get((question_id, lang), (0, 0, 0))
+        failed = incorrect + timeout
+        return (failed + 1) / (correct + failed + 2)
+
+    def _languages(self) -> Iterable[str]:
+        return {lang for question in self.questions.values() for lang in question["question"]}
+
+    def rebuild(self) -> None:
+        """Пересчёт весов и ротация активного пула по каждому языку."""
+        samplers = {}
+        for lang in self._languages():
+            ranked = sorted(
+                self.questions, key=lambda qid: self._weight(qid, lang), reverse=True
+            )
+            if 0 < self.pool_size < len(ranked):
+                active = ranked[: self.pool_size]
+                active.append(random.choice(ranked[self.pool_size :]))
+            else:
+                active = ranked
+            samplers[lang] = AliasSampler(
+                active, [self._weight(qid, lang) for qid in active]
+            )
+        self.samplers = samplers
+
+    def pick(self, lang: str) -> Dict[str, Any]:
+        """Вопрос для пользователя с выбранным языком."""
+        sampler = self.samplers.get(lang)
+        if sampler is None:
+            return random.choice(list(self.questions.values()))
+        return self.questions[sampler.sample()]
+
+    def record(self, question_id: int, lang: str, outcome: str) -> None:
+        """Учёт исхода ответа (correct / incorrect / timeout) в памяти."""
+        if question_id not in self.questions:
+            return
+        index = OUTCOMES.index(outcome)
+        self.totals[(question_id, lang)][index] += 1
+        self.pending[(question_id, lang)][index] += 1
+
+    def load(self, rows: Iterable[StatsRow]) -> None:
+        """Загрузка накопленной статистики из БД."""
+        for question_id, lang, correct, incorrect, timeout in rows:
+            totals = self.totals[(question_id, lang)]
+            totals[0] += correct
+            totals[1] += incorrect
+            totals[2] += timeout
+        self.rebuild()
+
+    def take_pending(self) -> List[StatsRow]:
+        """Забирает несброшенные приращения счётчиков."""
+        pending, self.pending = self.pending, defaultdict(lambda: [0, 0, 0])
+        return [(qid, lang, *counts) for (qid, lang), counts in pending.items()]
+
+    def restore_pending(self, rows: Iterable[StatsRow]) -> None:
+        """Возвращает приращения, которые не удалось записать в БД."""
+        for question_id, lang, *counts in rows:
+            pending = self.pending[(question_id, lang)]
+            for index, count in enumerate(counts):
+                pending[index] += count
+
+
+question_engine = QuestionEngine(questions, config.QUIZ_ACTIVE_POOL_SIZE)
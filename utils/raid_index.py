@@ -0,0 +1,188 @@
+import re
+import time
+from collections import defaultdict
+from typing import Dict, Hashable, List, NamedTuple, Optional, Set, Tuple
+
+from aiogram import types
+
+from config import config
+
+MASK64 = (1 << 64) - 1
+# SimHash делится на BANDS полос: отпечатки с расстоянием Хэмминга
+# меньше BANDS совпадают хотя бы в одной полосе целиком
+BANDS = 4
+BAND_BITS = 64 // BANDS
+# Сколько последних сообщений хранить в одной корзине: при большом
+# рейде поиск не деградирует до перебора всех его сообщений
+BUCKET_LIMIT = 64
+# Ширина счётчика бита при побайтовом суммировании хешей в SimHash
+_LANE_BITS = 16
+_WORD = re.compile(r"\w+")
+
+
+def _spread_byte(value: int) -> int:
+    return sum(1 << (bit * _LANE_BITS) for bit in range(8) if value >> bit & 1)
+
+
+# Байт хеша, «разложенный» по 8 счётчикам: сумма таких чисел — счётчики битов
+_SPREAD = [_spread_byte(value) for value in range(256)]
+_LANE_MASK = (1 << _LANE_BITS) - 1
+
+
+class Fingerprint(NamedTuple):
+    """Сообщение в индексе: момент, SimHash (или None для медиа) и его автор."""
+
+    seen: float
+    simhash: Optional[int]
+    chat_id: int
+    user_id: int
+    message_id: int
+
+
+def simhash(tokens: List[str]) -> int:
+    """64-битный SimHash по биграммам слов (или словам, если слово одно)."""
+    features = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])] or tokens
+    # Счётчики единиц по всем 64 битам копятся в одном большом int:
+    # 8 обращений к таблице на признак вместо 64 операций
+    counters = 0
+    for feature in features[: _LANE_MASK]:
+        h = hash(feature) & MASK64
+        for byte in range(8):
+            counters += _SPREAD[h >> (byte * 8) & 255] << (byte * 8 * _LANE_BITS)
+    half = len(features[: _LANE_MASK]) / 2
+    # 16-битные счётчики читаются разом как массив uint16
+    lanes = memoryview(counters.to_bytes(64 * _LANE_BITS // 8, "little")).cast("H")
+    return sum(1 << bit for bit, count in enumerate(lanes) if count > half)
+
+
+def media_id(message: types.Message) -> Optional[str]:
+    """file_unique_id вложения, по которому совпадают пересланные копии.
+
+    Стикеры и GIF не учитываются: один популярный стикер от нескольких
+    новичков подряд — обычное приветствие, а не рейд.
+    """
+    if message.photo:
+        return message.photo[-1].file_unique_id
+    for attachment in (
+        message.video,
+        message.document,
+        message.voice,
+        message.video_note,
+    ):
+        if attachment is not None:
+            return attachment.file_unique_id
+    return None
+
+
+class RaidIndex:
+    """Скользящий индекс отпечатков первых сообщений непроверенных пользователей.
+
+    Текст нормализуется и сворачивается в SimHash; корзины LSH — полосы
+    отпечатка и file_unique_id медиа. Индекс состоит из двух поколений
+    по window секунд: текущее пополняется, предыдущее только читается,
+    более старые отбрасываются целиком. Поиск — несколько обращений
+    к словарю и сравнение с кандидатами одной корзины.
+    """
+
+    def __init__(
+        self, window: float, cluster_size: int, max_distance: int, min_length: int
+    ) -> None:
+        self.window = window
+        self.cluster_size = cluster_size
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self._generation = 0
+        self._current: Dict[Hashable, List[Fingerprint]] = defaultdict(list)
+        self._previous: Dict[Hashable, List[Fingerprint]] = {}
+        # Участники горячих кластеров, уже отданные на удаление, по поколениям:
+        # их отпечатки остаются в индексе, пока живёт предыдущее поколение
+        self._flagged: Set[Tuple[int, int]] = set()
+        self._flagged_previous: Set[Tuple[int, int]] = set()
+
+    def _rotate(self, now: float) -> None:
+        generation = int(now // self.window)
+        if generation == self._generation:
+            return
+        if generation == self._generation + 1:
+            self._previous, self._flagged_previous = self._current, self._flagged
+        else:
+            self._previous, self._flagged_previous = {}, set()
+        self._current = defaultdict(list)
+        self._flagged = set()
+        self._generation = generation
+
+    def _keys(self, message: types.Message) -> Tuple[Optional[int], List[Hashable]]:
+        keys: List[Hashable] = []
+        fingerprint = None
+        text = (message.text or message.caption or "").lower()
+        tokens = _WORD.findall(text)
+        if sum(len(token) for token in tokens) >= self.min_length:
+            fingerprint = simhash(tokens)
+            keys.extend(
+                (band, fingerprint >> (band * BAND_BITS) & ((1 << BAND_BITS) - 1))
+                for band in range(BANDS)
+            )
+        media = media_id(message)
+        if media is not None:
+            keys.append(("media", media))
+        return fingerprint, keys
+
+    def _matches(self, entry: Fingerprint, fingerprint: Optional[int], key: Hashable) -> bool:
+        if key[0] == "media":
+            return True
+        return (
+            fingerprint is not None
+            and entry.simhash is not None
+            and bin(entry.simhash ^ fingerprint).count("1") <= self.max_distance
+        )
+
+    def observe(
+        self, message: types.Message, now: Optional[float] = None
+    ) -> List[Fingerprint]:
+        """Добавляет сообщение в индекс; возвращает кластер, если он «горячий».
+
+        Кластер — похожие сообщения разных пользователей за окно, включая
+        текущее. Пустой список — совпадений меньше порога RAID_CLUSTER_SIZE.
+        """
+        now = time.monotonic() if now is None else now
+        self._rotate(now)
+        fingerprint, keys = self._keys(message)
+        if not keys:
+            return []
+        entry = Fingerprint(
+            now, fingerprint, message.chat.id, message.from_user.id, message.message_id
+        )
+        cluster: Dict[int, Fingerprint] = {}
+        for key in keys:
+            for generation in (self._previous, self._current):
+                for other in generation.get(key, ()):
+                    if (
+                        other.chat_id == entry.chat_id
+                        and now - other.seen <= self.window
+                        and self._matches(other, fingerprint, key)
+                    ):
+                        cluster.setdefault(other.user_id, other)
+            bucket = self._current[key]
+            bucket.append(entry)
+            if len(bucket) > BUCKET_LIMIT:
+                del bucket[0]
+        cluster[entry.user_id] = entry
+        if len(cluster) < self.cluster_size:
+            return []
+        flagged = self._flagged | self._flagged_previous
+        members = [
+            member
+            for member in cluster.values()
+            if (member.chat_id, member.user_id) not in flagged
+        ]
+        # Весь кластер переходит в текущее поколение отметок вместе с отпечатками
+        self._flagged.update((member.chat_id, member.user_id) for member in cluster.values())
+        return members
+
+
+raid_index = RaidIndex(
+    config.RAID_WINDOW,
+    config.RAID_CLUSTER_SIZE,
+    config.RAID_SIMHASH_DISTANCE,
+    config.RAID_MIN_TEXT_LENGTH,
+)
@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from config import config
+
+Key = Tuple[int, int]
+
+
+class SlidingWindowLimiter:
+    """Скользящее окно сообщений на пользователя с LRU-вытеснением.
+
+    На ключ хранится три числа: номер текущего окна и счётчики текущего и
+    предыдущего окна. Частота оценивается как взвешенная сумма двух окон,
+    что даёт скользящее окно без хранения отметок времени. Пользователи
+    сверх max_users вытесняются, начиная с давно не писавших.
+    """
+
+    def __init__(
+        self, window: float, threshold: int, max_users: int, mute_duration: float
+    ) -> None:
+        self.window = window
+        self.threshold = threshold
+        self.max_users = max_users
+        self.mute_duration = mute_duration
+        # (chat_id, user_id) -> [номер окна, предыдущее окно, текущее окно]
+        self._entries: "OrderedDict[Key, List[int]]" = OrderedDict()
+        # Пользователи с действующим ограничением -> момент его снятия
+        self._escalated: "OrderedDict[Key, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit(self, chat_id: int, user_id: int, now: Optional[float] = None) -> float:
+        """Учёт сообщения; возвращает оценку числа сообщений за окно."""
+        now = time.monotonic() if now is None else now
+        key = (chat_id, user_id)
+        index = int(now // self.window)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [index, 0, 0]
+            if len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        if entry[0] != index:
+            # Текущее окно стало предыдущим; если прошло больше окна — обнуляем
+            entry[1] = entry[2] if entry[0] == index - 1 else 0
+            entry[2] = 0
+            entry[0] = index
+        entry[2] += 1
+        elapsed = now / self.window - index
+        return entry[1] * (1 - elapsed) + entry[2]
+
+    def over_limit(self, chat_id: int, user_id: int, now: Optional[float] = None) -> bool:
+        """Учёт сообщения и проверка превышения порога."""
+        return self.hit(chat_id, user_id, now) > self.threshold
+
+    def escalate(
+        self, chat_id: int, user_id: int, now: Optional[float] = None
+    ) -> bool:
+        """Отмечает ограничение на время мута; False, если оно ещё действует."""
+        now = time.monotonic() if now is None else now
+        key = (chat_id, user_id)
+        if self.is_escalated(chat_id, user_id, now):
+            return False
+        self._escalated[key] = now + self.mute_duration
+        self._escalated.move_to_end(key)
+        if len(self._escalated) > self.max_users:
+            self._escalated.popitem(last=False)
+        return True
+
+    def is_escalated(
+        self, chat_id: int, user_id: int, now: Optional[float] = None
+    ) -> bool:
+        """Действует ли ограничение; истёкшая отметка удаляется."""
+        key = (chat_id, user_id)
+        expires = self._escalated.get(key)
+        if expires is None:
+            return False
+        if expires > (time.monotonic() if now is None else now):
+            return True
+        # Мут снят Telegram по until_date — сообщения снова обрабатываются
+        del self._escalated[key]
+        return False
+
+    def reset(self, chat_id: int, user_id: int) -> None:
+        """Сброс счётчиков и отметки, например после прохождения проверки."""
+        self._entries.pop((chat_id, user_id), None)
+        self._escalated.pop((chat_id, user_id), None)
+
+
+spam_limiter = SlidingWindowLimiter(
+    config.SPAM_WINDOW,
+    config.SPAM_THRESHOLD,
+    config.RATE_LIMIT_MAX_USERS,
+    config.MUTE_DURATION,
+)
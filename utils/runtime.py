@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.methods import TelegramMethod
+
+from config import config
+
+# Необязательные ускорители: при отсутствии пакетов работаем на stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+
+def is_fast_profile() -> bool:
+    """Включён ли профиль RUNTIME_PROFILE=fast."""
+    return config.RUNTIME_PROFILE == "fast"
+
+
+def json_loads() -> Callable[[Any], Any]:
+    """Функция разбора JSON для текущего профиля."""
+    if is_fast_profile() and orjson is not None:
+        return orjson.loads
+    return json.loads
+
+
+def json_dumps() -> Callable[[Any], str]:
+    """Функция сериализации JSON для текущего профиля."""
+    if is_fast_profile() and orjson is not None:
+        return _orjson_dumps
+    return json.dumps
+
+
+def parse_method_timeouts(value: str) -> Dict[str, float]:
+    """Разбор BOT_API_METHOD_TIMEOUTS вида "deleteMessage=5,sendPoll=15"."""
+    timeouts = {}
+    for item in value.split(","):
+        method, _, seconds = item.partition("=")
+        if method.strip() and seconds.strip():
+            timeouts[method.strip()] = float(seconds)
+    return timeouts
+
+
+class BotAPISession(AiohttpSession):
+    """Сессия Bot API с настраиваемым пулом соединений и таймаутами по методам."""
+
+    def __init__(self, method_timeouts: Dict[str, float], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.method_timeouts = method_timeouts
+        self._connector_init.update(
+            keepalive_timeout=config.BOT_API_KEEPALIVE,
+            ttl_dns_cache=config.BOT_API_DNS_CACHE_TTL,
+        )
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None
+    ) -> Any:
+        # Явный таймаут (например, у getUpdates при long polling) важнее настроек
+        if timeout is None:
+            timeout = self.method_timeouts.get(method.__api_method__)
+        return await super().make_request(bot, method, timeout)
+
+
+def create_bot() -> Bot:
+    """Создание бота с настроенной сессией Bot API и JSON текущего профиля."""
+    kwargs: Dict[str, Any] = {}
+    if config.BOT_API_URL:
+        # Собственный telegram-bot-api: выше лимиты и меньше задержка
+        kwargs["api"] = TelegramAPIServer.from_base(
+            config.BOT_API_URL, is_local=config.BOT_API_LOCAL
+        )
+    session = BotAPISession(
+        parse_method_timeouts(config.BOT_API_METHOD_TIMEOUTS),
+        limit=config.BOT_API_POOL_SIZE,
+        timeout=config.BOT_API_TIMEOUT,
+        json_loads=json_loads(),
+        json_dumps=json_dumps(),
+        **kwargs,
+    )
+    return Bot(token=config.BOT_TOKEN, session=session)
+
+
+def run(main: Coroutine[Any, Any, None]) -> None:
+    """Запуск корутины в event loop текущего профиля."""
+    if is_fast_profile():
+        if orjson is None:
+            logging.warning("orjson не установлен, используется стандартный json")
+        if uvloop is not None:
+            with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+                runner.run(main)
+            return
+        logging.warning("uvloop не установлен, используется стандартный event loop")
+    asyncio.run(main)
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from config import config
+from utils.runtime import json_dumps
+
+# Полоса обработки для типа апдейта; неизвестные типы идут в последнюю
+LANE_BY_EVENT = {
+    "poll_answer": "answers",
+    "callback_query": "answers",
+    "poll": "answers",
+    "chat_member": "joins",
+    "my_chat_member": "joins",
+    "message": "messages",
+}
+# Сколько последних ожиданий хранить для перцентилей
+WAIT_SAMPLES = 1024
+
+
+class Lane:
+    """Очередь апдейтов одного приоритета со своим лимитом параллельности."""
+
+    def __init__(self, name: str, rank: int, limit: int) -> None:
+        self.name = name
+        self.rank = rank
+        self.limit = limit
+        self.active = 0
+        self.processed = 0
+        # Ожидающие: (момент постановки в очередь, future выдачи слота)
+        self.waiters: Deque[Tuple[float, asyncio.Future]] = deque()
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def status(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+
+        def percentile(p: float) -> float:
+            return round(waits[int(p * (len(waits) - 1))] * 1000, 1) if waits else 0.0
+
+        return {
+            "queued": len(self.waiters),
+            "active": self.active,
+            "limit": self.limit,
+            "processed": self.processed,
+            "wait_p50_ms": percentile(0.5),
+            "wait_p95_ms": percentile(0.95),
+            "wait_max_ms": percentile(1.0),
+        }
+
+
+class UpdateScheduler:
+    """Приоритетная выдача слотов обработки апдейтов.
+
+    Апдейт ждёт слота в своей полосе: ответы на квиз и нажатия кнопок,
+    вступления в чат, сообщения. Освободившийся слот получает полоса
+    с наименьшим рангом, у которой не исчерпан собственный лимит;
+    каждые aging секунд ожидания поднимают апдейт на один ранг, поэтому
+    сообщения не голодают и при потоке ответов.
+    """
+
+    def __init__(self, concurrency: int, aging: float, lanes: List[Lane]) -> None:
+        self.concurrency = concurrency
+        self.aging = aging
+        self.lanes = {lane.name: lane for lane in lanes}
+        self.active = 0
+
+    def _pick(self, now: float) -> Optional[Lane]:
+        best, best_score = None, 0.0
+        for lane in self.lanes.values():
+            if not lane.waiters or lane.active >= lane.limit:
+                continue
+            score = lane.rank - (now - lane.waiters[0][0]) / self.aging
+            if best is None or score < best_score:
+                best, best_score = lane, score
+        return best
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self.active < self.concurrency:
+            lane = self._pick(now)
+            if lane is None:
+                return
+            enqueued, waiter = lane.waiters.popleft()
+            if waiter.done():
+                continue
+            waiter.set_result(None)
+            lane.active += 1
+            self.active += 1
+            lane.waits.append(now - enqueued)
+
+    def _release(self, lane: Lane) -> None:
+        lane.active -= 1
+        lane.processed += 1
+        self.active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, event_type: str) -> AsyncIterator[None]:
+        """Ожидание слота в полосе типа апдейта на время обработки."""
+        lane = self.lanes[LANE_BY_EVENT.get(event_type, "messages")]
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append((time.monotonic(), waiter))
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Слот уже выдан: возвращаем его следующему
+                self._release(lane)
+            raise
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "concurrency": self.concurrency,
+            "lanes": {name: lane.status() for name, lane in self.lanes.items()},
+        }
+
+
+update_scheduler = UpdateScheduler(
+    config.SCHEDULER_CONCURRENCY,
+    config.SCHEDULER_AGING_MS / 1000,
+    [
+        Lane("answers", 0, config.LANE_ANSWERS_CONCURRENCY),
+        Lane("joins", 1, config.LANE_JOINS_CONCURRENCY),
+        Lane("messages", 2, config.LANE_MESSAGES_CONCURRENCY),
+    ],
+)
+
+
+async def scheduler_view(request: web.Request) -> web.Response:
+    """HTTP-обработчик GET /scheduler: очереди, активные слоты и время ожидания."""
+    return web.json_response(update_scheduler.status(), dumps=json_dumps())
@@ -0,0 +1,337 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiohttp
+from aiogram import BaseMiddleware, Bot, types
+
+from config import config
+from database import (
+    PoolType,
+    close_pool,
+    create_pool,
+    warm_verdict_cache,
+)
+from utils.active_polls import active_polls
+from utils.http_server import start_http_server
+from utils.leader import LeaderElector, default_node_id
+from utils.logger import setup_logging
+from utils.loop_monitor import install_profile_signal, loop_monitor
+from utils.message_utils import deletion_batcher
+from utils.runtime import create_bot, json_loads, run
+from utils.staff import staff_cache
+from utils.startup import StartupTimer
+
+# Типы событий, у которых отправитель лежит в поле "from"
+_FROM_EVENTS = ("message", "edited_message", "callback_query")
+# Вступления маршрутизируются по участнику, а не по добавившему его админу
+_MEMBER_EVENTS = ("chat_member", "my_chat_member")
+POLLING_TIMEOUT = 30
+# Пачек getUpdates (до 100 апдейтов) в очереди одного шарда
+QUEUE_BATCHES = 8
+# Пауза ingress, пока очередь шарда заполнена
+BACKPRESSURE_DELAY = 0.05
+# Минимальный интервал между перезапусками одного шарда, секунд
+RESTART_BACKOFF = 5.0
+
+
+def shard_key(update: Dict[str, Any]) -> Optional[int]:
+    """Возвращает user_id, по которому маршрутизируется апдейт.
+
+    Ключ совпадает с пользователем FSM-контекста aiogram, поэтому групповые
+    и ЛС-апдейты одного пользователя попадают в один шард. None означает,
+    что пользователь неизвестен (например, закрытие опроса) и апдейт
+    рассылается всем шардам.
+    """
+    for event_type in _FROM_EVENTS:
+        event = update.get(event_type)
+        if event is not None:
+            return event.get("from", {}).get("id")
+    for event_type in _MEMBER_EVENTS:
+        event = update.get(event_type)
+        if event is not None:
+            return event.get("new_chat_member", {}).get("user", {}).get("id")
+    poll_answer = update.get("poll_answer")
+    if poll_answer is not None:
+        return poll_answer.get("user", {}).get("id")
+    return None
+
+
+def shard_for(user_id: int, workers: int) -> int:
+    """Номер шарда для пользователя."""
+    return user_id % workers
+
+
+class ShardOwnershipMiddleware(BaseMiddleware):
+    """Пропускает закрытия опросов только в шард, которому принадлежит опрос."""
+
+    def __init__(self, pool: PoolType, shard: int, workers: int) -> None:
+        self.pool = pool
+        self.shard = shard
+        self.workers = workers
+
+    async def __call__(self, handler, event, data: dict) -> None:
+        if isinstance(event, types.Poll):
+            poll_data = await active_polls.get(self.pool, event.id)
+            if not poll_data or shard_for(poll_data["user_id"], self.workers) != self.shard:
+                return
+        return await handler(event, data)
+
+
+async def poll_raw_updates(
+    bot: Bot, allowed_updates: List[str]
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Long polling без построения pydantic-моделей: ingress только маршрутизирует.
+
+    Апдейты отдаются пачками по ответу getUpdates.
+    """
+    loads = json_loads()
+    session = await bot.session.create_session()
+    url = bot.session.api.api_url(token=bot.token, method="getUpdates")
+    params: Dict[str, Any] = {
+        "timeout": POLLING_TIMEOUT,
+        "allowed_updates": json.dumps(allowed_updates),
+    }
+    while True:
+        try:
+            async with session.post(
+                url, data=params, timeout=aiohttp.ClientTimeout(total=POLLING_TIMEOUT + 10)
+            ) as response:
+                payload = loads(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logging.warning(f"Ошибка получения обновлений: {e}")
+            await asyncio.sleep(1)
+            continue
+
+        if not payload.get("ok"):
+            logging.error(f"getUpdates вернул ошибку: {payload.get('description')}")
+            await asyncio.sleep(5)
+            continue
+
+        updates = payload["result"]
+        if updates:
+            params["offset"] = updates[-1]["update_id"] + 1
+            yield updates
+
+
+class ShardWorkers:
+    """Процессы-воркеры и их очереди с ограниченной длиной.
+
+    Каждому шарду уходит одна пачка на ответ getUpdates: так меньше
+    сериализаций и переключений между процессами. Если очередь шарда
+    заполнена, ingress ждёт и не запрашивает новые апдейты — они копятся
+    у Telegram, а не в памяти. Завершившийся воркер перезапускается
+    с новой очередью; апдейты, оставшиеся в старой, теряются.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.restarts = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self.queues: List[Any] = [None] * workers
+        self.processes: List[Any] = [None] * workers
+        self._started = [0.0] * workers
+
+    def start(self, shard: int) -> None:
+        self.queues[shard] = self._ctx.Queue(QUEUE_BATCHES)
+        process = self._ctx.Process(
+            target=_worker_entry,
+            args=(shard, self.workers, self.queues[shard]),
+            name=f"shard-{shard}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[shard] = process
+        self._started[shard] = time.monotonic()
+
+    async def revive(self, shard: int) -> bool:
+        """Перезапускает завершившийся воркер; False — воркер жив."""
+        process = self.processes[shard]
+        if process.is_alive():
+            return False
+        logging.error(f"Шард {shard} завершился с кодом {process.exitcode}, перезапуск")
+        # Непрочитанные пачки старой очереди не должны держать выход ingress
+        self.queues[shard].cancel_join_thread()
+        delay = RESTART_BACKOFF - (time.monotonic() - self._started[shard])
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.restarts += 1
+        self.start(shard)
+        return True
+
+    async def put(self, shard: int, batch: Optional[List[Dict[str, Any]]]) -> None:
+        """Ставит пачку в очередь шарда, дожидаясь свободного места."""
+        while True:
+            try:
+                self.queues[shard].put_nowait(batch)
+                return
+            except queue.Full:
+                pass
+            if not await self.revive(shard):
+                await asyncio.sleep(BACKPRESSURE_DELAY)
+
+    async def dispatch(self, updates: List[Dict[str, Any]]) -> None:
+        """Раскладывает апдейты по шардам; апдейты без пользователя — во все."""
+        batches: List[List[Dict[str, Any]]] = [[] for _ in range(self.workers)]
+        for update in updates:
+            user_id = shard_key(update)
+            if user_id is None:
+                for batch in batches:
+                    batch.append(update)
+            else:
+                batches[shard_for(user_id, self.workers)].append(update)
+        for shard, batch in enumerate(batches):
+            await self.revive(shard)
+            if batch:
+                await self.put(shard, batch)
+
+    def stop(self, timeout: float = 10) -> None:
+        for shard, process in enumerate(self.processes):
+            try:
+                self.queues[shard].put(None, timeout=timeout)
+            except queue.Full:
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout=timeout)
+
+
+async def run_sharded(workers: int, allowed_updates: List[str]) -> None:
+    """Ingress: получает обновления и раскладывает их по процессам-воркерам."""
+    from bot import prepare_database
+
+    # Схему создаём один раз до запуска воркеров, чтобы они не гонялись за DDL
+    await close_pool(await prepare_database())
+
+    if workers > multiprocessing.cpu_count():
+        logging.warning(
+            f"SHARD_WORKERS={workers} больше числа CPU ({multiprocessing.cpu_count()}): "
+            "лишние воркеры не ускоряют обработку"
+        )
+    shards = ShardWorkers(workers)
+    for shard in range(workers):
+        shards.start(shard)
+    logging.info(f"Запущено {workers} шардов-воркеров")
+
+    bot = create_bot()
+    try:
+        async for updates in poll_raw_updates(bot, allowed_updates):
+            await shards.dispatch(updates)
+    finally:
+        shards.stop()
+        await bot.session.close()
+
+
+def _worker_entry(shard: int, workers: int, source: multiprocessing.Queue) -> None:
+    """Точка входа процесса-воркера."""
+    setup_logging()
+    try:
+        run(_worker_main(shard, workers, source))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_main(shard: int, workers: int, source: multiprocessing.Queue) -> None:
+    """Воркер: собственные Bot, Dispatcher и пул БД, апдейты приходят из очереди."""
+    from bot import (
+        build_dispatcher,
+        cleanup_task,
+        passed_filter_task,
+        question_stats_task,
+        verification_stats_task,
+        event_log_task,
+        http_routes,
+    )
+
+    timer = StartupTimer()
+    bot = create_bot()
+    pool: PoolType
+    pool, _ = await asyncio.gather(
+        timer.measure("database", create_pool()),
+        timer.measure("bot_identity", bot.me()),
+    )
+    dp = build_dispatcher(bot, pool)
+    dp.poll.outer_middleware(ShardOwnershipMiddleware(pool, shard, workers))
+    staff_cache.refresh(bot, config.ALLOWED_CHAT_ID)
+    asyncio.create_task(
+        warm_verdict_cache(
+            pool,
+            config.ALLOWED_CHAT_ID,
+            lambda user_id: shard_for(user_id, workers) == shard,
+        )
+    )
+
+    # Общие периодические задачи и HTTP API — только на нулевом шарде
+    http_runner = None
+    leader_task = None
+    if shard == 0:
+        elector = LeaderElector(pool, default_node_id())
+        leader_task = asyncio.create_task(elector.run())
+        asyncio.create_task(cleanup_task(bot, pool, elector))
+        http_runner = await start_http_server(http_routes(pool, elector, dp.storage))
+    asyncio.create_task(passed_filter_task(pool))
+    asyncio.create_task(question_stats_task(pool))
+    asyncio.create_task(verification_stats_task(pool))
+    events_task = asyncio.create_task(event_log_task(pool))
+    deletions_task = asyncio.create_task(deletion_batcher.run(bot))
+    asyncio.create_task(dp.storage.run())
+    asyncio.create_task(loop_monitor.run())
+    install_profile_signal()
+
+    loop = asyncio.get_running_loop()
+    # Поток чтения ждёт места в inbox, а цикл ниже — свободного места
+    # в backlog: переполненный шард перестаёт разбирать свою очередь,
+    # и ingress упирается в её лимит
+    inbox: asyncio.Queue = asyncio.Queue(1)
+    backlog = asyncio.Semaphore(config.SHARD_BACKLOG)
+
+    def read_queue() -> None:
+        while True:
+            batch = source.get()
+            asyncio.run_coroutine_threadsafe(inbox.put(batch), loop).result()
+            if batch is None:
+                return
+
+    threading.Thread(target=read_queue, name=f"shard-{shard}-reader", daemon=True).start()
+    logging.info(f"Шард {shard} готов к обработке обновлений")
+    timer.report()
+
+    async def process(raw: Dict[str, Any]) -> None:
+        try:
+            update = types.Update.model_validate(raw, context={"bot": bot})
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            logging.error(f"Шард {shard}: ошибка обработки обновления: {e}")
+
+    tasks = set()
+
+    def done(task: asyncio.Task) -> None:
+        tasks.discard(task)
+        backlog.release()
+
+    try:
+        while (batch := await inbox.get()) is not None:
+            for raw in batch:
+                await backlog.acquire()
+                task = asyncio.create_task(process(raw))
+                tasks.add(task)
+                task.add_done_callback(done)
+        if tasks:
+            await asyncio.wait(tasks)
+    finally:
+        if http_runner is not None:
+            await http_runner.cleanup()
+        events_task.cancel()
+        if leader_task is not None:
+            leader_task.cancel()
+        deletions_task.cancel()
+        await asyncio.gather(
+            *(task for task in (events_task, leader_task, deletions_task) if task),
+            return_exceptions=True,
+        )
+        await bot.session.close()
+        await close_pool(pool)
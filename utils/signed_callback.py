@@ -0,0 +1,69 @@
+import base64
+import hashlib
+import hmac
+import random
+from typing import List, NamedTuple, Optional
+
+from config import config
+
+# Префикс callback_data кнопок ответа inline-квиза
+PREFIX = "iq"
+# Байт HMAC в подписи: 8 байт — 11 символов base64, callback_data укладывается в 64 байта
+SIGNATURE_BYTES = 8
+
+
+class InlineAnswer(NamedTuple):
+    """Проверенное нажатие кнопки ответа."""
+
+    user_id: int
+    question_id: int
+    lang: str
+    issued: int
+    option: int
+
+
+def _secret() -> bytes:
+    if config.CALLBACK_SECRET:
+        return config.CALLBACK_SECRET.encode()
+    return hashlib.sha256(f"callback:{config.BOT_TOKEN}".encode()).digest()
+
+
+def _digest(*parts) -> bytes:
+    message = ":".join(str(part) for part in parts).encode()
+    return hmac.new(_secret(), message, hashlib.sha256).digest()
+
+
+def _signature(chat_id: int, *parts) -> str:
+    digest = _digest(PREFIX, chat_id, *parts)[:SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def answer_order(user_id: int, question_id: int, issued: int, count: int) -> List[int]:
+    """Порядок вариантов на кнопках: перестановка выводится из HMAC и не хранится."""
+    order = list(range(count))
+    random.Random(_digest("order", user_id, question_id, issued)).shuffle(order)
+    return order
+
+
+def pack_answer(
+    chat_id: int, user_id: int, question_id: int, lang: str, issued: int, option: int
+) -> str:
+    """callback_data кнопки ответа, подписанная для чата и пользователя."""
+    fields = (user_id, question_id, lang, issued, option)
+    signature = _signature(chat_id, *fields)
+    return ":".join((PREFIX, *(str(field) for field in fields), signature))
+
+
+def unpack_answer(chat_id: int, data: str) -> Optional[InlineAnswer]:
+    """Разбор и проверка подписи callback_data; None, если данные подделаны."""
+    parts = data.split(":")
+    if len(parts) != 7 or parts[0] != PREFIX:
+        return None
+    *fields, signature = parts[1:]
+    if not hmac.compare_digest(signature, _signature(chat_id, *fields)):
+        return None
+    try:
+        user_id, question_id, lang, issued, option = fields
+        return InlineAnswer(int(user_id), int(question_id), lang, int(issued), int(option))
+    except ValueError:
+        return None
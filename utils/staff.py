@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Set
+
+from aiogram import Bot, types
+from aiogram.exceptions import TelegramAPIError
+
+from config import config
+
+ADMIN_STATUSES = ("administrator", "creator")
+# Пауза перед повторной загрузкой списка после ошибки API, секунд
+RETRY_DELAY = 60
+
+
+class StaffCache:
+    """Администраторы чатов в памяти с TTL.
+
+    Список загружается через get_chat_administrators и обновляется
+    по событиям chat_member (назначение и снятие администратора), поэтому
+    повторная загрузка нужна только раз в STAFF_CACHE_TTL. Проверка
+    is_staff не обращается ни к API, ни к БД: устаревший список
+    перезагружается в фоне, одним запросом на чат.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._staff: Dict[int, Set[int]] = {}
+        self._expires: Dict[int, float] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
+
+    def is_staff(self, chat_id: int, user_id: int) -> bool:
+        return user_id in self._staff.get(chat_id, ())
+
+    def is_stale(self, chat_id: int) -> bool:
+        return time.monotonic() >= self._expires.get(chat_id, 0.0)
+
+    async def _load(self, bot: Bot, chat_id: int) -> None:
+        try:
+            admins = await bot.get_chat_administrators(chat_id)
+        except TelegramAPIError as e:
+            logging.warning(f"Не удалось получить администраторов чата {chat_id}: {e}")
+            self._expires[chat_id] = time.monotonic() + min(self.ttl, RETRY_DELAY)
+            return
+        self._staff[chat_id] = {member.user.id for member in admins}
+        self._expires[chat_id] = time.monotonic() + self.ttl
+        logging.info(f"Загружено администраторов чата {chat_id}: {len(admins)}")
+
+    def refresh(self, bot: Bot, chat_id: int) -> asyncio.Task:
+        """Фоновая перезагрузка списка; параллельные вызовы ждут одну задачу."""
+        task = self._loading.get(chat_id)
+        if task is None:
+            task = self._loading[chat_id] = asyncio.create_task(self._load(bot, chat_id))
+            task.add_done_callback(lambda _: self._loading.pop(chat_id, None))
+        return task
+
+    def refresh_if_stale(self, bot: Bot, chat_id: int) -> None:
+        if self.is_stale(chat_id):
+            self.refresh(bot, chat_id)
+
+    async def ensure(self, bot: Bot, chat_id: int) -> None:
+        """Дожидается первой загрузки списка; дальше обновляет его в фоне."""
+        if chat_id not in self._staff and self.is_stale(chat_id):
+            await self.refresh(bot, chat_id)
+        else:
+            self.refresh_if_stale(bot, chat_id)
+
+    def apply(self, update: types.ChatMemberUpdated) -> None:
+        """Учёт назначения или снятия администратора из события chat_member."""
+        staff = self._staff.get(update.chat.id)
+        if staff is None:
+            return
+        user_id = update.new_chat_member.user.id
+        if update.new_chat_member.status in ADMIN_STATUSES:
+            staff.add(user_id)
+        elif update.old_chat_member.status in ADMIN_STATUSES:
+            staff.discard(user_id)
+
+
+staff_cache = StaffCache(config.STAFF_CACHE_TTL)
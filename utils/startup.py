@@ -0,0 +1,29 @@
+import logging
+import time
+from typing import Awaitable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    """Замер длительности фаз запуска для отчёта в лог."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    async def measure(self, name: str, awaitable: Awaitable[T]) -> T:
+        """Выполняет фазу и запоминает её длительность."""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def report(self) -> None:
+        """Выводит разбивку запуска по фазам."""
+        total = time.perf_counter() - self.started
+        phases = ", ".join(
+            f"{name}={duration * 1000:.0f}ms" for name, duration in self.phases.items()
+        )
+        logging.info(f"Startup finished in {total * 1000:.0f}ms ({phases})")
@@ -0,0 +1,103 @@
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+from database import PoolType, load_verification_stats
+from utils.runtime import json_dumps
+
+MINUTE = 60
+HOUR = 3600
+GRANULARITIES = (MINUTE, HOUR)
+# Сколько хранить минутные бакеты; часовые хранятся бессрочно
+MINUTE_RETENTION = 2 * 86400
+
+# Исходы проверки: начало проверки, успех и причины провала
+OUTCOMES = ("started", "passed", "incorrect", "quiz_timeout", "language_timeout", "raid")
+# Строка роллапа: (granularity, bucket_start, outcome, count)
+RollupRow = Tuple[int, datetime, str, int]
+# Окна сводки: имя -> (гранулярность, длина окна в секундах)
+WINDOWS = {"last_hour": (MINUTE, HOUR), "last_day": (HOUR, 86400)}
+
+
+def bucket_start(timestamp: float, granularity: int) -> datetime:
+    """Начало бакета в UTC (naive, как в столбце TIMESTAMP)."""
+    start = int(timestamp) - int(timestamp) % granularity
+    return datetime.fromtimestamp(start, timezone.utc).replace(tzinfo=None)
+
+
+class VerificationStats:
+    """Счётчики исходов проверки, агрегированные по минутам и часам.
+
+    Приращения копятся в памяти и пачкой сбрасываются в verification_stats.
+    Сводка читает только бакеты нужного окна, поэтому её стоимость не
+    зависит от числа пользователей в passed_users и banned_users.
+    """
+
+    def __init__(self) -> None:
+        self.pending: Dict[Tuple[int, datetime, str], int] = defaultdict(int)
+
+    def record(self, outcome: str, timestamp: Optional[float] = None) -> None:
+        """Учёт исхода сразу во всех гранулярностях."""
+        timestamp = time.time() if timestamp is None else timestamp
+        for granularity in GRANULARITIES:
+            self.pending[(granularity, bucket_start(timestamp, granularity), outcome)] += 1
+
+    def take_pending(self) -> List[RollupRow]:
+        """Забирает несброшенные приращения счётчиков."""
+        pending, self.pending = self.pending, defaultdict(int)
+        return [(*key, count) for key, count in pending.items()]
+
+    def restore_pending(self, rows: Iterable[RollupRow]) -> None:
+        """Возвращает приращения, которые не удалось записать в БД."""
+        for granularity, start, outcome, count in rows:
+            self.pending[(granularity, start, outcome)] += count
+
+    def pending_since(self, granularity: int, since: datetime) -> Dict[str, int]:
+        """Ещё не сброшенные в БД счётчики окна."""
+        totals: Dict[str, int] = defaultdict(int)
+        for (bucket_granularity, start, outcome), count in self.pending.items():
+            if bucket_granularity == granularity and start >= since:
+                totals[outcome] += count
+        return totals
+
+    async def summary(self, pool: PoolType) -> Dict[str, Dict[str, int]]:
+        """Число исходов каждого вида за последний час и последние сутки."""
+        now = time.time()
+        result = {}
+        for name, (granularity, length) in WINDOWS.items():
+            since = bucket_start(now - length, granularity)
+            totals = dict.fromkeys(OUTCOMES, 0)
+            for outcome, count in await load_verification_stats(pool, granularity, since):
+                totals[outcome] = totals.get(outcome, 0) + count
+            for outcome, count in self.pending_since(granularity, since).items():
+                totals[outcome] = totals.get(outcome, 0) + count
+            result[name] = totals
+        return result
+
+
+def format_summary(summary: Dict[str, Dict[str, int]]) -> str:
+    """Текст сводки для команды /stats."""
+    titles = {"last_hour": "За последний час", "last_day": "За последние сутки"}
+    lines = []
+    for name, totals in summary.items():
+        lines.append(f"<b>{titles.get(name, name)}</b>")
+        lines.extend(f"{outcome}: {count}" for outcome, count in totals.items())
+        lines.append("")
+    return "\n".join(lines).strip()
+
+
+def stats_view(pool: PoolType) -> Callable[[web.Request], Awaitable[web.Response]]:
+    """HTTP-обработчик GET /stats с той же сводкой в JSON."""
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.json_response(
+            await verification_stats.summary(pool), dumps=json_dumps()
+        )
+
+    return handler
+
+
+verification_stats = VerificationStats()
@@ -0,0 +1,39 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+
+from config import config
+
+
+class StripedUserLocks(BaseEventIsolation):
+    """Последовательная обработка апдейтов одного пользователя.
+
+    Фиксированный набор asyncio.Lock: пользователь попадает в полосу
+    по хешу user_id, поэтому память не растёт с числом участников, а
+    записи не нужно удалять. Ключ — только пользователь, без чата:
+    состояния в группе и в ЛС меняются одними и теми же обработчиками
+    (выбор языка, ответ на опрос, таймауты). Разные пользователи в одной
+    полосе лишь изредка ждут друг друга. Блокировки не реентерабельны:
+    внутри захваченной блокировки нельзя снова брать блокировку того же
+    пользователя.
+    """
+
+    def __init__(self, stripes: int) -> None:
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(stripes)]
+
+    def for_user(self, user_id: int) -> asyncio.Lock:
+        return self._locks[hash(user_id) % len(self._locks)]
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncIterator[None]:
+        """Изоляция апдейтов для FSM-middleware aiogram."""
+        async with self.for_user(key.user_id):
+            yield
+
+    async def close(self) -> None:
+        pass
+
+
+user_locks = StripedUserLocks(config.USER_LOCK_STRIPES)
@@ -0,0 +1,43 @@
+from collections import OrderedDict
+from typing import Tuple
+
+from config import config
+
+
+class VerdictCache:
+    """Ограниченный LRU-кэш положительных вердиктов «пользователь прошёл проверку».
+
+    Хранятся только положительные ответы: отрицательный вердикт меняется при
+    прохождении викторины, поэтому промах всегда уходит в БД.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, int], None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_full(self) -> bool:
+        return len(self._entries) >= self.max_size
+
+    def contains(self, chat_id: int, user_id: int) -> bool:
+        key = (chat_id, user_id)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return True
+        return False
+
+    def add(self, chat_id: int, user_id: int) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[(chat_id, user_id)] = None
+        self._entries.move_to_end((chat_id, user_id))
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, chat_id: int, user_id: int) -> None:
+        self._entries.pop((chat_id, user_id), None)
+
+
+verdict_cache = VerdictCache(config.VERDICT_CACHE_SIZE)
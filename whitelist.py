@@ -0,0 +1,190 @@
+"""Массовый импорт и экспорт белого списка прошедших пользователей (passed_users).
+
+Каждая пачка импорта сразу дописывается в снапшот фильтра Блума:
+работающий бот подмешивает его перед тем, как счесть пользователя
+новичком. После импорта бот получает POST /whitelist/reload (нужен
+HTTP_PORT) и прогревает кэш вердиктов.
+
+Примеры:
+    python whitelist.py import members.csv
+    python whitelist.py import members.ndjson --chat-id -1001234567890
+    python whitelist.py export - --format ndjson > members.ndjson
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, TextIO
+
+import aiohttp
+
+from config import config
+from utils.bloom import BloomFilter, snapshot_lock
+from database import (
+    bulk_mark_users_passed,
+    close_pool,
+    create_pool,
+    init_db,
+    iter_passed_users,
+)
+from utils.logger import setup_logging
+
+
+def detect_format(path: str, fmt: Optional[str]) -> str:
+    """Формат файла: явно заданный или по расширению (по умолчанию CSV)."""
+    if fmt:
+        return fmt
+    return "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def read_user_ids(stream: TextIO, fmt: str) -> Iterator[int]:
+    """Построчно читает user_id из CSV (первая колонка) или NDJSON."""
+    if fmt == "ndjson":
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            value = json.loads(line)
+            yield int(value["user_id"] if isinstance(value, dict) else value)
+    else:
+        for row in csv.reader(stream):
+            if row and row[0].strip().lstrip("-").isdigit():
+                yield int(row[0])
+
+
+def batched(user_ids: Iterator[int], size: int) -> Iterator[List[int]]:
+    batch: List[int] = []
+    for user_id in user_ids:
+        batch.append(user_id)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def add_to_snapshot(chat_id: int, user_ids: List[int]) -> bool:
+    """Дописывает id в снапшот фильтра Блума; False, если снапшота нет.
+
+    Без снапшота бот строит фильтр из таблицы, где импорт уже есть.
+    """
+    path = config.BLOOM_SNAPSHOT_PATH
+    if not os.path.exists(path):
+        return False
+    with snapshot_lock(path):
+        snapshot = BloomFilter.load(path)
+        if snapshot is None:
+            return False
+        for user_id in user_ids:
+            snapshot.add(chat_id, user_id)
+        snapshot.save(path)
+    return True
+
+
+async def notify_bot(chat_id: int) -> bool:
+    """Просит работающий бот подхватить импорт; False, если HTTP API недоступен."""
+    if not config.HTTP_PORT:
+        return False
+    host = "127.0.0.1" if config.HTTP_HOST in ("", "0.0.0.0", "::") else config.HTTP_HOST
+    headers = {"Authorization": f"Bearer {config.HTTP_TOKEN}"} if config.HTTP_TOKEN else {}
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120)) as session:
+            async with session.post(
+                f"http://{host}:{config.HTTP_PORT}/whitelist/reload",
+                params={"chat_id": str(chat_id)},
+                headers=headers,
+            ) as response:
+                response.raise_for_status()
+                logging.info(f"Bot reloaded the whitelist: {await response.text()}")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logging.warning(f"Could not notify the running bot: {e}")
+        return False
+    return True
+
+
+async def import_users(path: str, fmt: str, chat_id: int, batch_size: int) -> None:
+    """Потоковый импорт: в памяти одновременно не больше одной пачки."""
+    pool = await create_pool()
+    try:
+        await init_db(pool)
+        started = time.monotonic()
+        read = inserted = 0
+        in_snapshot = True
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+        with stream:
+            for batch in batched(read_user_ids(stream, fmt), batch_size):
+                inserted += await bulk_mark_users_passed(pool, batch, chat_id)
+                # Снапшот дополняется после записи в БД: упавший импорт не
+                # оставит в фильтре id, которых нет в таблице
+                in_snapshot = add_to_snapshot(chat_id, batch) and in_snapshot
+                read += len(batch)
+                rate = read / max(time.monotonic() - started, 1e-6)
+                logging.info(
+                    f"Imported {read} ids ({inserted} new), {rate:.0f} ids/s"
+                )
+        logging.info(f"Import finished: {read} ids, {inserted} new in chat {chat_id}")
+        if not await notify_bot(chat_id):
+            if in_snapshot:
+                logging.warning(
+                    "The running bot was not notified: imported members are "
+                    "recognised through the filter snapshot; call POST "
+                    "/whitelist/reload to warm its verdict cache."
+                )
+            else:
+                logging.warning(
+                    "The running bot was not notified and there is no filter "
+                    "snapshot: restart it or call POST /whitelist/reload, until "
+                    "then imported members may be asked to verify again."
+                )
+    finally:
+        await close_pool(pool)
+
+
+async def export_users(path: str, fmt: str, chat_id: int, batch_size: int) -> None:
+    """Потоковый экспорт пачками по первичному ключу."""
+    pool = await create_pool()
+    try:
+        exported = 0
+        stream = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+        with stream:
+            writer = csv.writer(stream) if fmt == "csv" else None
+            if writer:
+                writer.writerow(["user_id"])
+            async for batch in iter_passed_users(pool, chat_id, batch_size):
+                for user_id in batch:
+                    if writer:
+                        writer.writerow([user_id])
+                    else:
+                        stream.write(json.dumps({"user_id": user_id}) + "\n")
+                exported += len(batch)
+                logging.info(f"Exported {exported} ids")
+        logging.info(f"Export finished: {exported} ids from chat {chat_id}")
+    finally:
+        await close_pool(pool)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Импорт/экспорт passed_users")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help="Путь к файлу или '-' для stdin/stdout")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None)
+    parser.add_argument("--chat-id", type=int, default=config.ALLOWED_CHAT_ID)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Логи идут в stderr, поэтому экспорт в stdout остаётся чистым
+    setup_logging()
+    fmt = detect_format(args.path, args.format)
+    if args.command == "import":
+        asyncio.run(import_users(args.path, fmt, args.chat_id, args.batch_size))
+    else:
+        asyncio.run(export_users(args.path, fmt, args.chat_id, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()